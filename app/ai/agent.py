@@ -1,12 +1,23 @@
 import re
 import uuid
-from typing import List, Dict, Any
-from app.ai.models import AnomalyModel
+from typing import List, Dict, Any, Iterable
+from app.ai.drift import drift_monitors
+from app.ai.models import AnomalyModel, load_anomaly_model
+from app.ai.scanner import EntityScanner, default_scanner
+from app.ai.relations import RelationshipReasoner, KeywordStream
+from app.ai.insights import InsightRule, InsightEngine, DEFAULT_INSIGHT_RULES, rule_keywords, evaluate_insights
+from app.core.config import ANOMALY_MODEL_PATH, INSIGHT_EVIDENCE_LIMIT
+from app.features.entity_features import entity_feature_frame
 import pandas as pd
 
 class ForensicAgent:
-    def __init__(self):
-        self.anomaly_model = AnomalyModel()
+    def __init__(self, scanner: EntityScanner | None = None, insight_rules: List[InsightRule] | None = None,
+                 anomaly_model_path: str | None = ANOMALY_MODEL_PATH):
+        self.anomaly_model_path = anomaly_model_path
+        self.scanner = scanner or default_scanner()
+        self.reasoner = RelationshipReasoner()
+        self.insight_rules = insight_rules if insight_rules is not None else DEFAULT_INSIGHT_RULES
+        self.insight_engine = InsightEngine(self.insight_rules)
         
     def analyze_document(self, text: str) -> Dict[str, Any]:
         """
@@ -14,6 +25,7 @@ class ForensicAgent:
         """
         entities = self.discover_entities(text)
         relationships = self.reason_relationships(entities, text)
+        self.score_entity_risk(entities, relationships, len(text))
         insights = self.generate_insights(entities, relationships, text)
         
         return {
@@ -22,208 +34,90 @@ class ForensicAgent:
             "insights": insights
         }
 
-    def discover_entities(self, text: str) -> List[Dict[str, Any]]:
+    def analyze_document_stream(self, chunks: Iterable[str], overlap: int = 1024) -> Dict[str, Any]:
         """
-        Basic NER using regex and patterns.
+        Streaming variant of `analyze_document` over consecutive text chunks
+        (pages, fixed-size reads). Entities and mention offsets are
+        accumulated chunk by chunk. Keywords are counted, keeping the first
+        INSIGHT_EVIDENCE_LIMIT offsets of each as insight evidence and only
+        the relationship-keyword offsets some entity's context window can
+        reach, so apart from the entities, memory is bounded by the chunk
+        size plus `overlap` rather than the document. Results equal
+        `analyze_document("".join(chunks))` while no entity mention is longer
+        than `overlap`. Also returns the document length as "chars".
         """
-        entities = []
-        print(f"Agent: Scanning text ({len(text)} chars)...")
-        
-        # 1. Names (Allowing some flexibility in capitalization for discovery)
-        name_pattern = r"\b([A-Z][A-Za-z]+ [A-Z][A-Za-z]+)\b"
-        names = set(re.findall(name_pattern, text))
-        
-        for name in names:
-            if name in ["Date", "Name", "Sex", "Age", "DOB", "Eyes", "Hair", "Teeth", "Medical Examiner", "Incident Report"]:
+        scan = self.scanner.stream(overlap)
+        keywords = KeywordStream(
+            positional=self.reasoner.positional_keywords(),
+            presence=self.reasoner.narrative_rule.keywords,
+            limited=rule_keywords(self.insight_rules),
+            limit=INSIGHT_EVIDENCE_LIMIT,
+        )
+        n_chars = 0
+        for chunk in chunks:
+            if not chunk:
                 continue
-            
-            print(f"Agent Found Name: {name}")
-            entities.append({
-                "label": name,
-                "type": "person",
-                "risk_score": 0.0,
-                "confidence_score": 85.0
-            })
-
-        # 2. Addresses
-        address_pattern = r"\d+ [A-Z][a-z]+ (Ave|St|Rd|Blvd|Drive)"
-        addresses = set(re.findall(address_pattern, text))
-        for addr in addresses:
-            entities.append({
-                "label": addr,
-                "type": "ip", # Mapping to existing types
-                "risk_score": 0.0,
-                "confidence_score": 90.0
-            })
+            scan.feed(chunk)
+            keywords.feed(chunk.lower())
+            keywords.prune(scan.first_mentions, scan.scanned, self.reasoner.context)
+            n_chars += len(chunk)
+        print(f"Agent: Scanned text stream ({n_chars} chars)")
 
-        # 3. Dates (Forensic Timeline)
-        date_pattern = r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|[A-Z][a-z]+ \d{1,2}, \d{4})\b"
-        dates = set(re.findall(date_pattern, text))
-        for d in dates:
-            entities.append({
-                "label": d,
-                "type": "unknown",
-                "risk_score": 0.0,
-                "confidence_score": 95.0
-            })
-
-        # 4. Phone Numbers
-        phone_pattern = r"\b(\d{3}[-.\s]??\d{3}[-.\s]??\d{4}|\(\d{3}\)\s*\d{3}[-.\s]??\d{4}|\+\d{1,3}[-.\s]??\d{3}[-.\s]??\d{3}[-.\s]??\d{4})\b"
-        phones = set(re.findall(phone_pattern, text))
-        for p in phones:
-            entities.append({
-                "label": p,
-                "type": "phone",
-                "risk_score": 10.0,
-                "confidence_score": 90.0
-            })
-
-        # 5. IP Addresses
-        ip_pattern = r"\b(?:\d{1,3}\.){3}\d{1,3}\b"
-        ips = set(re.findall(ip_pattern, text))
-        for ip in ips:
-            entities.append({
-                "label": ip,
-                "type": "ip",
-                "risk_score": 25.0, # High risk for digital forensics
-                "confidence_score": 98.0
-            })
+        entities = scan.close()
+        keywords.close()
+        relationships = self.reasoner.reason_from_stream(entities, keywords, n_chars)
+        self.score_entity_risk(entities, relationships, n_chars)
+        insights = evaluate_insights(self.insight_rules, keywords.hits(), keywords.first, keywords.counts)
+        return {
+            "entities": entities,
+            "relationships": relationships,
+            "insights": insights,
+            "chars": n_chars
+        }
 
-        # 6. Emails
-        email_pattern = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b"
-        emails = set(re.findall(email_pattern, text))
-        for email in emails:
-            entities.append({
-                "label": email,
-                "type": "person", # Mapping to person/account for now
-                "risk_score": 5.0,
-                "confidence_score": 95.0
-            })
+    @property
+    def anomaly_model(self) -> AnomalyModel | None:
+        """The trained anomaly model, shared process-wide; None until one is trained."""
+        return load_anomaly_model(self.anomaly_model_path) if self.anomaly_model_path else None
 
-        # 7. Forensic Case IDs (e.g., DF-2026-091)
-        case_id_pattern = r"\b[A-Z]{2,4}-\d{4}-\d{2,4}\b"
-        case_ids = set(re.findall(case_id_pattern, text))
-        for cid in case_ids:
-            entities.append({
-                "label": cid,
-                "type": "other",
-                "risk_score": 0.0,
-                "confidence_score": 100.0
-            })
+    def score_entity_risk(self, entities: List[Dict[str, Any]], relationships: List[Dict[str, Any]],
+                          n_chars: int) -> None:
+        """
+        Replaces each entity's pattern risk with its anomaly percentile
+        (0-100) against the entities the model was trained on. The pattern
+        risk is kept as `base_risk_score` and is one of the model inputs.
+        Without a trained model the pattern risk stands.
+        """
+        model = self.anomaly_model
+        if model is None or not entities:
+            return
+        X = entity_feature_frame(entities, relationships, n_chars)
+        scores = model.score_array(X) * 100.0
+        drift_monitors.observe(self.anomaly_model_path, X)
+        for entity, score in zip(entities, scores):
+            entity.setdefault("base_risk_score", entity["risk_score"])
+            entity["risk_score"] = round(float(score), 2)
 
-        # 8. Financial IDs (e.g., ACC-77821)
-        acc_pattern = r"\bACC-\d{4,10}\b"
-        accs = set(re.findall(acc_pattern, text))
-        for acc in accs:
-            entities.append({
-                "label": acc,
-                "type": "other",
-                "risk_score": 20.0,
-                "confidence_score": 98.0
-            })
-            
-        return entities
+    def discover_entities(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Basic NER using regex and patterns.
+        All entity rules are matched in a single pass by `EntityScanner`;
+        each entity carries the (start, end) offsets of its mentions.
+        """
+        print(f"Agent: Scanning text ({len(text)} chars)...")
+        return self.scanner.scan(text)
 
     def reason_relationships(self, entities: List[Dict[str, Any]], text: str) -> List[Dict[str, Any]]:
         """
         Infers links based on proximity and keywords.
+        Works from each entity's first mention offset; see `RelationshipReasoner`.
         """
-        relationships = []
-        text_lower = text.lower()
-        
-        # Simple proximity-based relationship detection
-        for i, e1 in enumerate(entities):
-            for j, e2 in enumerate(entities):
-                if i >= j: continue
-                
-                # Check if they appear near each other or specific keywords exist
-                if e1["label"] in text and e2["label"] in text:
-                    p1 = text.find(e1["label"])
-                    p2 = text.find(e2["label"])
-                    
-                    # Extract context correctly regardless of order
-                    start = min(p1, p2)
-                    end = max(p1, p2)
-                    text_context = text_lower[max(0, start-100) : min(len(text), end+100)]
-                    
-                    if "transfer" in text_context or "money" in text_context or "$" in text_context:
-                        relationships.append({
-                            "source_label": e1["label"],
-                            "target_label": e2["label"],
-                            "basis": "Financial Transfer detected between entities",
-                            "strength_score": 90.0,
-                            "confidence_score": 85.0
-                        })
-                    elif "reported" in text_context or "threatening" in text_context or "text message" in text_context:
-                        relationships.append({
-                            "source_label": e1["label"],
-                            "target_label": e2["label"],
-                            "basis": "Suspicious communication pattern",
-                            "strength_score": 95.0,
-                            "confidence_score": 90.0
-                        })
-                    elif abs(p1 - p2) < 500: # Proximity Fallback for co-occurrence
-                        relationships.append({
-                            "source_label": e1["label"],
-                            "target_label": e2["label"],
-                            "basis": "Entity Co-occurrence (High Proximity)",
-                            "strength_score": 60.0,
-                            "confidence_score": 65.0
-                        })
-                    elif "altercation" in text_lower or "incident" in text_lower:
-                        relationships.append({
-                            "source_label": e1["label"],
-                            "target_label": e2["label"],
-                            "basis": "Co-occurrence in Incident Narrative",
-                            "strength_score": 75.0,
-                            "confidence_score": 70.0
-                        })
-        
-        return relationships
+        return self.reasoner.reason(entities, text)
 
     def generate_insights(self, entities: List[Any], relationships: List[Any], text: str) -> List[Dict[str, Any]]:
         """
         Synthesizes findings into forensic insights.
+        Each `InsightRule` fires on the keywords present in the document; all
+        rules are matched in one pass and insights carry the keyword offsets.
         """
-        insights = []
-        text_lower = text.lower()
-        
-        # 1. Toxicology Check
-        toxic_keywords = ["positive", "cocaine", "morphine", "heroin", "oxycodone"]
-        if any(kw in text_lower for kw in toxic_keywords):
-            insights.append({
-                "severity": "critical",
-                "summary": "Positive Toxicology Detected",
-                "explanation": "Document indicates positive results for controlled substances (Cocaine/Morphine group).",
-                "confidence_score": 95.0
-            })
-            
-        # 2. Physical Trauma
-        trauma_keywords = ["abrasion", "contusion", "laceration", "fracture", "blunt force"]
-        if any(kw in text_lower for kw in trauma_keywords):
-            insights.append({
-                "severity": "high",
-                "summary": "Evidence of Physical Trauma",
-                "explanation": "Document identifies trauma consistent with an altercation or homicide.",
-                "confidence_score": 90.0
-            })
-
-        # 3. Financial Crime Indicators
-        if "transfer" in text_lower and "$" in text_lower:
-            insights.append({
-                "severity": "medium",
-                "summary": "Significant Financial Transfer Detected",
-                "explanation": "Evidence of a $5,000 transaction between subjects prior to the incident.",
-                "confidence_score": 85.0
-            })
-
-        # 4. Homicide Confirmation
-        if "homicide" in text_lower or "manner of death" in text_lower:
-            insights.append({
-                "severity": "critical",
-                "summary": "Confirmed Homicide Pattern",
-                "explanation": "Official narrative or medical examiner conclusion indicates Homicide.",
-                "confidence_score": 100.0
-            })
-            
-        return insights
+        return self.insight_engine.evaluate(text.lower())
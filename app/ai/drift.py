@@ -1,17 +1,223 @@
+"""
+Feature drift: PSI of scored data against the training distribution.
+
+A `DriftReference` (per-feature quantile breakpoints and expected bucket
+shares) is computed once at training time and saved beside the model.
+`DriftMonitor` then only keeps bucket counts per feature, updated from each
+scored batch in a window file shared by every scoring process, and
+computes PSI for all features in one array expression.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
 import numpy as np
 import pandas as pd
 
+from app.core.config import DRIFT_BUCKETS, DRIFT_WINDOW_SECONDS
+from app.core.logging import get_logger
+
+log = get_logger("intelweave.ai.drift")
+
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+def reference_path(model_path: str) -> str:
+    """Where the drift reference of a model artifact is stored."""
+    return f"{os.path.splitext(model_path)[0]}.drift.npz"
+
+def window_path(model_path: str) -> str:
+    """Where the current window's bucket counts of a model artifact are shared between processes."""
+    return f"{os.path.splitext(os.path.abspath(model_path))[0]}.drift-window.json"
+
+def _psi_matrix(expected: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    e = np.clip(expected, 1e-6, 1.0)
+    a = np.clip(counts / np.maximum(counts.sum(axis=1, keepdims=True), 1), 1e-6, 1.0)
+    return np.sum((a - e) * np.log(a / e), axis=1)
+
+
+@dataclass
+class DriftReference:
+    features: np.ndarray     # F feature names
+    edges: np.ndarray        # F x (buckets + 1) breakpoints, outer ones at -inf / inf
+    expected: np.ndarray     # F x buckets shares of the training rows
+
+    @classmethod
+    def from_frame(cls, X: pd.DataFrame, buckets: int = DRIFT_BUCKETS) -> "DriftReference":
+        values = X.to_numpy(dtype=np.float64)
+        edges = np.nanquantile(values, np.linspace(0, 1, buckets + 1), axis=0).T
+        edges[:, 0], edges[:, -1] = -np.inf, np.inf
+        ref = cls(np.asarray(X.columns, dtype=str), np.ascontiguousarray(edges),
+                  np.zeros((len(X.columns), buckets)))
+        counts = ref.bin_counts(X)
+        ref.expected = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+        return ref
+
+    def bin_counts(self, X: pd.DataFrame) -> np.ndarray:
+        """F x buckets histogram of X's rows (missing values are not counted)."""
+        buckets = self.edges.shape[1] - 1
+        counts = np.zeros((len(self.features), buckets), dtype=np.int64)
+        for i, name in enumerate(self.features):
+            col = X[name].to_numpy(dtype=np.float64)
+            col = col[~np.isnan(col)]
+            # Same buckets as np.histogram: edges[j] <= x < edges[j + 1].
+            idx = np.searchsorted(self.edges[i], col, side="right") - 1
+            counts[i] = np.bincount(np.clip(idx, 0, buckets - 1), minlength=buckets)
+        return counts
+
+    def psi(self, counts: np.ndarray) -> np.ndarray:
+        return _psi_matrix(self.expected, counts)
+
+    def save(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as fh:
+            np.savez(fh, features=self.features, edges=self.edges, expected=self.expected)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "DriftReference":
+        with np.load(path) as data:
+            return cls(data["features"], data["edges"], data["expected"])
+
+
+class DriftMonitor:
+    """
+    Bucket counts of scored rows against one reference, kept in a JSON file
+    beside it, so every process that scores the model (API workers, ingest
+    pool children) adds to the same window. Updates read, add and replace
+    the file under an exclusive flock. When a batch arrives after the
+    window has run `window_seconds`, the finished window's PSI is kept as
+    `previous` and counting starts over; so does a retrained model's
+    (a reference with a new mtime).
+    """
+
+    def __init__(self, reference: DriftReference, reference_mtime: float, state_path: str,
+                 window_seconds: float = DRIFT_WINDOW_SECONDS):
+        self.reference = reference
+        self.reference_mtime = reference_mtime
+        self.state_path = state_path
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+
+    def _fresh(self, now: float) -> dict:
+        return {
+            "reference_mtime": self.reference_mtime,
+            "window_start": now,
+            "updated_at": None,
+            "rows": 0,
+            "counts": np.zeros_like(self.reference.expected, dtype=np.int64).tolist(),
+            "previous": None,
+        }
+
+    def _load(self) -> dict:
+        try:
+            with open(self.state_path) as fh:
+                state = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return self._fresh(time.time())
+        if (state.get("reference_mtime") != self.reference_mtime
+                or np.shape(state.get("counts")) != self.reference.expected.shape):
+            return self._fresh(time.time())
+        return state
+
+    def update(self, X: pd.DataFrame) -> None:
+        counts = self.reference.bin_counts(X)
+        with self._lock, open(f"{self.state_path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            state = self._load()
+            now = time.time()
+            if state["rows"] and now - state["window_start"] >= self.window_seconds:
+                previous = self._snapshot(state)
+                state = self._fresh(now)
+                state["previous"] = previous
+            state["counts"] = (np.asarray(state["counts"], dtype=np.int64) + counts).tolist()
+            state["rows"] += len(X)
+            state["updated_at"] = now
+            tmp = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as fh:
+                json.dump(state, fh)
+            os.replace(tmp, self.state_path)
+
+    def _snapshot(self, state: dict) -> dict:
+        rows = state["rows"]
+        values = self.reference.psi(np.asarray(state["counts"])) if rows else np.zeros(len(self.reference.features))
+        worst = float(values.max()) if len(values) else 0.0
+        status = "no_data" if not rows else (
+            "significant" if worst >= PSI_SIGNIFICANT else "moderate" if worst >= PSI_MODERATE else "stable"
+        )
+        return {
+            "rows": rows,
+            "window_start": state["window_start"],
+            "updated_at": state["updated_at"],
+            "max_psi": round(worst, 6),
+            "status": status,
+            "psi": {str(f): round(float(v), 6) for f, v in zip(self.reference.features, values)},
+        }
+
+    def report(self) -> dict:
+        state = self._load()
+        return {**self._snapshot(state), "previous": state["previous"]}
+
+
+class DriftRegistry:
+    """
+    Drift monitors, one per model artifact that has a saved reference,
+    keyed by the reference's absolute path. Scoring code calls `observe`;
+    models trained without a reference are ignored, and a monitor that
+    fails (unreadable reference, unwritable window file) is logged and
+    skipped so it never fails a prediction. The counts live in the
+    monitors' shared files, so `report` sees rows scored by any process.
+    """
+
+    def __init__(self):
+        self._monitors: dict[str, tuple[float, DriftMonitor]] = {}
+        self._lock = threading.Lock()
+
+    def monitor(self, model_path: str) -> Optional[DriftMonitor]:
+        path = reference_path(os.path.abspath(model_path))
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        entry = self._monitors.get(path)
+        if entry and entry[0] == mtime:
+            return entry[1]
+        with self._lock:
+            entry = self._monitors.get(path)
+            if not entry or entry[0] != mtime:
+                # New or retrained model: its window file starts over on the new reference.
+                entry = (mtime, DriftMonitor(DriftReference.load(path), mtime, window_path(model_path)))
+                self._monitors[path] = entry
+            return entry[1]
+
+    def observe(self, model_path: str, X: pd.DataFrame) -> None:
+        try:
+            monitor = self.monitor(model_path)
+            if monitor is not None and len(X):
+                monitor.update(X)
+        except Exception:
+            log.exception("Drift monitoring failed for %s", model_path)
+
+    def report(self, model_paths: Iterable[str]) -> dict:
+        """Window PSI of each of `model_paths` that has a reference, from the shared window files."""
+        out = {}
+        for model_path in model_paths:
+            monitor = self.monitor(model_path)
+            if monitor is not None:
+                out[model_path] = monitor.report()
+        return out
+
+
+drift_monitors = DriftRegistry()
+
 def psi(expected: pd.Series, actual: pd.Series, buckets: int = 10) -> float:
     expected = expected.dropna().astype(float)
     actual = actual.dropna().astype(float)
-    breakpoints = np.quantile(expected, np.linspace(0, 1, buckets + 1))
-    breakpoints[0], breakpoints[-1] = -np.inf, np.inf
-
-    def dist(x):
-        hist, _ = np.histogram(x, bins=breakpoints)
-        pct = hist / max(hist.sum(), 1)
-        return np.clip(pct, 1e-6, 1.0)
-
-    e = dist(expected)
-    a = dist(actual)
-    return float(np.sum((a - e) * np.log(a / e)))
+    ref = DriftReference.from_frame(expected.to_frame("x"), buckets)
+    return float(ref.psi(ref.bin_counts(actual.to_frame("x")))[0])
@@ -1,7 +1,192 @@
 from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 
+from app.core.config import EXPLAIN_CACHE_ROWS
+
+EXPLAIN_BATCH_ROWS = 100_000
+
 def simple_contribution_explain(X_row: pd.Series, feature_weights: dict[str, float]) -> dict:
     contrib = {k: float(X_row.get(k, 0.0)) * float(w) for k, w in feature_weights.items()}
     top = sorted(contrib.items(), key=lambda kv: abs(kv[1]), reverse=True)[:6]
-    return {"top_contributors": top, "note": "Heuristic explanation (not model-specific)."} 
+    return {"top_contributors": top, "note": "Heuristic explanation (not model-specific)."}
+
+
+@dataclass
+class Explanations:
+    """Top-k contributors per row: column indices into `features` and their contributions, largest |value| first."""
+    features: np.ndarray
+    indices: np.ndarray
+    contributions: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def row(self, i: int) -> dict:
+        """One row in the `simple_contribution_explain` format."""
+        top = [(str(self.features[j]), float(v)) for j, v in zip(self.indices[i], self.contributions[i])]
+        return {"top_contributors": top, "note": "Heuristic explanation (not model-specific)."}
+
+    def to_dicts(self) -> list[dict]:
+        return [self.row(i) for i in range(len(self))]
+
+
+def _aligned(X: pd.DataFrame, weights) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    X and a weight vector over the same columns. A {feature: weight} dict
+    selects and orders the columns like `simple_contribution_explain`: its
+    keys in dict order, missing ones as 0, columns without a weight dropped.
+    """
+    if isinstance(weights, dict):
+        features = list(weights)
+        if list(X.columns) != features:
+            X = X.reindex(columns=features, fill_value=0.0)
+        return X, np.array([float(w) for w in weights.values()])
+    return X, np.asarray(weights, dtype=np.float64)
+
+def explain_batch(X: pd.DataFrame, weights, k: int = 6, batch_rows: int = EXPLAIN_BATCH_ROWS) -> Explanations:
+    """
+    `simple_contribution_explain` for every row of X at once. `weights` is a
+    vector aligned with X's columns or a {feature: weight} dict (see
+    `_aligned`). The top k per row come from argpartition, then only those k
+    are sorted. Results equal `simple_contribution_explain`'s, ties included.
+    """
+    X, w = _aligned(X, weights)
+    features = np.asarray(X.columns, dtype=str)
+    values = X.to_numpy(dtype=np.float64)
+    n, f = values.shape
+    k = min(k, f)
+    indices = np.empty((n, k), dtype=np.int32)
+    contributions = np.empty((n, k), dtype=np.float64)
+    for start in range(0, n, batch_rows):
+        c = values[start:start + batch_rows] * w
+        key = -np.abs(c)
+        top = np.argpartition(key, k - 1, axis=1)[:, :k] if k < f else np.broadcast_to(np.arange(f), c.shape).copy()
+        # Largest first, ties in column order (as the stable sort in simple_contribution_explain).
+        top_key = np.take_along_axis(key, top, axis=1)
+        order = np.lexsort((top, top_key), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        # argpartition picks arbitrarily among values tied at the cut-off; redo those rows exactly.
+        cut = top_key.max(axis=1, keepdims=True)
+        tied = (key == cut).sum(axis=1) != (top_key == cut).sum(axis=1)
+        if tied.any():
+            top[tied] = np.argsort(key[tied], axis=1, kind="stable")[:, :k]
+        indices[start:start + len(c)] = top
+        contributions[start:start + len(c)] = np.take_along_axis(c, top, axis=1)
+    return Explanations(features, indices, contributions)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, elementwise over uint64."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _row_hashes(values: np.ndarray, seed: bytes) -> np.ndarray:
+    """
+    64-bit hash per row: each float's bit pattern, offset by a seeded
+    per-column salt, is mixed with splitmix64 and folded into the running
+    hash column by column. Every input bit reaches every output bit, so
+    integer-valued floats (whose low bits are all zero) hash as well as
+    any others; hits are still checked against the stored row.
+    """
+    rng = np.random.default_rng(np.frombuffer(seed, dtype=np.uint64))
+    salt = rng.integers(0, np.iinfo(np.uint64).max, size=values.shape[1] + 1, dtype=np.uint64, endpoint=True)
+    bits = values.view(np.uint64)
+    with np.errstate(over="ignore"):
+        h = np.full(len(values), salt[-1], dtype=np.uint64)
+        for j in range(values.shape[1]):
+            h = _mix64(h ^ _mix64(bits[:, j] + salt[j]))
+    return h
+
+
+class _Table:
+    """Cached rows for one (k, feature count): keys kept sorted for searchsorted lookups, with the rows they hash."""
+
+    def __init__(self, k: int, n_features: int):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.rows = np.empty((0, n_features), dtype=np.uint64)
+        self.indices = np.empty((0, k), dtype=np.int32)
+        self.contributions = np.empty((0, k), dtype=np.float64)
+        self.used = np.empty(0, dtype=np.int64)
+
+
+class ExplanationCache:
+    """
+    Explained rows keyed by (model version, feature row hash), so a case
+    graph re-exported with an unchanged model only explains new or changed
+    rows. `model_version` names whatever the weights come from; fixed
+    heuristic weights use a fixed name. A key only hits when the cached row's bits equal the row's, so a
+    hash collision costs a recomputation, never a wrong explanation.
+    Lookups and inserts are array operations; past `max_rows` the least
+    recently used rows are dropped.
+    """
+
+    def __init__(self, max_rows: int = EXPLAIN_CACHE_ROWS):
+        self.max_rows = max_rows
+        self._tables: dict[tuple[int, int], _Table] = {}
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    def explain(self, X: pd.DataFrame, weights, model_version: str, k: int = 6) -> Explanations:
+        X, w = _aligned(X, weights)
+        values = np.ascontiguousarray(X.to_numpy(dtype=np.float64))
+        k = min(k, values.shape[1])
+        # Everything besides the row that changes the answer seeds the row hash.
+        seed = hashlib.blake2b(
+            f"{model_version}|{k}|{'|'.join(map(str, X.columns))}".encode() + w.tobytes(), digest_size=16
+        ).digest()
+        keys = _row_hashes(values, seed)
+        bits = values.view(np.uint64)
+        indices = np.empty((len(keys), k), dtype=np.int32)
+        contributions = np.empty((len(keys), k), dtype=np.float64)
+
+        with self._lock:
+            table = self._tables.setdefault((k, values.shape[1]), _Table(k, values.shape[1]))
+            self._tick += 1
+            pos = np.minimum(np.searchsorted(table.keys, keys), max(len(table.keys) - 1, 0))
+            hit = table.keys[pos] == keys if len(table.keys) else np.zeros(len(keys), dtype=bool)
+            hit[hit] = (table.rows[pos[hit]] == bits[hit]).all(axis=1)
+            indices[hit] = table.indices[pos[hit]]
+            contributions[hit] = table.contributions[pos[hit]]
+            table.used[pos[hit]] = self._tick
+
+        miss = np.flatnonzero(~hit)
+        if len(miss):
+            fresh = explain_batch(X.iloc[miss], w, k)
+            indices[miss], contributions[miss] = fresh.indices, fresh.contributions
+            with self._lock:
+                self._insert(table, keys[miss], bits[miss], fresh)
+        return Explanations(np.asarray(X.columns, dtype=str), indices, contributions)
+
+    def _insert(self, table: _Table, keys: np.ndarray, rows: np.ndarray, fresh: Explanations) -> None:
+        # One row per key: a colliding row stays uncached and is recomputed on each lookup.
+        keys, first = np.unique(keys, return_index=True)
+        new = ~np.isin(keys, table.keys)
+        keys, first = keys[new], first[new]
+        all_keys = np.concatenate([table.keys, keys])
+        all_rows = np.concatenate([table.rows, rows[first]])
+        all_indices = np.concatenate([table.indices, fresh.indices[first]])
+        all_contributions = np.concatenate([table.contributions, fresh.contributions[first]])
+        used = np.concatenate([table.used, np.full(len(keys), self._tick, dtype=np.int64)])
+        keep = np.arange(len(all_keys))
+        if len(keep) > self.max_rows:
+            keep = np.argpartition(-used, self.max_rows - 1)[:self.max_rows]
+        keep = keep[np.argsort(all_keys[keep], kind="stable")]
+        table.keys, table.rows, table.indices = all_keys[keep], all_rows[keep], all_indices[keep]
+        table.contributions, table.used = all_contributions[keep], used[keep]
+
+    def __len__(self) -> int:
+        return sum(len(t.keys) for t in self._tables.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+
+
+explanation_cache = ExplanationCache()
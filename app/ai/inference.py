@@ -1,10 +1,39 @@
-import joblib
+from __future__ import annotations
+
+import numpy as np
 import pandas as pd
 
-def score_links(model_path: str, X: pd.DataFrame) -> pd.DataFrame:
-    clf = joblib.load(model_path)
-    p = clf.predict_proba(X)[:, 1]
-    out = X.copy()
+from app.ai.drift import drift_monitors
+from app.ai.registry import registry
+
+SCORE_BATCH_SIZE = 200_000
+
+def predict_link_proba(model_path: str, X: pd.DataFrame, batch_size: int = SCORE_BATCH_SIZE,
+                       out: np.ndarray | None = None, mmap: bool = False) -> np.ndarray:
+    """
+    Positive-class probabilities for every row of X, scored in row batches
+    so the model's float conversion never holds more than `batch_size` rows.
+    X is only sliced, never copied; results are written into `out` if given.
+    """
+    clf = registry.get(model_path, mmap=mmap)
+    n = len(X)
+    if out is None:
+        out = np.empty(n, dtype=np.float64)
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        out[start:stop] = clf.predict_proba(X.iloc[start:stop])[:, 1]
+    drift_monitors.observe(model_path, X)
+    return out
+
+def score_links(model_path: str, X: pd.DataFrame, inplace: bool = False,
+                batch_size: int = SCORE_BATCH_SIZE) -> pd.DataFrame:
+    """
+    Adds `confidence` and `strength_score` columns. The model comes from the
+    process-wide registry; with `inplace=True` the columns are written onto X
+    itself instead of a copy.
+    """
+    p = predict_link_proba(model_path, X, batch_size)
+    out = X if inplace else X.copy()
     out["confidence"] = p
     out["strength_score"] = (p * 100.0).round(2)
     return out
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Optional
+
+from app.ai.keywords import KeywordAutomaton
+from app.core.config import INSIGHT_RULES_PATH, INSIGHT_EVIDENCE_LIMIT
+
+SEVERITIES = ("low", "medium", "high", "critical")
+
+
+@dataclass
+class InsightRule:
+    """
+    A keyword-triggered forensic insight. `triggers` is a tuple of keyword
+    groups: the rule fires when every group has at least one keyword present.
+    """
+    severity: str
+    summary: str
+    explanation: str
+    confidence_score: float
+    triggers: tuple
+    name: str = ""
+
+    def keywords(self) -> set:
+        return {kw for group in self.triggers for kw in group}
+
+    def matches(self, present: set) -> bool:
+        return all(any(kw in present for kw in group) for group in self.triggers)
+
+    def to_insight(self) -> Dict[str, Any]:
+        return {
+            "severity": self.severity,
+            "summary": self.summary,
+            "explanation": self.explanation,
+            "confidence_score": self.confidence_score,
+        }
+
+
+def load_insight_rules(path: str = INSIGHT_RULES_PATH) -> List[InsightRule]:
+    """
+    Rules from a JSON file: {"rules": [{"name", "severity", "summary",
+    "explanation", "confidence_score", "triggers": [[keyword, ...], ...]}]}.
+    Keywords are matched against lowercased text, so they are lowercased here.
+    """
+    with open(path, encoding="utf-8") as fh:
+        spec = json.load(fh)
+    rules = []
+    for i, raw in enumerate(spec.get("rules", [])):
+        try:
+            triggers = tuple(tuple(str(kw).lower() for kw in group) for group in raw["triggers"])
+            rule = InsightRule(
+                severity=raw["severity"],
+                summary=raw["summary"],
+                explanation=raw.get("explanation", ""),
+                confidence_score=float(raw["confidence_score"]),
+                triggers=triggers,
+                name=raw.get("name", ""),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{path}: invalid insight rule #{i}: {e!r}") from e
+        if rule.severity not in SEVERITIES:
+            raise ValueError(f"{path}: rule #{i} has unknown severity {rule.severity!r}")
+        if not triggers or not all(group and all(group) for group in triggers):
+            raise ValueError(f"{path}: rule #{i} needs non-empty keyword groups")
+        rules.append(rule)
+    return rules
+
+
+DEFAULT_INSIGHT_RULES = load_insight_rules()
+
+
+def rule_keywords(rules: Iterable[InsightRule]) -> set:
+    return {kw for rule in rules for kw in rule.keywords()}
+
+
+def _evidence(rule: InsightRule, positions: Dict[str, List[int]],
+              counts: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    hits = sorted(
+        (pos, kw) for kw in rule.keywords() for pos in positions.get(kw, ())
+    )
+    return {
+        "evidence": [{"keyword": kw, "start": pos, "end": pos + len(kw)} for pos, kw in hits[:INSIGHT_EVIDENCE_LIMIT]],
+        "evidence_count": sum(counts.get(kw, 0) for kw in rule.keywords()) if counts is not None else len(hits),
+    }
+
+
+def evaluate_insights(rules: Iterable[InsightRule], present: set,
+                      positions: Optional[Dict[str, List[int]]] = None,
+                      counts: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Insights for every rule triggered by the set of keywords present in the
+    document. With keyword `positions`, each insight also carries the
+    offsets of its matched keywords as evidence (the first
+    INSIGHT_EVIDENCE_LIMIT, plus the total count). `positions` may stop at
+    INSIGHT_EVIDENCE_LIMIT per keyword when `counts` has the totals.
+    """
+    insights = []
+    for rule in rules:
+        if rule.matches(present):
+            insight = rule.to_insight()
+            if positions is not None:
+                insight.update(_evidence(rule, positions, counts))
+            insights.append(insight)
+    return insights
+
+
+class InsightEngine:
+    """A rule set compiled into one keyword automaton: a single pass over the text evaluates every rule."""
+
+    def __init__(self, rules: List[InsightRule]):
+        self.rules = rules
+        self.automaton = KeywordAutomaton(rule_keywords(rules))
+
+    def evaluate(self, text_lower: str) -> List[Dict[str, Any]]:
+        # A rule's evidence is its first INSIGHT_EVIDENCE_LIMIT hits, so no keyword needs more offsets than that.
+        positions, counts = self.automaton.first_positions(text_lower, INSIGHT_EVIDENCE_LIMIT)
+        present = {kw for kw, n in counts.items() if n}
+        return evaluate_insights(self.rules, present, positions, counts)
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def _trie_pattern(node: dict) -> str:
+    """Regex for a trie node; greedy optional groups make the longest keyword win."""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    return "(?:" + body + ")?" if "" in node else body
+
+
+def _find(text: str, keyword: str, start: int, limit: int) -> List[int]:
+    """Offsets of the first `limit` occurrences of `keyword` in text[start:], overlapping ones included."""
+    out: List[int] = []
+    pos = text.find(keyword, start)
+    while pos != -1 and len(out) < limit:
+        out.append(pos)
+        pos = text.find(keyword, pos + 1)
+    return out
+
+
+def _count(text: str, keyword: str, start: int) -> int:
+    """Occurrences of `keyword` in text[start:], overlapping ones included."""
+    if not any(keyword.startswith(keyword[i:]) for i in range(1, len(keyword))):
+        # No proper suffix is also a prefix, so occurrences cannot overlap.
+        return text.count(keyword, start)
+    n, pos = 0, text.find(keyword, start)
+    while pos != -1:
+        n += 1
+        pos = text.find(keyword, pos + 1)
+    return n
+
+
+class KeywordAutomaton:
+    """
+    Every occurrence of a fixed set of keywords in one pass over the text,
+    overlapping occurrences included (what repeated `str.find` per keyword
+    returns).
+
+    The keywords are merged into a trie and compiled into a single regex
+    inside a lookahead, so the regex engine walks the trie at each candidate
+    offset; offsets that cannot start a keyword are skipped by its
+    first-character prefilter. The per-character cost follows the trie
+    depth rather than the number of keywords. The longest keyword at an
+    offset is the one matched; any shorter keyword starting there is a
+    prefix of it and is read from a precomputed table.
+    """
+    # Up to this many keywords, one str.find pass each is faster than the automaton
+    FIND_MAX_KEYWORDS = 32
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({kw for kw in keywords if kw})
+        self.max_len = max((len(kw) for kw in self.keywords), default=0)
+        trie: dict = {}
+        for kw in self.keywords:
+            node = trie
+            for ch in kw:
+                node = node.setdefault(ch, {})
+            node[""] = True
+        self._regex = re.compile(f"(?=({_trie_pattern(trie)}))") if self.keywords else None
+        self._prefixes = {
+            kw: [p for p in self.keywords if kw.startswith(p)] for kw in self.keywords
+        }
+
+    def iter_matches(self, text: str, stop: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """(offset, keyword) for every occurrence starting before `stop` (lookahead still sees the whole text)."""
+        if self._regex is None:
+            return
+        for m in self._regex.finditer(text):
+            pos = m.start()
+            if stop is not None and pos >= stop:
+                return
+            for kw in self._prefixes[m.group(1)]:
+                yield pos, kw
+
+    def first_positions(self, text: str, limit: int,
+                        waste: int = 1024) -> Tuple[Dict[str, List[int]], Dict[str, int]]:
+        """
+        The first `limit` offsets of every keyword, and each keyword's total
+        count. A keyword stops being recorded once it has `limit` offsets;
+        after `waste` further matches of such keywords, the scan resumes on
+        an automaton of the keywords still recording, so frequent keywords
+        stop costing a Python step per match. Once at most FIND_MAX_KEYWORDS
+        are left, each is looked up with `str.find` instead, which beats
+        the automaton's per-offset cost for a few keywords. Totals past
+        `limit` come from `str.count` (a find loop for keywords that can
+        overlap themselves).
+        """
+        out: Dict[str, List[int]] = {kw: [] for kw in self.keywords}
+        automaton, start = self, 0
+        while len(automaton.keywords) > self.FIND_MAX_KEYWORDS:
+            wasted, resume = 0, None
+            for m in automaton._regex.finditer(text, start):
+                pos = m.start()
+                for kw in automaton._prefixes[m.group(1)]:
+                    hits = out[kw]
+                    if len(hits) < limit:
+                        hits.append(pos)
+                    else:
+                        wasted += 1
+                if wasted >= waste:
+                    resume = pos + 1
+                    break
+            if resume is None:
+                break
+            automaton = KeywordAutomaton(kw for kw, hits in out.items() if len(hits) < limit)
+            start = resume
+        else:
+            for kw in automaton.keywords:
+                out[kw].extend(_find(text, kw, start, limit - len(out[kw])))
+        counts = {kw: len(hits) for kw, hits in out.items()}
+        for kw, hits in out.items():
+            if len(hits) >= limit:
+                counts[kw] += _count(text, kw, hits[-1] + 1)
+        return out, counts
+
+    def positions(self, text: str) -> Dict[str, List[int]]:
+        out: Dict[str, List[int]] = {kw: [] for kw in self.keywords}
+        if self._regex is None:
+            return out
+        for m in self._regex.finditer(text):
+            pos = m.start()
+            for kw in self._prefixes[m.group(1)]:
+                out[kw].append(pos)
+        return out
@@ -1,17 +1,110 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+import joblib
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
 from sklearn.ensemble import IsolationForest
 
+from app.ai.registry import registry
+from app.core.config import ANOMALY_MODEL_PATH, ANOMALY_N_JOBS
+
+class CalibratedLinkModel:
+    """
+    Link-strength classifier: one gradient-boosted model per calibration
+    fold, each with an isotonic map fitted on its held-out fold; the
+    probability is the mean over folds, as CalibratedClassifierCV computes
+    it. Built by `train_link_strength`, which fits the folds in parallel and
+    can continue the boosters of a previous model; `seen` keeps, per fold,
+    the sorted hashes of every row its booster was trained on, so a
+    continued booster is never calibrated on rows it has already fitted.
+    """
+    classes_ = np.array([0, 1])
+
+    def __init__(self, folds: list, feature_names: list, seen: Optional[list] = None):
+        self.folds = folds          # [(HistGradientBoostingClassifier, IsotonicRegression)]
+        self.feature_names = feature_names
+        self.seen = seen            # [np.ndarray of uint64 row hashes] or None
+
+    def predict_proba(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_names].to_numpy(dtype=np.float32)
+        p = np.zeros(len(X), dtype=np.float64)
+        for est, iso in self.folds:
+            p += iso.predict(est.decision_function(X))
+        p /= len(self.folds)
+        return np.column_stack([1.0 - p, p])
+
 class AnomalyModel:
-    def __init__(self, contamination: float = 0.02):
-        self.model = IsolationForest(n_estimators=300, contamination=contamination, random_state=42)
+    """
+    IsolationForest with normalization fixed at training time: a score is
+    the fraction of training rows that were less anomalous, so values from
+    different batches (and processes) are directly comparable.
+    """
+    REFERENCE_POINTS = 1001
+    # Below this many rows per worker, scoring in one call is faster than splitting
+    MIN_CHUNK_ROWS = 2048
+
+    def __init__(self, contamination: float = 0.02, n_jobs: Optional[int] = ANOMALY_N_JOBS):
+        self.model = IsolationForest(n_estimators=300, contamination=contamination, random_state=42, n_jobs=n_jobs)
+        self.feature_names: Optional[list] = None
+        self.reference: Optional[np.ndarray] = None
 
     def fit(self, X: pd.DataFrame) -> None:
         self.model.fit(X)
+        self.feature_names = list(X.columns)
+        raw = -self.model.decision_function(X)
+        self.reference = np.quantile(raw, np.linspace(0.0, 1.0, self.REFERENCE_POINTS))
+
+    def score_array(self, X: pd.DataFrame) -> np.ndarray:
+        """Anomaly percentile in [0, 1] relative to the training distribution."""
+        if self.feature_names is not None:
+            X = X[self.feature_names]
+        raw = -self._decision_function(X)
+        if self.reference is None:
+            # Fitted outside `fit` (older artifact): fall back to per-batch scaling.
+            return (raw - raw.min()) / (raw.max() - raw.min() + 1e-9)
+        return np.searchsorted(self.reference, raw, side="right") / len(self.reference)
+
+    def _decision_function(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        IsolationForest.decision_function, with the rows split into one
+        chunk per job and scored on threads: score_samples ignores n_jobs,
+        but the tree traversal releases the GIL.
+        """
+        n_chunks = min(effective_n_jobs(self.model.n_jobs), len(X) // self.MIN_CHUNK_ROWS)
+        if n_chunks <= 1:
+            return self.model.decision_function(X)
+        bounds = np.linspace(0, len(X), n_chunks + 1, dtype=np.int64)
+        parts = Parallel(n_jobs=n_chunks, prefer="threads")(
+            delayed(self.model.decision_function)(X.iloc[lo:hi] if isinstance(X, pd.DataFrame) else X[lo:hi])
+            for lo, hi in zip(bounds[:-1], bounds[1:])
+        )
+        return np.concatenate(parts)
 
     def score(self, X: pd.DataFrame) -> pd.DataFrame:
-        raw = -self.model.decision_function(X)
-        scaled = (raw - raw.min()) / (raw.max() - raw.min() + 1e-9)
+        scaled = self.score_array(X)
         out = X.copy()
         out["anomaly_score"] = (scaled * 100.0).round(2)
         out["confidence"] = scaled.round(4)
         return out
+
+    def save(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump(self, path)
+        return path
+
+def load_anomaly_model(path: str = ANOMALY_MODEL_PATH, mmap: bool = False) -> Optional[AnomalyModel]:
+    """
+    The trained anomaly model from the process-wide registry (loaded on
+    first use, reloaded when the artifact changes), or None if not trained.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    model = registry.get(path, mmap=mmap)
+    if ANOMALY_N_JOBS is not None:
+        model.model.n_jobs = ANOMALY_N_JOBS
+    return model
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Optional
+
+from app.ai.keywords import KeywordAutomaton
+from app.core.config import INSIGHT_EVIDENCE_LIMIT
+
+
+class KeywordIndex:
+    """
+    Sorted occurrence positions for a group of keywords in one text.
+    Answers "does any keyword lie entirely inside text[lo:hi]" in O(log m).
+    """
+
+    def __init__(self, text_lower: str, keywords: Iterable[str]):
+        self._occurrences: List[tuple[int, List[int]]] = []
+        for kw in keywords:
+            positions = []
+            q = text_lower.find(kw)
+            while q != -1:
+                positions.append(q)
+                q = text_lower.find(kw, q + 1)
+            if positions:
+                self._occurrences.append((len(kw), positions))
+
+    def first_end_from(self, lo: int) -> float:
+        """Smallest end offset of a keyword occurrence starting at or after `lo`."""
+        best = float("inf")
+        for length, positions in self._occurrences:
+            k = bisect_left(positions, lo)
+            if k < len(positions):
+                best = min(best, positions[k] + length)
+        return best
+
+    @classmethod
+    def from_positions(cls, occurrences: Dict[str, List[int]]) -> "KeywordIndex":
+        index = cls("", ())
+        index._occurrences = [(len(kw), positions) for kw, positions in occurrences.items() if positions]
+        return index
+
+    def contains(self, lo: int, hi: int) -> bool:
+        return self.first_end_from(lo) <= hi
+
+
+class KeywordStream:
+    """
+    Finds keywords across consecutive chunks of lowercased text with one
+    `KeywordAutomaton` pass per chunk. Every keyword tracked is counted.
+    Occurrences are recorded for `positional` keywords (until `prune`
+    drops the ones no relationship can use) and the first `limit` for
+    `limited` keywords; `presence` keywords only record that they occurred.
+    Offsets within len(longest keyword) - 1 chars of the end of the text
+    seen so far are carried over and scanned with the next chunk; call
+    `close` after the last one.
+    """
+
+    def __init__(self, positional: Iterable[str] = (), presence: Iterable[str] = (), limited: Iterable[str] = (),
+                 limit: int = INSIGHT_EVIDENCE_LIMIT):
+        self.positions: Dict[str, List[int]] = {kw: [] for kw in positional}
+        self.first: Dict[str, List[int]] = {kw: [] for kw in limited}
+        self.counts: Dict[str, int] = dict.fromkeys(chain(self.positions, self.first), 0)
+        self.limit = limit
+        self.present: set = set()
+        self._automaton = KeywordAutomaton(chain(self.counts, presence))
+        self._buf = ""
+        self._base = 0
+        # positions[kw][:_decided[kw]] survived `prune`; _previous[kw] is the occurrence before the rest
+        self._decided = dict.fromkeys(self.positions, 0)
+        self._previous = dict.fromkeys(self.positions, -1)
+
+    def feed(self, chunk_lower: str) -> None:
+        self._buf += chunk_lower
+        # Every keyword starting before `final` fits in the buffer already.
+        final = len(self._buf) - max(self._automaton.max_len - 1, 0)
+        if final > 0:
+            self._scan(final)
+
+    def close(self) -> None:
+        self._scan(len(self._buf))
+
+    def _scan(self, stop: int) -> None:
+        for pos, kw in self._automaton.iter_matches(self._buf, stop):
+            count = self.counts.get(kw)
+            if count is None:
+                self.present.add(kw)
+                continue
+            self.counts[kw] = count + 1
+            positions = self.positions.get(kw)
+            if positions is not None:
+                positions.append(self._base + pos)
+            first = self.first.get(kw)
+            if first is not None and len(first) < self.limit:
+                first.append(self._base + pos)
+        self._buf = self._buf[stop:]
+        self._base += stop
+
+    def prune(self, mentions: List[int], scanned: int, context: int) -> None:
+        """
+        Drops positional occurrences `RelationshipReasoner` will never look
+        up. It asks, per keyword, for the first occurrence at or after
+        max(0, m - `context`) of each entity's first mention m, so an
+        occurrence is needed only if such a point lies between it and the
+        keyword's previous occurrence. `mentions` are the sorted first
+        mentions found so far, all of them before `scanned`; later ones are
+        at or after it, so occurrences before scanned - context are decided.
+        """
+        stop = scanned - context
+        for kw, positions in self.positions.items():
+            i = self._decided[kw]
+            prev = self._previous[kw]
+            kept = positions[:i]
+            while i < len(positions) and positions[i] < stop:
+                p = positions[i]
+                k = bisect_right(mentions, prev + context) if prev >= 0 else 0
+                if k < len(mentions) and mentions[k] <= p + context:
+                    kept.append(p)
+                prev = p
+                i += 1
+            if i > self._decided[kw]:
+                self.positions[kw] = kept + positions[i:]
+                self._decided[kw] = len(kept)
+                self._previous[kw] = prev
+
+    def hits(self) -> set:
+        return self.present | {kw for kw, count in self.counts.items() if count}
+
+
+@dataclass
+class RelationshipRule:
+    basis: str
+    strength_score: float
+    confidence_score: float
+    keywords: tuple = ()
+
+
+FINANCIAL_RULE = RelationshipRule("Financial Transfer detected between entities", 90.0, 85.0, ("transfer", "money", "$"))
+COMMUNICATION_RULE = RelationshipRule("Suspicious communication pattern", 95.0, 90.0, ("reported", "threatening", "text message"))
+PROXIMITY_RULE = RelationshipRule("Entity Co-occurrence (High Proximity)", 60.0, 65.0)
+NARRATIVE_RULE = RelationshipRule("Co-occurrence in Incident Narrative", 75.0, 70.0, ("altercation", "incident"))
+
+
+class RelationshipReasoner:
+    """
+    Offset-driven replacement for the all-pairs relationship loop.
+
+    A pair is judged on the first mention of each entity, with a keyword
+    context window of `context` chars on either side, as before. The first
+    mention is now where the scanner first matched the entity, not
+    `text.find(label)`: the two differ when the label also occurs earlier
+    inside a longer token (a phone number within a longer digit run), and
+    only the scanner offset is available to `reason_from_stream`.
+    Because the window always spans both mentions, every keyword rule
+    reduces to a position threshold per entity, so only qualifying pairs
+    are ever enumerated: those inside the proximity window, plus those past
+    the nearest keyword. The only exception is a narrative document, where
+    every pair qualifies by definition.
+    """
+
+    def __init__(
+        self,
+        context: int = 100,
+        proximity: int = 500,
+        keyword_rules: Optional[List[RelationshipRule]] = None,
+        proximity_rule: RelationshipRule = PROXIMITY_RULE,
+        narrative_rule: RelationshipRule = NARRATIVE_RULE,
+    ):
+        self.context = context
+        self.proximity = proximity
+        self.keyword_rules = keyword_rules if keyword_rules is not None else [FINANCIAL_RULE, COMMUNICATION_RULE]
+        self.proximity_rule = proximity_rule
+        self.narrative_rule = narrative_rule
+
+    @staticmethod
+    def _first_mention(entity: Dict[str, Any], text: str) -> int:
+        """Start of the entity's first scanner match; `text.find` only for entities without offsets."""
+        offsets = entity.get("offsets")
+        if offsets:
+            return offsets[0][0]
+        return text.find(entity["label"])
+
+    def positional_keywords(self) -> set:
+        return {kw for rule in self.keyword_rules for kw in rule.keywords}
+
+    def reason(self, entities: List[Dict[str, Any]], text: str) -> List[Dict[str, Any]]:
+        text_lower = text.lower()
+        indexes = [KeywordIndex(text_lower, rule.keywords) for rule in self.keyword_rules]
+        narrative = any(kw in text_lower for kw in self.narrative_rule.keywords)
+        return self._reason(entities, indexes, narrative, len(text), text)
+
+    def reason_from_stream(self, entities: List[Dict[str, Any]], keywords: KeywordStream, n_text: int) -> List[Dict[str, Any]]:
+        """
+        Same result as `reason` on the full text, from a `KeywordStream` that
+        tracked `positional_keywords()` and the narrative keywords. Entities
+        must carry offsets.
+        """
+        indexes = [
+            KeywordIndex.from_positions({kw: keywords.positions.get(kw, []) for kw in rule.keywords})
+            for rule in self.keyword_rules
+        ]
+        hits = keywords.hits()
+        narrative = any(kw in hits for kw in self.narrative_rule.keywords)
+        return self._reason(entities, indexes, narrative, n_text)
+
+    def _reason(self, entities: List[Dict[str, Any]], indexes: List[KeywordIndex], narrative: bool,
+                n_text: int, text: str = "") -> List[Dict[str, Any]]:
+        # (position, entity index), skipping labels that never occur in the text
+        mentions = []
+        for i, e in enumerate(entities):
+            p = self._first_mention(e, text)
+            if p != -1:
+                mentions.append((p, i))
+        mentions.sort()
+        positions = [p for p, _ in mentions]
+
+        found = []
+        for k, (pa, i) in enumerate(mentions):
+            lo = max(0, pa - self.context)
+            # Per rule: the smallest partner position whose window reaches a keyword.
+            thresholds = [idx.first_end_from(lo) - self.context for idx in indexes]
+            near_end = bisect_left(positions, pa + self.proximity, k + 1)
+            if narrative:
+                far_start = near_end
+            else:
+                first_hit = min(thresholds, default=float("inf"))
+                far_start = max(near_end, bisect_left(positions, first_hit, k + 1))
+
+            for m in chain(range(k + 1, near_end), range(far_start, len(mentions))):
+                pb, j = mentions[m]
+                rule = None
+                for r, t in zip(self.keyword_rules, thresholds):
+                    if pb >= t and t + self.context <= n_text:
+                        rule = r
+                        break
+                if rule is None:
+                    if pb - pa < self.proximity:
+                        rule = self.proximity_rule
+                    elif narrative:
+                        rule = self.narrative_rule
+                    else:
+                        continue
+                src, tgt = (i, j) if i < j else (j, i)
+                found.append((src, tgt, rule))
+
+        found.sort(key=lambda f: (f[0], f[1]))
+        return [
+            {
+                "source_label": entities[src]["label"],
+                "target_label": entities[tgt]["label"],
+                "basis": rule.basis,
+                "strength_score": rule.strength_score,
+                "confidence_score": rule.confidence_score,
+            }
+            for src, tgt, rule in found
+        ]
@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import heapq
+import re
+from bisect import insort
+from dataclasses import dataclass, field
+from typing import Iterator, List, Dict, Any, Optional
+
+# `re`'s parser is private, so the first-character analysis below only ever
+# narrows which rules share a pass: if the parser is missing or its API has
+# changed, every rule gets a pass of its own and the matches are the same.
+try:
+    try:
+        from re import _parser as sre_parse
+    except ImportError:  # Python < 3.11
+        import sre_parse
+    _CATEGORIES = {
+        sre_parse.CATEGORY_DIGIT: r"\d", sre_parse.CATEGORY_NOT_DIGIT: r"\D",
+        sre_parse.CATEGORY_SPACE: r"\s", sre_parse.CATEGORY_NOT_SPACE: r"\S",
+        sre_parse.CATEGORY_WORD: r"\w", sre_parse.CATEGORY_NOT_WORD: r"\W",
+    }
+    _REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)}
+except (ImportError, AttributeError):
+    sre_parse = None
+
+# Running text is mostly lowercase words; a pass whose first character
+# excludes these is skipped over inside the regex engine.
+_PROSE = "abcdefghijklmnopqrstuvwxyz "
+
+
+def _boundary_anchored(regex: str) -> bool:
+    """True if `regex` is `\\b` followed by an expression with no top-level `|`."""
+    if not regex.startswith(r"\b"):
+        return False
+    depth, in_class, i = 0, False, 2
+    while i < len(regex):
+        ch = regex[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+            if regex[i + 1:i + 2] == "]":
+                i += 1
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return False
+        i += 1
+    return True
+
+
+def _class_items(items) -> Optional[set]:
+    parts = set()
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            parts.add(re.escape(chr(av)))
+        elif op is sre_parse.RANGE:
+            parts.add(f"{re.escape(chr(av[0]))}-{re.escape(chr(av[1]))}")
+        elif op is sre_parse.CATEGORY and av in _CATEGORIES:
+            parts.add(_CATEGORIES[av])
+        else:
+            return None
+    return parts
+
+
+def _first_items(items) -> tuple[Optional[set], bool]:
+    """
+    Class parts covering every character a parsed expression can start
+    with (None when unknown), and whether it can match the empty string.
+    """
+    parts = set()
+    for op, av in items:
+        if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            continue
+        if op is sre_parse.LITERAL:
+            return parts | {re.escape(chr(av))}, False
+        if op is sre_parse.IN:
+            sub = _class_items(av)
+            return (None if sub is None else parts | sub), False
+        if op is sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            sub, nullable = _first_items(av[-1])
+        elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+            sub, nullable = _first_items(av)
+        elif op is sre_parse.BRANCH:
+            sub, nullable = set(), False
+            for alt in av[1]:
+                alt_parts, alt_nullable = _first_items(alt)
+                if alt_parts is None:
+                    return None, False
+                sub |= alt_parts
+                nullable = nullable or alt_nullable
+        elif op in _REPEATS:
+            sub, nullable = _first_items(av[2])
+            nullable = nullable or av[0] == 0
+        else:
+            return None, False
+        if sub is None:
+            return None, False
+        parts |= sub
+        if not nullable:
+            return parts, False
+    return parts, True
+
+
+def _first_char_class(regex: str, flags: int = 0) -> Optional[str]:
+    """
+    A character class ("[...]") holding every character a match of `regex`
+    can start with, or None when that cannot be worked out (or the regex
+    can match the empty string, or the private parser is unavailable).
+    """
+    if sre_parse is None:
+        return None
+    try:
+        parts, nullable = _first_items(sre_parse.parse(regex, flags))
+        if parts is None or nullable or not parts:
+            return None
+        first = "[" + "".join(sorted(parts)) + "]"
+        re.compile(first, flags)
+    except Exception:  # parser internals changed shape
+        return None
+    return first
+
+
+@dataclass
+class EntityPattern:
+    """
+    A single entity rule. `regex` is embedded in the scanner's combined
+    expression, so it must not rely on numbered backreferences.
+    """
+    name: str
+    regex: str
+    entity_type: str
+    risk_score: float = 0.0
+    confidence_score: float = 0.0
+    stopwords: frozenset = field(default_factory=frozenset)
+
+
+@dataclass
+class EntityMatch:
+    pattern: EntityPattern
+    label: str
+    start: int
+    end: int
+
+
+class EntityScanner:
+    """
+    Finds every registered entity rule in as few regex passes as possible.
+
+    Rules whose matches cannot start with a lowercase letter or a space
+    (names, dates, phones, IDs) share one pass. It stops only at characters
+    those rules can start with, which the regex engine skips to without
+    leaving C, and each rule sits in its own capturing lookahead there, so
+    rules can overlap (an address containing a name, a name followed by a
+    date). Rules that can start anywhere in running text (emails) get a
+    plain pass each. Per rule, matches are non-overlapping, which keeps
+    results identical to running `re.finditer` once per pattern.
+    """
+
+    def __init__(self, patterns: Optional[List[EntityPattern]] = None, flags: int = 0):
+        self.flags = flags
+        self._patterns: List[EntityPattern] = []
+        self._passes: Optional[List[tuple[re.Pattern, List[tuple[int, int, EntityPattern]]]]] = None
+        for p in patterns or []:
+            self.register(p)
+
+    @property
+    def patterns(self) -> List[EntityPattern]:
+        return list(self._patterns)
+
+    def register(self, pattern: EntityPattern) -> None:
+        if any(p.name == pattern.name for p in self._patterns):
+            raise ValueError(f"Pattern '{pattern.name}' already registered")
+        re.compile(pattern.regex, self.flags)  # fail fast on a bad rule
+        self._patterns.append(pattern)
+        self._passes = None
+
+    def _compile(self) -> List[tuple[re.Pattern, List[tuple[int, int, EntityPattern]]]]:
+        """Regex passes, each with its (capture group, rule index, rule) slots; group 0 is a rule on its own."""
+        if self._passes is None:
+            shared, passes = [], []
+            for i, p in enumerate(self._patterns):
+                first = _first_char_class(p.regex, self.flags)
+                if first is not None and not re.search(first, _PROSE, self.flags):
+                    shared.append((i, p, first))
+                else:
+                    passes.append((re.compile(p.regex, self.flags), [(0, i, p)]))
+            if shared:
+                passes.insert(0, self._shared_pass(shared))
+            self._passes = passes
+        return self._passes
+
+    def _shared_pass(self, rules: List[tuple[int, EntityPattern, str]]) -> tuple[re.Pattern, list]:
+        # The pass consumes one character from the union of the rules' first
+        # characters, then looks behind it to test the rules at its offset.
+        # Prefilter: only stop where at least one rule matches. Rules anchored
+        # on a word boundary share a single `\b` test.
+        first = "[" + "".join(dict.fromkeys(cls[1:-1] for _, _, cls in rules)) + "]"
+        groups = [re.compile(p.regex, self.flags).groups for _, p, _ in rules]
+        bounded = [p.regex[2:] for _, p, _ in rules if _boundary_anchored(p.regex)]
+        branches = [f"(?:{p.regex})" for _, p, _ in rules if not _boundary_anchored(p.regex)]
+        if bounded:
+            branches.insert(0, r"\b(?:" + "|".join(f"(?:{r})" for r in bounded) + ")")
+        prefilter = "(?<=(?=" + "|".join(branches) + ").)"
+        index = 1 + sum(groups)
+        slots, parts = [], []
+        for (i, p, _), n in zip(rules, groups):
+            slots.append((index, i, p))
+            parts.append(f"(?:(?<=(?=({p.regex})).))?")
+            index += 1 + n
+        return re.compile(first + prefilter + "".join(parts), self.flags), slots
+
+    @staticmethod
+    def _run(compiled: re.Pattern, slots: list, text: str, pos: int, stop: int,
+             last_end: List[int], base: int) -> Iterator[EntityMatch]:
+        if slots[0][0] == 0:
+            # A rule on its own resumes right after its previous match, like re.finditer
+            _, i, p = slots[0]
+            for m in compiled.finditer(text, max(pos, last_end[i] - base)):
+                start, end = m.span()
+                if start >= stop:
+                    break
+                last_end[i] = base + end
+                label = m.group()
+                if label not in p.stopwords:
+                    yield EntityMatch(pattern=p, label=label, start=base + start, end=base + end)
+            return
+        for m in compiled.finditer(text, pos):
+            if m.start() >= stop:
+                break
+            start = base + m.start()
+            groups = m.groups()
+            for group, i, p in slots:
+                if start < last_end[i]:
+                    continue
+                label = groups[group - 1]
+                if label is None:
+                    continue
+                end = start + len(label)
+                last_end[i] = end
+                if label in p.stopwords:
+                    continue
+                yield EntityMatch(pattern=p, label=label, start=start, end=end)
+
+    def _matches(self, text: str, pos: int, stop: int, last_end: List[int], base: int = 0) -> Iterator[EntityMatch]:
+        """
+        Matches starting in text[pos:stop], pass by pass; `base` is the
+        document offset of text[0] and `last_end` the per-rule end of the
+        previous match.
+        """
+        for compiled, slots in self._compile():
+            yield from self._run(compiled, slots, text, pos, stop, last_end, base)
+
+    def finditer(self, text: str) -> Iterator[EntityMatch]:
+        """All matches in offset order."""
+        last_end = [0] * len(self._patterns)
+        runs = [self._run(compiled, slots, text, 0, len(text), last_end, 0) for compiled, slots in self._compile()]
+        return heapq.merge(*runs, key=lambda m: m.start)
+
+    @staticmethod
+    def _collect(found: Dict[tuple, Dict[str, Any]], match: EntityMatch) -> None:
+        key = (match.pattern.name, match.label)
+        entity = found.get(key)
+        if entity is None:
+            entity = found[key] = {
+                "label": match.label,
+                "type": match.pattern.entity_type,
+                "risk_score": match.pattern.risk_score,
+                "confidence_score": match.pattern.confidence_score,
+                "pattern": match.pattern.name,
+                "offsets": [],
+            }
+        entity["offsets"].append((match.start, match.end))
+
+    def _ordered(self, found: Dict[tuple, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        order = {p.name: i for i, p in enumerate(self._patterns)}
+        return sorted(found.values(), key=lambda e: (order[e["pattern"]], e["offsets"][0][0]))
+
+    def scan(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Returns one entity dict per distinct (pattern, label), with every
+        mention offset. Entities are grouped by pattern registration order,
+        then ordered by first mention.
+        """
+        found: Dict[tuple, Dict[str, Any]] = {}
+        for match in self._matches(text, 0, len(text), [0] * len(self._patterns)):
+            self._collect(found, match)
+        return self._ordered(found)
+
+    def stream(self, overlap: int = 1024) -> "ScanStream":
+        return ScanStream(self, overlap)
+
+
+class ScanStream:
+    """
+    Incremental `EntityScanner.scan` over consecutive chunks of a document.
+
+    Offsets are only scanned once at least `overlap` chars follow them, so
+    a mention split across chunks is still seen whole; memory is bounded by
+    the chunk size plus `overlap`. Results equal a one-shot scan of the
+    concatenated chunks as long as no single match is longer than `overlap`.
+    """
+
+    # Chars kept before the scan position, for `\b` and similar look-behinds.
+    CONTEXT = 64
+
+    def __init__(self, scanner: EntityScanner, overlap: int = 1024):
+        self.scanner = scanner
+        self.overlap = overlap
+        self._found: Dict[tuple, Dict[str, Any]] = {}
+        self._last_end = [0] * len(scanner.patterns)
+        self._buf = ""
+        self._base = 0  # document offset of _buf[0]
+        self._pos = 0   # next unscanned index in _buf
+        self.first_mentions: List[int] = []  # sorted start offsets of each entity's first mention
+
+    def feed(self, chunk: str) -> None:
+        self._buf += chunk
+        self._advance(len(self._buf) - self.overlap)
+
+    def close(self) -> List[Dict[str, Any]]:
+        self._advance(len(self._buf))
+        return self.scanner._ordered(self._found)
+
+    @property
+    def scanned(self) -> int:
+        """Document offset before which every match has been found."""
+        return self._base + self._pos
+
+    def _advance(self, stop: int) -> None:
+        if stop <= self._pos:
+            return
+        for match in self.scanner._matches(self._buf, self._pos, stop, self._last_end, self._base):
+            known = len(self._found)
+            self.scanner._collect(self._found, match)
+            if len(self._found) > known:
+                insort(self.first_mentions, match.start)
+        keep = max(0, stop - self.CONTEXT)
+        self._buf = self._buf[keep:]
+        self._base += keep
+        self._pos = stop - keep
+
+
+NAME_STOPWORDS = frozenset([
+    "Date", "Name", "Sex", "Age", "DOB", "Eyes", "Hair", "Teeth", "Medical Examiner", "Incident Report"
+])
+
+DEFAULT_PATTERNS = [
+    # 1. Names (Allowing some flexibility in capitalization for discovery)
+    EntityPattern("name", r"\b[A-Z][A-Za-z]+ [A-Z][A-Za-z]+\b", "person", 0.0, 85.0, NAME_STOPWORDS),
+    # 2. Addresses (mapped to existing types)
+    EntityPattern("address", r"\d+ [A-Z][a-z]+ (?:Ave|St|Rd|Blvd|Drive)", "ip", 0.0, 90.0),
+    # 3. Dates (Forensic Timeline)
+    EntityPattern("date", r"\b(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|[A-Z][a-z]+ \d{1,2}, \d{4})\b", "unknown", 0.0, 95.0),
+    # 4. Phone Numbers
+    EntityPattern(
+        "phone",
+        r"\b(?:\d{3}[-.\s]??\d{3}[-.\s]??\d{4}|\(\d{3}\)\s*\d{3}[-.\s]??\d{4}|\+\d{1,3}[-.\s]??\d{3}[-.\s]??\d{3}[-.\s]??\d{4})\b",
+        "phone", 10.0, 90.0,
+    ),
+    # 5. IP Addresses (High risk for digital forensics)
+    EntityPattern("ip", r"\b(?:\d{1,3}\.){3}\d{1,3}\b", "ip", 25.0, 98.0),
+    # 6. Emails (mapped to person/account for now)
+    EntityPattern("email", r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b", "person", 5.0, 95.0),
+    # 7. Forensic Case IDs (e.g., DF-2026-091)
+    EntityPattern("case_id", r"\b[A-Z]{2,4}-\d{4}-\d{2,4}\b", "other", 0.0, 100.0),
+    # 8. Financial IDs (e.g., ACC-77821)
+    EntityPattern("account", r"\bACC-\d{4,10}\b", "other", 20.0, 98.0),
+]
+
+
+def default_scanner() -> EntityScanner:
+    return EntityScanner(DEFAULT_PATTERNS)
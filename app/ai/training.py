@@ -1,19 +1,194 @@
 from __future__ import annotations
+import copy
+import json
+import os
+import resource
+import time
+from datetime import datetime
+
 import joblib
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from joblib import Parallel, delayed
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.metrics import roc_auc_score
 from sklearn.ensemble import HistGradientBoostingClassifier
-from sklearn.calibration import CalibratedClassifierCV
+from sklearn.isotonic import IsotonicRegression
+from threadpoolctl import threadpool_limits
+
+from app.ai.drift import PSI_SIGNIFICANT, DriftReference, reference_path
+from app.ai.models import AnomalyModel, CalibratedLinkModel
+from app.core.config import LINK_MODEL_MAX_ITER
+from app.ingest.pdf_text import file_sha256
+
+LINK_MODEL_PARAMS = {"max_depth": 6, "learning_rate": 0.08}
+
+def _fit_fold(X: np.ndarray, y: np.ndarray, train: np.ndarray, calib: np.ndarray,
+              previous: HistGradientBoostingClassifier | None, extra_iter: int, threads: int):
+    if previous is not None:
+        # Keep the previous trees (and feature binning) and add `extra_iter` more on the new data.
+        est = copy.deepcopy(previous)
+        est.set_params(warm_start=True, max_iter=previous.n_iter_ + extra_iter)
+    else:
+        est = HistGradientBoostingClassifier(**LINK_MODEL_PARAMS)
+    with threadpool_limits(limits=threads):
+        est.fit(X[train], y[train])
+        scores = est.decision_function(X[calib])
+    iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(scores, y[calib])
+    # ru_maxrss of this worker, so the parent can report the run's footprint
+    return est, iso, os.getpid(), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _row_keys(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Stable 64-bit hash of each (features, label) row, to recognise rows across runs."""
+    frame = pd.DataFrame(X)
+    frame["label"] = y
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+def _previous_folds(path: str, X: pd.DataFrame, cv: int, extra_iter: int) -> tuple[list | None, str | None]:
+    """
+    (booster, seen row hashes) of each fold of the model at `path` to
+    continue, or None and the reason a fresh fit is needed: no compatible
+    model, no record of the rows it was trained on, too many iterations
+    already, or training data that drifted from the data it was fitted on.
+    """
+    if not os.path.exists(path):
+        return None, "no previous model"
+    prev = joblib.load(path)
+    if not isinstance(prev, CalibratedLinkModel) or prev.feature_names != list(X.columns) or len(prev.folds) != cv:
+        return None, "features or folds changed"
+    seen = getattr(prev, "seen", None)
+    if seen is None:
+        return None, "previous model has no record of its training rows"
+    boosters = [est for est, _ in prev.folds]
+    if max(est.n_iter_ for est in boosters) + extra_iter > LINK_MODEL_MAX_ITER:
+        return None, f"iterations would exceed {LINK_MODEL_MAX_ITER}"
+    ref_path = reference_path(path)
+    if not os.path.exists(ref_path):
+        return None, "no drift reference"
+    ref = DriftReference.load(ref_path)
+    # The boosters' feature binning was fitted on the old data; it only fits new data from the same distribution
+    if ref.psi(ref.bin_counts(X)).max() >= PSI_SIGNIFICANT:
+        return None, "training data drifted"
+    return list(zip(boosters, seen)), None
+
+def _unseen(rows: np.ndarray, keys: np.ndarray, seen: np.ndarray) -> np.ndarray:
+    return rows[~np.isin(keys[rows], seen)]
 
-def train_link_strength(X: pd.DataFrame, y: pd.Series, out_path: str) -> dict:
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
+def _peak_rss_mb(worker_peaks: dict) -> float:
+    """
+    Upper bound on the run's peak RSS: the peak of this process plus the
+    peak of each fold worker (ru_maxrss is in KiB on Linux). The peaks are
+    not necessarily simultaneous, so the true combined peak can be lower.
+    Pool workers outlive the run, so RUSAGE_CHILDREN only covers workers
+    that have exited; the larger of the two is used.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    reaped = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    workers = sum(kib for pid, kib in worker_peaks.items() if pid != os.getpid())
+    return (own + max(workers, reaped)) / 1024
+
+def _append_manifest(path: str, entry: dict) -> dict:
+    manifest = {"model": "link_strength", "versions": []}
+    if os.path.exists(path):
+        with open(path) as fh:
+            manifest = json.load(fh)
+    entry["version"] = len(manifest["versions"]) + 1
+    manifest["versions"].append(entry)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, path)
+    return entry
+
+def train_link_strength(X: pd.DataFrame, y: pd.Series, out_path: str, cv: int = 3, n_jobs: int = -1,
+                        warm_start: bool = False, extra_iter: int = 100, manifest_path: str | None = None) -> dict:
+    """
+    Fits the link-strength model. X is converted once to a float32 array
+    that every fold reads from; the calibration folds run in parallel worker
+    processes, with OpenMP threads shared out between them. With
+    `warm_start`, each fold continues the matching fold of the model already
+    at `out_path`, unless `_previous_folds` finds a reason to refit; the
+    continued folds are calibrated, and the AUC measured, only on rows the
+    previous boosters never trained on, and a fold without both classes
+    among those rows forces a refit. Every run is recorded in a versioned
+    JSON manifest next to the artifact: seconds, an upper bound on peak
+    RSS, AUC and the artifact's sha256.
+    """
+    started = time.perf_counter()
+    feature_names = list(X.columns)
+    Xa = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+    ya = np.asarray(y, dtype=np.int8)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(ya)), test_size=0.2, random_state=42, stratify=ya
     )
-    base = HistGradientBoostingClassifier(max_depth=6, learning_rate=0.08)
-    clf = CalibratedClassifierCV(base, method="isotonic", cv=3)
-    clf.fit(X_train, y_train)
-    probs = clf.predict_proba(X_test)[:, 1]
-    auc = roc_auc_score(y_test, probs)
-    joblib.dump(clf, out_path)
-    return {"auc": float(auc), "model_path": out_path}
+
+    keys = _row_keys(Xa, ya)
+    splits = [
+        (train_idx[fit], train_idx[calib])
+        for fit, calib in StratifiedKFold(n_splits=cv, shuffle=True, random_state=42).split(train_idx, ya[train_idx])
+    ]
+
+    previous, refit_reason = _previous_folds(out_path, X, cv, extra_iter) if warm_start else (None, None)
+    calibs, test = [calib for _, calib in splits], test_idx
+    if previous is not None:
+        # Continued boosters are calibrated and scored only on rows none of their generations trained on
+        warm_calibs = [_unseen(calib, keys, seen) for (_, calib), (_, seen) in zip(splits, previous)]
+        warm_test = _unseen(test_idx, keys, np.concatenate([seen for _, seen in previous]))
+        if all(len(np.unique(ya[rows])) == 2 for rows in [*warm_calibs, warm_test]):
+            calibs, test = warm_calibs, warm_test
+        else:
+            previous, refit_reason = None, "too few rows the previous model never saw"
+    previous_version = None
+    if previous is not None:
+        previous_version = file_sha256(out_path)
+    n_workers = min(cv, os.cpu_count() or 1) if n_jobs == -1 else max(1, min(cv, n_jobs))
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+    results = Parallel(n_jobs=n_workers)(
+        delayed(_fit_fold)(Xa, ya, fit, calib, previous[i][0] if previous else None, extra_iter, threads)
+        for i, ((fit, _), calib) in enumerate(zip(splits, calibs))
+    )
+    fitted = [(est, iso) for est, iso, _, _ in results]
+    seen = [
+        np.union1d(previous[i][1], keys[fit]) if previous else np.unique(keys[fit])
+        for i, (fit, _) in enumerate(splits)
+    ]
+    worker_peaks = {}
+    for _, _, pid, kib in results:
+        worker_peaks[pid] = max(worker_peaks.get(pid, 0), kib)
+    clf = CalibratedLinkModel(fitted, feature_names, seen)
+    probs = clf.predict_proba(Xa[test])[:, 1]
+    auc = roc_auc_score(ya[test], probs)
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp = f"{out_path}.tmp"
+    joblib.dump(clf, tmp)
+    os.replace(tmp, out_path)
+    DriftReference.from_frame(X).save(reference_path(out_path))
+    seconds = time.perf_counter() - started
+    peak_mb = _peak_rss_mb(worker_peaks)
+    entry = _append_manifest(manifest_path or f"{os.path.splitext(out_path)[0]}.manifest.json", {
+        "trained_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "sha256": file_sha256(out_path),
+        "warm_start_from": previous_version,
+        "refit_reason": refit_reason,
+        "rows": int(len(ya)),
+        "positives": int(ya.sum()),
+        "features": feature_names,
+        "params": {**LINK_MODEL_PARAMS, "cv": cv, "extra_iter": extra_iter if previous else None,
+                   "max_iter_cap": LINK_MODEL_MAX_ITER},
+        "n_iter": [int(est.n_iter_) for est, _ in fitted],
+        "calibration_rows": [int(len(calib)) for calib in calibs],
+        "test_rows": int(len(test)),
+        "auc": float(auc),
+        "seconds": round(seconds, 3),
+        "peak_rss_mb_upper_bound": round(peak_mb, 1),
+    })
+    return {"auc": float(auc), "model_path": out_path, "version": entry["version"], "seconds": entry["seconds"],
+            "peak_rss_mb_upper_bound": entry["peak_rss_mb_upper_bound"], "warm_start": previous is not None}
+
+def train_anomaly_model(X: pd.DataFrame, out_path: str, contamination: float = 0.02, n_jobs: int = -1) -> dict:
+    model = AnomalyModel(contamination=contamination, n_jobs=n_jobs)
+    model.fit(X)
+    model.save(out_path)
+    DriftReference.from_frame(X).save(reference_path(out_path))
+    return {"rows": int(len(X)), "features": model.feature_names, "model_path": out_path}
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from datetime import datetime
 from uuid import UUID
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db import models
-from app.db.schemas import CaseOut, CaseCreate, CaseGraph, EvidenceOut
+from app.db.schemas import CaseOut, CaseCreate, CaseGraphPage, EvidenceOut
 from typing import List, Optional
 from app.core.security import require_clearance
 from app.services import case_service, audit_service, insight_service
 from app.api.deps import get_current_active_user
+from app.core.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from app.repositories.pagination import PageError
+from app.api.streaming import STREAM_PATTERN, graph_chunks, json_chunks, ndjson_chunks, stream_response
 
 router = APIRouter()
 
@@ -22,6 +26,24 @@ def create_case(payload: CaseCreate, request: Request, db: Session = Depends(get
     return new_case
 
 
+@router.get("/")
+def list_cases(
+    request: Request,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    fields: Optional[str] = Query(None, description="Comma-separated CaseOut fields"),
+    db: Session = Depends(get_db),
+    _=Depends(_guard),
+    user=Depends(get_current_active_user)
+):
+    try:
+        cases, next_cursor = case_service.list_cases(db, cursor, limit, fields)
+    except PageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    audit_service.log_action(db, user.user_id, "list_cases", "system", "all", ip_address=request.client.host)
+    return {"cases": cases, "next_cursor": next_cursor}
+
+
 @router.get("/summary")
 def cases_summary(request: Request, db: Session = Depends(get_db), _=Depends(_guard), user=Depends(get_current_active_user)):
     audit_service.log_action(db, user.user_id, "view_cases_summary", "system", "all", ip_address=request.client.host)
@@ -45,15 +67,52 @@ def case_stats(case_id: UUID, request: Request, db: Session = Depends(get_db), u
     }
 
 @router.get("/{case_id}/entities")
-def get_case_entities(case_id: UUID, request: Request, db: Session = Depends(get_db), user=Depends(get_current_active_user)):
-    entities = case_service.get_case_entities(db, case_id)
+def get_case_entities(
+    case_id: UUID,
+    request: Request,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    fields: Optional[str] = Query(None, description="Comma-separated: entity_id,label,type,role,confidence"),
+    stream: Optional[str] = Query(None, pattern=STREAM_PATTERN, description="Stream every entity after cursor as ndjson or json"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_active_user)
+):
+    try:
+        if stream:
+            batches = case_service.stream_case_entities(case_id, cursor, fields)
+        else:
+            entities, next_cursor = case_service.get_case_entity_page(db, case_id, cursor, limit, fields)
+    except PageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     audit_service.log_action(db, user.user_id, "view_case_entities", "case", str(case_id), case_id, request.client.host)
-    return {"case_id": case_id, "entities": entities}
+    if stream == "ndjson":
+        return stream_response(ndjson_chunks(batches), stream)
+    if stream:
+        return stream_response(json_chunks(batches, "entities", head={"case_id": case_id}), stream)
+    return {"case_id": case_id, "entities": entities, "next_cursor": next_cursor}
 
-@router.get("/{case_id}/graph", response_model=CaseGraph)
-def get_case_graph(case_id: UUID, request: Request, db: Session = Depends(get_db), user=Depends(get_current_active_user)):
+@router.get("/{case_id}/graph", response_model=CaseGraphPage)
+def get_case_graph(
+    case_id: UUID,
+    request: Request,
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX, description="Nodes and edges per page; the whole graph when neither this nor cursor is given"),
+    fields: Optional[str] = Query(None, description="Comma-separated node/edge fields; ids are always returned"),
+    stream: Optional[str] = Query(None, pattern=STREAM_PATTERN, description="Stream the whole graph, nodes first, as ndjson or json"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_active_user)
+):
     audit_service.log_action(db, user.user_id, "view_case_graph", "case", str(case_id), case_id, request.client.host)
-    return case_service.get_case_graph(db, case_id)
+    if stream:
+        return stream_response(graph_chunks(case_service.stream_case_graph(db, case_id), stream), stream)
+    if cursor is None and limit is None and fields is None:
+        # Pre-encoded by the graph store; returning a Response skips re-validating it against CaseGraphPage
+        return Response(content=case_service.get_case_graph_json(db, case_id), media_type="application/json")
+    try:
+        page = case_service.get_case_graph_page(db, case_id, cursor, limit or PAGE_SIZE_DEFAULT, fields)
+    except PageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(page)
 
 @router.get("/{case_id}/timeline", response_model=List[EvidenceOut])
 def get_case_timeline(
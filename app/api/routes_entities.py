@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from uuid import UUID
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db import models
-from app.db.schemas import EntityOut, EntityCreate, EvidenceOut, DataResponse, RelationshipOut
-from typing import List
+from app.db.schemas import EntityOut, EntityCreate, EvidenceOut, DataResponse, RelationshipOut, EntityNeighborhood, EntityPath, EntitySearchHit
+from app.core.config import SEARCH_LIMIT_MAX, TRAVERSAL_MAX_HOPS, TRAVERSAL_MAX_FANOUT
+from typing import List, Optional
 from app.services import entity_service
 from app.api.deps import get_current_active_user
 from app.services.audit_service import log_action
@@ -12,14 +13,26 @@ from app.services.audit_service import log_action
 router = APIRouter()
 
 @router.get("/search")
-def search_entities(request: Request, q: str = Query(..., min_length=1), db: Session = Depends(get_db), user=Depends(get_current_active_user)):
-    log_action(db, user.user_id, "search_entities", "query", q, ip_address=request.client.host)
-    rows = entity_service.search_entities(db, q)
+def search_entities(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    type: Optional[str] = Query(None, description="Only entities of this entity_type"),
+    case_id: Optional[UUID] = Query(None, description="Only entities linked into this case"),
+    fuzzy: bool = Query(True, description="Also match labels that only resemble the query"),
+    limit: int = Query(50, ge=1, le=SEARCH_LIMIT_MAX),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_active_user)
+):
+    """
+    Entities whose label starts with, contains or (with `fuzzy`) resembles `q`, best match first.
+    """
+    log_action(db, user.user_id, "search_entities", "query", q, case_id, request.client.host)
+    hits = entity_service.search_entities(db, q, limit, type, case_id, fuzzy)
     return {
         "query": q,
         "results": [
-            EntityOut.model_validate(r)
-            for r in rows
+            EntitySearchHit(**EntityOut.model_validate(e).model_dump(), score=score)
+            for e, score in hits
         ]
     }
 
@@ -71,3 +84,43 @@ def get_entity_connections(entity_id: UUID, request: Request, db: Session = Depe
             "entity_label": e.label
         }
     }
+
+@router.get("/{entity_id}/neighborhood", response_model=EntityNeighborhood)
+def get_entity_neighborhood(
+    entity_id: UUID,
+    request: Request,
+    case_id: UUID = Query(..., description="Case whose graph is traversed"),
+    hops: int = Query(2, ge=1, le=TRAVERSAL_MAX_HOPS),
+    max_fanout: int = Query(TRAVERSAL_MAX_FANOUT, ge=1, le=TRAVERSAL_MAX_FANOUT, description="Links followed per entity, strongest first"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_active_user)
+):
+    """
+    The entity's ego network in a case: every entity within `hops` links, with its distance, and the links between them.
+    """
+    result = entity_service.get_entity_neighborhood(db, entity_id, case_id, hops, max_fanout)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Entity not found in case graph")
+    log_action(db, user.user_id, "view_entity_neighborhood", "entity", str(entity_id), case_id, request.client.host)
+    return result
+
+@router.get("/{entity_id}/path/{target_id}", response_model=EntityPath)
+def get_entity_path(
+    entity_id: UUID,
+    target_id: UUID,
+    request: Request,
+    case_id: UUID = Query(..., description="Case whose graph is traversed"),
+    weighted: bool = Query(False, description="Strongest path by strength_score instead of fewest links"),
+    max_hops: int = Query(TRAVERSAL_MAX_HOPS, ge=1, le=TRAVERSAL_MAX_HOPS),
+    max_fanout: int = Query(TRAVERSAL_MAX_FANOUT, ge=1, le=TRAVERSAL_MAX_FANOUT, description="Links followed per entity, strongest first"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_active_user)
+):
+    """
+    Shortest path between two entities of a case graph, or with `weighted` the chain of links with the highest combined strength.
+    """
+    result = entity_service.find_entity_path(db, entity_id, target_id, case_id, weighted, max_hops, max_fanout)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Entity not found in case graph")
+    log_action(db, user.user_id, "view_entity_path", "entity", f"{entity_id}:{target_id}", case_id, request.client.host)
+    return result
@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from uuid import UUID
 from datetime import datetime
 
 from app.db.session import get_db
-from app.db.schemas import EvidenceCreate, EvidenceOut, DataResponse
-from typing import List
+from app.db.schemas import EvidenceCreate, EvidenceFieldsOut, EvidenceOut, DataResponse, PageResponse
+from typing import List, Optional
 from app.services import evidence_service
 from app.api.deps import get_current_active_user
 from app.db import models
 from app.services.audit_service import log_action
+from app.core.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from app.repositories.pagination import PageError
+from app.api.streaming import STREAM_PATTERN, json_chunks, ndjson_chunks, stream_response
 
 router = APIRouter()
 
@@ -35,20 +40,40 @@ def create_evidence_endpoint(
         }
     }
 
-@router.get("/{case_id}/evidence", response_model=DataResponse[List[EvidenceOut]])
+@router.get("/{case_id}/evidence", response_model=PageResponse[EvidenceFieldsOut])
 def list_case_evidence_endpoint(
     case_id: UUID,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    fields: Optional[str] = Query(None, description="Comma-separated EvidenceOut fields"),
+    stream: Optional[str] = Query(None, pattern=STREAM_PATTERN, description="Stream every item after cursor as ndjson or json"),
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_active_user)
 ):
     """
-    Lists all evidence items associated with a specific case.
+    Lists the evidence items of a case, oldest first, one keyset page at a
+    time: pass `metadata.next_cursor` back as `cursor` for the next page.
+    With `stream`, every item after `cursor` is sent as it is read instead.
     """
-    items = evidence_service.get_case_evidence(db, case_id)
-    return {
+    if stream:
+        try:
+            batches = evidence_service.stream_case_evidence(case_id, cursor, fields)
+        except PageError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if stream == "ndjson":
+            return stream_response(ndjson_chunks(batches), stream)
+        tail = lambda count: {"metadata": {"case_id": str(case_id), "count": count}}
+        return stream_response(json_chunks(batches, "data", tail=tail), stream)
+    try:
+        items, next_cursor = evidence_service.get_case_evidence_page(db, case_id, cursor, limit, fields)
+    except PageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Rows are already plain column values (possibly projected), so they skip EvidenceOut validation
+    return JSONResponse(jsonable_encoder({
         "data": items,
         "metadata": {
             "case_id": str(case_id),
-            "count": len(items)
+            "count": len(items),
+            "next_cursor": next_cursor
         }
-    }
+    }))
@@ -4,7 +4,7 @@ from app.db import models
 from app.db.session import get_db
 from app.api.deps import get_current_active_user
 from app.core.security import require_clearance
-from app.services.export_service import generate_court_pdf, build_export_manifest, write_manifest, create_export_record, sha256_file
+from app.services.export_service import generate_court_pdf, build_export_manifest, write_manifest, create_export_record, sha256_file, write_link_explanations
 from app.services.audit_service import log_action
 from uuid import UUID
 from pathlib import Path
@@ -26,14 +26,21 @@ def export_pdf(payload: dict, request: Request, db: Session = Depends(get_db), u
     export_rec = create_export_record(db, case_id, "pdf", user.user_id, file_hash)
     log_action(db, user.user_id, "export_pdf", "case", str(case_id), case_id, request.client.host)
 
-    manifest = build_export_manifest(str(case_id), [pdf_path], meta={"mode": payload.get("mode","court"), "include": payload.get("include", [])})
+    files = [pdf_path]
+    explanations_path = None
+    if "explanations" in (payload.get("include") or []):
+        explanations_path = write_link_explanations(db, case_id)
+        files.append(explanations_path)
+
+    manifest = build_export_manifest(str(case_id), files, meta={"mode": payload.get("mode","court"), "include": payload.get("include", [])})
     manifest_path = write_manifest(str(case_id), manifest)
-    
+
     return {
         "export_id": str(export_rec.export_id),
         "case_id": str(case_id),
         "pdf": str(pdf_path),
         "pdf_sha256": file_hash,
+        "explanations": str(explanations_path) if explanations_path else None,
         "manifest": str(manifest_path)
     }
 
@@ -5,7 +5,6 @@ from typing import List
 
 from app.db.session import get_db
 from app.services import ingest_service
-from app.services.agent_service import agent_service
 from app.db.schemas import IngestJobCreate, IngestJobOut, DataResponse
 
 from app.db import models
@@ -25,62 +24,103 @@ def upload_files(
 ):
     # User is guaranteed to exist by get_current_active_user
 
-    # 1. Create Ingest Job (New Architecture Requirement)
+    # 1. Create Ingest Job (held as 'pending' until every file is spooled)
     job_data = IngestJobCreate(source_type=source_type)
     ip = request.client.host if request else None
-    job = ingest_service.create_ingest_job(db, case_id, job_data, user.user_id, ip_address=ip)
+    job = ingest_service.create_ingest_job(db, case_id, job_data, user.user_id, ip_address=ip, status="pending")
 
     processed_files = []
 
     
-    for f in file:
-        content = f.file.read()
-        
-        # Calculate SHA256 (Compliance)
-        import hashlib
-        file_hash = hashlib.sha256(content).hexdigest()
-        
-        # Track file in DB (Compliance)
-        file_record = ingest_service.add_file_to_job(
-            db, 
-            job.job_id, 
-            f.filename, 
-            f.content_type or "application/octet-stream", 
-            file_hash, 
-            row_count=0 # Placeholder
-        )
+    try:
+        for f in file:
+            # Stream to the spool, calculating SHA256 as we go (Compliance)
+            file_hash, _, _ = ingest_service.spool_upload(f.file)
+
+            # Known content: reuse the earlier analysis instead of parsing again
+            known = ingest_service.find_file_by_hash(db, file_hash)
+            if known:
+                link = ingest_service.link_known_file(db, job, known)
+                processed_files.append({
+                    "filename": f.filename,
+                    "status": "duplicate",
+                    "job_id": str(job.job_id),
+                    **link
+                })
+                continue
         
-        processed_files.append({
-            "filename": f.filename,
-            "status": "uploaded",
-            "file_id": str(file_record.file_id),
-            "job_id": str(job.job_id)
-        })
+            # Track file in DB (Compliance)
+            file_record = ingest_service.add_file_to_job(
+                db, 
+                job.job_id, 
+                f.filename, 
+                f.content_type or "application/octet-stream", 
+                file_hash, 
+                row_count=0 # Placeholder
+            )
         
-        # 4. Trigger Forensic AI Agent (New Intelligence Layer)
-        discovery_summary = {"status": "skipped"}
-        try:
-            findings = agent_service.run_forensic_discovery(db, job.job_id, content, f.filename)
-            if findings and findings.get("skipped_reason"):
-                discovery_summary = {
-                    "status": "skipped",
-                    "reason": findings["skipped_reason"]
-                }
-            elif findings:
-                discovery_summary = {
-                    "status": "success",
-                    "entities_found": len(findings["entities"]),
-                    "insights_found": len(findings["insights"])
-                }
-        except Exception as e:
-            discovery_summary = {"status": "failed", "error": str(e)}
-            print(f"Agent discovery failed: {e}")
+            processed_files.append({
+                "filename": f.filename,
+                "status": "queued",
+                "file_id": str(file_record.file_id),
+                "job_id": str(job.job_id)
+            })
+    except Exception:
+        # Don't leave a half-uploaded job 'pending' forever
+        db.rollback()
+        ingest_service.fail_job(db, job.job_id, "Upload did not complete")
+        raise
+
+    # 2. Hand off to the ingest worker pool (Forensic AI Agent runs there)
+    job = ingest_service.enqueue_job(db, job.job_id)
             
     return {
-        "message": "Files uploaded and ingest job created",
+        "message": "Files uploaded and ingest job queued",
         "job_id": str(job.job_id),
+        "status": job.status,
         "files": processed_files,
-        "ai_discovery": discovery_summary
+        "ai_discovery": {"status": "queued", "progress_url": f"/ingest/validation/{job.job_id}"}
+    }
+
+@router.post("/link")
+def link_known_files(
+    case_id: UUID = Form(...),
+    source_type: str = Form(...),
+    sha256: List[str] = Form(...),
+    request: Request = None,
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_active_user)
+):
+    """Ingests previously uploaded content by hash alone; unknown hashes must be uploaded."""
+    known_files, unknown = [], []
+    for file_hash in sha256:
+        known = ingest_service.find_file_by_hash(db, file_hash.strip().lower())
+        if known:
+            known_files.append(known)
+        else:
+            unknown.append(file_hash)
+    if not known_files:
+        raise HTTPException(status_code=404, detail={"message": "No known files for the given hashes", "unknown": unknown})
+
+    ip = request.client.host if request else None
+    job = ingest_service.create_ingest_job(db, case_id, IngestJobCreate(source_type=source_type), user.user_id,
+                                           ip_address=ip, status="pending")
+    try:
+        linked = [
+            {"filename": known.filename, "hash": known.sha256_hash, **ingest_service.link_known_file(db, job, known)}
+            for known in known_files
+        ]
+    except Exception:
+        db.rollback()
+        ingest_service.fail_job(db, job.job_id, "Linking did not complete")
+        raise
+    job = ingest_service.enqueue_job(db, job.job_id)
+    return {
+        "message": "Known files linked to case",
+        "job_id": str(job.job_id),
+        "status": job.status,
+        "files": linked,
+        "unknown": unknown,
     }
 
 @router.get("/validation/{job_id}")
@@ -90,6 +130,7 @@ def get_ingest_validation(job_id: UUID, db: Session = Depends(get_db), user=Depe
         raise HTTPException(status_code=404, detail="Job not found")
     
     files = db.query(models.IngestFile).filter(models.IngestFile.job_id == job_id).all()
+    linked = ingest_service.get_linked_files(db, job_id)
     
     return {
         "job_id": str(job.job_id),
@@ -97,13 +138,32 @@ def get_ingest_validation(job_id: UUID, db: Session = Depends(get_db), user=Depe
         "source_type": job.source_type,
         "validation_score": float(job.validation_score),
         "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+        "progress": ingest_service.get_job_progress(db, job_id),
         "files": [
             {
                 "file_id": str(f.file_id),
                 "filename": f.filename,
-                "status": "valid", 
+                "status": f.status,
                 "row_count": f.row_count,
-                "hash": f.sha256_hash
+                "hash": f.sha256_hash,
+                "entities_found": f.entities_found,
+                "insights_found": f.insights_found,
+                "error": f.error
             } for f in files
+        ] + [
+            {
+                "file_id": str(f.file_id),
+                "filename": f.filename,
+                "status": "duplicate",
+                "link_status": link.status,
+                "linked_from_job": str(f.job_id),
+                "row_count": f.row_count,
+                "hash": f.sha256_hash,
+                "entities_found": f.entities_found,
+                "insights_found": f.insights_found,
+                "error": None
+            } for f, link in linked
         ]
     }
@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from app.db.session import get_db
-from app.db.schemas import RelationshipCreate, RelationshipOut, DataResponse
+from app.db.schemas import RelationshipCreate, RelationshipFieldsOut, RelationshipOut, DataResponse, PageResponse
 from app.api.deps import get_current_active_user
 from app.db import models
 from app.services import relationship_service
+from app.core.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from app.repositories.pagination import PageError
+from app.api.streaming import STREAM_PATTERN, json_chunks, ndjson_chunks, stream_response
 
 router = APIRouter()
 
@@ -29,19 +34,36 @@ def create_relationship_endpoint(
         }
     }
 
-@router.get("/{case_id}/relationships", response_model=DataResponse[List[RelationshipOut]])
+@router.get("/{case_id}/relationships", response_model=PageResponse[RelationshipFieldsOut])
 def get_relationships_endpoint(
     case_id: UUID,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    fields: Optional[str] = Query(None, description="Comma-separated RelationshipOut fields"),
+    stream: Optional[str] = Query(None, pattern=STREAM_PATTERN, description="Stream every relationship after cursor as ndjson or json"),
     db: Session = Depends(get_db)
 ):
-    rels = relationship_service.get_relationships(db, case_id)
-    return {
+    if stream:
+        try:
+            batches = relationship_service.stream_relationships(case_id, cursor, fields)
+        except PageError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if stream == "ndjson":
+            return stream_response(ndjson_chunks(batches), stream)
+        tail = lambda count: {"metadata": {"case_id": str(case_id), "timestamp": datetime.utcnow().isoformat()}}
+        return stream_response(json_chunks(batches, "data", tail=tail), stream)
+    try:
+        rels, next_cursor = relationship_service.get_relationship_page(db, case_id, cursor, limit, fields)
+    except PageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(jsonable_encoder({
         "data": rels,
         "metadata": {
             "case_id": str(case_id),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow().isoformat(),
+            "next_cursor": next_cursor
         }
-    }
+    }))
 
 @router.get("/{rel_id}", response_model=DataResponse[RelationshipOut])
 def get_relationship_endpoint(
@@ -6,6 +6,8 @@ from app.db import models
 from app.core.security import require_clearance
 from app.api.deps import get_current_active_user
 from app.services.audit_service import log_action
+from app.ai.drift import drift_monitors
+from app.core.config import ANOMALY_MODEL_PATH, LINK_MODEL_PATH
 
 router = APIRouter()
 
@@ -42,3 +44,13 @@ def get_system_integrity(request: Request, db: Session = Depends(get_db), user=D
         },
         "version": "1.0.0"
     }
+
+@router.get("/drift")
+def get_model_drift(request: Request, db: Session = Depends(get_db), user=Depends(get_current_active_user)):
+    """
+    Latest PSI per feature of every trained model, over the rows scored by
+    any process in the current window, against the reference distribution
+    saved when the model was trained.
+    """
+    log_action(db, user.user_id, "view_model_drift", "system", "drift", ip_address=request.client.host)
+    return {"models": drift_monitors.report([ANOMALY_MODEL_PATH, LINK_MODEL_PATH])}
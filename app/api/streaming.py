@@ -0,0 +1,84 @@
+"""
+Streamed response bodies for large listings (?stream=ndjson|json).
+
+Rows arrive in batches, usually from a `yield_per` cursor, and each batch
+is serialized and sent as one chunk. A client therefore gets the first
+rows as soon as the first batch is fetched, and the server holds one
+batch at a time.
+- `ndjson`: one JSON object per line.
+- `json`: the same document the non-streamed endpoint returns, sent
+  incrementally; counts and other trailing metadata come last.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Iterable, Iterator, List, Optional
+from uuid import UUID
+
+from fastapi.responses import StreamingResponse
+
+STREAM_PATTERN = "^(ndjson|json)$"
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+def _default(value):
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> str:
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def ndjson_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    for batch in batches:
+        if batch:
+            yield ("\n".join(map(dumps, batch)) + "\n").encode("utf-8")
+
+
+def json_chunks(batches: Iterable[List[dict]], key: str, head: Optional[dict] = None,
+                tail: Optional[Callable[[int], dict]] = None) -> Iterator[bytes]:
+    """`{**head, key: [rows...], **tail(row count)}`, written as the rows arrive."""
+    opening = dumps(head)[:-1] + "," if head else "{"
+    yield (opening + dumps(key) + ":[").encode("utf-8")
+    count = 0
+    for batch in batches:
+        if batch:
+            yield (("," if count else "") + ",".join(map(dumps, batch))).encode("utf-8")
+            count += len(batch)
+    trailer = tail(count) if tail else None
+    yield ("]," + dumps(trailer)[1:] if trailer else "]}").encode("utf-8")
+
+
+def graph_chunks(fragments: Iterable[tuple], fmt: str) -> Iterator[bytes]:
+    """
+    A case graph from pre-encoded ("nodes" | "edges", [json, ...]) batches.
+    NDJSON lines are {"node": {...}} or {"edge": {...}}, nodes first, so a
+    client can lay nodes out before the edges arrive.
+    """
+    if fmt == "ndjson":
+        for kind, batch in fragments:
+            tag = '{"node":' if kind == "nodes" else '{"edge":'
+            if batch:
+                yield "".join(f"{tag}{record}}}\n" for record in batch).encode("utf-8")
+        return
+    yield b'{"nodes":['
+    current, first = "nodes", True
+    for kind, batch in fragments:
+        if not batch:
+            continue
+        if kind != current:
+            yield b'],"edges":['
+            current, first = kind, True
+        yield (("" if first else ",") + ",".join(batch)).encode("utf-8")
+        first = False
+    yield b"]}" if current == "edges" else b'],"edges":[]}'
+
+
+def stream_response(chunks: Iterable[bytes], fmt: str) -> StreamingResponse:
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[fmt])
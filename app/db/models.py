@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Text, ForeignKey, DateTime, Numeric, Boolean
+from sqlalchemy import String, Text, ForeignKey, DateTime, Numeric, Boolean, BigInteger, JSON
 from sqlalchemy.dialects.postgresql import UUID
 
 def now():
@@ -40,6 +40,8 @@ class Entity(Base):
     confidence_score: Mapped[float] = mapped_column(Numeric(5,2), nullable=False, default=0.0)
     first_seen: Mapped[datetime | None] = mapped_column(DateTime)
     last_seen: Mapped[datetime | None] = mapped_column(DateTime)
+    # "<kind>:<normalized label>" for phones, emails and IPs (see entity_resolution); one entity per key
+    resolution_key: Mapped[str | None] = mapped_column(String(320), unique=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=now, nullable=False)
 
 class Insight(Base):
@@ -50,7 +52,11 @@ class Insight(Base):
     summary: Mapped[str] = mapped_column(Text, nullable=False)
     explanation: Mapped[str | None] = mapped_column(Text)
     confidence_score: Mapped[float] = mapped_column(Numeric(5,2), nullable=False, default=0.0)
+    # Keyword hits that triggered a generated insight: [{keyword, start, end}], the first INSIGHT_EVIDENCE_LIMIT
+    evidence: Mapped[list | None] = mapped_column(JSON(none_as_null=True))
+    evidence_count: Mapped[int] = mapped_column(nullable=False, default=0)
     created_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("users.user_id"))
+    source_file_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("ingest_files.file_id"))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=now, nullable=False)
 
 class Relationship(Base):
@@ -64,6 +70,8 @@ class Relationship(Base):
     confidence_score: Mapped[float] = mapped_column(Numeric(5, 2), nullable=False, default=0.0)
     first_seen: Mapped[datetime | None] = mapped_column(DateTime)
     last_seen: Mapped[datetime | None] = mapped_column(DateTime)
+    source_file_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("ingest_files.file_id"))
+    graph_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=now, nullable=False)
 
 class CaseEntity(Base):
@@ -71,6 +79,22 @@ class CaseEntity(Base):
     case_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("cases.case_id"), primary_key=True)
     entity_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("entities.entity_id"), primary_key=True)
     role_in_case: Mapped[str | None] = mapped_column(String(255))
+    graph_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=now, nullable=False)
+
+class CaseGraphState(Base):
+    """
+    Write counter of a case's graph. Relationship and case_entity rows are
+    stamped with the version their write bumped it to, so readers can fetch
+    just the rows added since the version they hold. `rewrite_version` is
+    the last version at which existing rows were changed in place (entity
+    merges); readers holding an older version rebuild from scratch.
+    """
+    __tablename__ = "case_graph_state"
+    case_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("cases.case_id"), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    rewrite_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=now, nullable=False)
 
 class EvidenceItem(Base):
     __tablename__ = "evidence_items"
@@ -115,6 +139,9 @@ class IngestJob(Base):
     started_at: Mapped[datetime | None] = mapped_column(DateTime)
     completed_at: Mapped[datetime | None] = mapped_column(DateTime)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=now, nullable=False)
+    # Held by the worker running the job: writes check the token, the worker renews heartbeat_at
+    lease_token: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime)
 
 class IngestFile(Base):
     __tablename__ = "ingest_files"
@@ -124,4 +151,22 @@ class IngestFile(Base):
     file_type: Mapped[str] = mapped_column(String(50), nullable=False)
     sha256_hash: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
     row_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")
+    error: Mapped[str | None] = mapped_column(Text)
+    entities_found: Mapped[int] = mapped_column(nullable=False, default=0)
+    insights_found: Mapped[int] = mapped_column(nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=now, nullable=False)
+
+class IngestFileEntity(Base):
+    """Provenance: entities discovered in an ingested file."""
+    __tablename__ = "ingest_file_entities"
+    file_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("ingest_files.file_id"), primary_key=True)
+    entity_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("entities.entity_id"), primary_key=True)
+
+class IngestJobFile(Base):
+    """Links an already-known file (matched by sha256) to a later ingest job."""
+    __tablename__ = "ingest_job_files"
+    job_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("ingest_jobs.job_id"), primary_key=True)
+    file_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("ingest_files.file_id"), primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="linked")  # linked | pending | failed
     created_at: Mapped[datetime] = mapped_column(DateTime, default=now, nullable=False)
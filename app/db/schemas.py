@@ -9,6 +9,17 @@ class DataResponse(BaseModel, Generic[T]):
     data: T
     metadata: dict[str, Any]
 
+class PageMetadata(BaseModel):
+    case_id: UUID
+    count: Optional[int] = None
+    timestamp: Optional[datetime] = None
+    next_cursor: Optional[str] = None  # absent on the last page
+
+class PageResponse(BaseModel, Generic[T]):
+    """One keyset page of a listing; rows carry only the requested `fields`."""
+    data: List[T]
+    metadata: PageMetadata
+
 class RelationshipCreate(BaseModel):
     source_entity_id: UUID
     target_entity_id: UUID
@@ -24,6 +35,19 @@ class RelationshipOut(RelationshipCreate):
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+class RelationshipFieldsOut(BaseModel):
+    """RelationshipOut projected to the requested fields."""
+    rel_id: Optional[UUID] = None
+    case_id: Optional[UUID] = None
+    source_entity_id: Optional[UUID] = None
+    target_entity_id: Optional[UUID] = None
+    basis: Optional[str] = None
+    strength_score: Optional[float] = None
+    confidence_score: Optional[float] = None
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
 class EvidenceCreate(BaseModel):
     insight_id: Optional[UUID] = None
     entity_id: Optional[UUID] = None
@@ -38,6 +62,18 @@ class EvidenceOut(EvidenceCreate):
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+class EvidenceFieldsOut(BaseModel):
+    """EvidenceOut projected to the requested fields."""
+    evidence_id: Optional[UUID] = None
+    case_id: Optional[UUID] = None
+    insight_id: Optional[UUID] = None
+    entity_id: Optional[UUID] = None
+    rel_id: Optional[UUID] = None
+    evidence_type: Optional[str] = None
+    description: Optional[str] = None
+    evidence_hash: Optional[str] = None
+    created_at: Optional[datetime] = None
+
 class ExportCreate(BaseModel):
     export_type: str
 
@@ -81,6 +117,10 @@ class IngestFileOut(BaseModel):
     file_type: str
     sha256_hash: str
     row_count: int
+    status: str
+    error: Optional[str] = None
+    entities_found: int = 0
+    insights_found: int = 0
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
@@ -116,12 +156,20 @@ class EntityOut(BaseModel):
     created_at: Optional[datetime] = None
     model_config = ConfigDict(from_attributes=True)
 
+class EntitySearchHit(EntityOut):
+    score: float  # +2 exact, +1 prefix, + similarity of the query to the label (0-1)
+
 class InsightCreate(BaseModel):
     severity: str = Field(..., pattern="^(low|medium|high|critical)$")
     summary: str = Field(..., min_length=1)
     explanation: Optional[str] = None
     confidence_score: float = Field(default=0.0, ge=0, le=100)
 
+class InsightEvidenceOut(BaseModel):
+    keyword: str
+    start: int
+    end: int
+
 class InsightOut(BaseModel):
     insight_id: UUID
     case_id: UUID
@@ -129,6 +177,8 @@ class InsightOut(BaseModel):
     summary: str
     explanation: Optional[str] = None
     confidence_score: float = Field(ge=0, le=100)
+    evidence: Optional[List[InsightEvidenceOut]] = None
+    evidence_count: int = 0
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
@@ -161,3 +211,47 @@ class GraphEdge(BaseModel):
 class CaseGraph(BaseModel):
     nodes: List[GraphNode]
     edges: List[GraphEdge]
+
+class GraphNodeFields(BaseModel):
+    """GraphNode projected to the requested fields; the id is always present."""
+    id: UUID
+    label: Optional[str] = None
+    type: Optional[str] = None
+
+class GraphEdgeFields(BaseModel):
+    """GraphEdge projected to the requested fields; the id is always present."""
+    id: UUID
+    source: Optional[UUID] = None
+    target: Optional[UUID] = None
+    basis: Optional[str] = None
+    weight: Optional[float] = None
+
+class CaseGraphPage(BaseModel):
+    """The whole graph, or one page of it: case nodes first, then edges."""
+    nodes: List[GraphNodeFields]
+    edges: List[GraphEdgeFields]
+    next_cursor: Optional[str] = None  # paged requests only; absent on the last page
+
+class NeighborhoodNode(GraphNode):
+    hops: int
+
+class EntityNeighborhood(BaseModel):
+    entity_id: UUID
+    case_id: UUID
+    hops: int
+    nodes: List[NeighborhoodNode]
+    edges: List[GraphEdge]
+    truncated: List[UUID]  # entities with more links than max_fanout; only their strongest were followed
+    complete: bool
+
+class EntityPath(BaseModel):
+    source: UUID
+    target: UUID
+    case_id: UUID
+    weighted: bool
+    found: bool
+    hops: Optional[int] = None
+    strength: Optional[float] = None  # product of the path's strength_scores, on the same 0-100 scale
+    nodes: List[GraphNode]
+    edges: List[GraphEdge]
+    complete: bool
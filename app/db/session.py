@@ -11,3 +11,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def iter_with_session(fn, *args):
+    """
+    Runs the generator `fn(db, *args)` on a session of its own, closed once
+    the generator is exhausted or abandoned. For streamed responses, which
+    outlive the request's `get_db` session.
+    """
+    db = SessionLocal()
+    try:
+        yield from fn(db, *args)
+    finally:
+        db.close()
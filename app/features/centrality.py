@@ -0,0 +1,215 @@
+"""
+Betweenness centrality for contact graphs of any size.
+
+Brandes' algorithm from a random sample of pivot sources, scaled by n/k
+(exact when every node is a pivot). Each BFS is level-synchronous over the
+CSR arrays in numpy, pivots can be spread over a process pool, and the
+number of pivots is bounded by both an error target and a time budget.
+Results of runs that processed every planned pivot are cached per graph
+version in memory and on disk; a run cut short by the time budget is not,
+so the next call gets the full budget again.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import networkx as nx
+
+from app.core.config import (
+    BETWEENNESS_EPSILON, BETWEENNESS_DELTA, BETWEENNESS_TIME_BUDGET,
+    BETWEENNESS_WORKERS, CENTRALITY_CACHE_DIR,
+)
+from app.features.graph_features import ContactCSR
+
+
+@dataclass
+class BetweennessResult:
+    nodes: np.ndarray
+    values: np.ndarray      # normalized like nx.betweenness_centrality
+    pivots: int             # sources actually processed
+    exact: bool
+    error_bound: float      # additive bound holding with probability 1 - delta
+    seconds: float
+    version: str
+
+    def as_dict(self) -> dict:
+        return dict(zip(self.nodes.tolist(), self.values.tolist()))
+
+
+def csr_from_graph(g: nx.Graph) -> ContactCSR:
+    nodes = np.empty(g.number_of_nodes(), dtype=object)
+    nodes[:] = list(g.nodes())
+    index = {n: i for i, n in enumerate(nodes)}
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    indices = []
+    for i, n in enumerate(nodes):
+        nbrs = [index[m] for m in g.adj[n]]
+        indices.extend(sorted(nbrs))
+        indptr[i + 1] = len(indices)
+    indices = np.asarray(indices, dtype=np.int64)
+    return ContactCSR(nodes=nodes, indptr=indptr, indices=indices, counts=np.ones(len(indices), dtype=np.int64))
+
+
+def graph_version(csr: ContactCSR) -> str:
+    """Content fingerprint of the adjacency structure and node labels."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(csr.indptr, dtype=np.int64).tobytes())
+    h.update(np.ascontiguousarray(csr.indices, dtype=np.int64).tobytes())
+    h.update("\x1f".join(map(str, csr.nodes.tolist())).encode())
+    return h.hexdigest()
+
+
+def pivots_for_error(n: int, epsilon: float, delta: float) -> int:
+    """Pivots so every normalized value is within `epsilon` with probability 1 - delta (Hoeffding + union bound)."""
+    if n <= 2 or epsilon <= 0:
+        return n
+    return min(n, math.ceil(math.log(2 * n / delta) / (2 * epsilon ** 2)))
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Neighbours of `rows` as (position in rows, neighbour) arrays."""
+    starts = indptr[rows]
+    lens = indptr[rows + 1] - starts
+    total = int(lens.sum())
+    owner = np.repeat(np.arange(len(rows)), lens)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lens) - lens, lens)
+    return owner, indices[np.repeat(starts, lens) + offsets]
+
+
+def _accumulate(indptr: np.ndarray, indices: np.ndarray, sources: np.ndarray,
+                deadline: float) -> tuple[np.ndarray, int]:
+    """Unnormalized Brandes dependencies summed over `sources` until `deadline`."""
+    n = len(indptr) - 1
+    bc = np.zeros(n)
+    done = 0
+    for s in sources:
+        if done and time.monotonic() > deadline:
+            break
+        dist = np.full(n, -1, dtype=np.int64)
+        sigma = np.zeros(n)
+        dist[s], sigma[s] = 0, 1.0
+        levels = [np.array([s], dtype=np.int64)]
+        while True:
+            frontier = levels[-1]
+            owner, nbrs = _gather(indptr, indices, frontier)
+            new = dist[nbrs] == -1
+            if not new.any():
+                break
+            nxt, inverse = np.unique(nbrs[new], return_inverse=True)
+            dist[nxt] = len(levels)
+            sigma[nxt] = np.bincount(inverse, weights=sigma[frontier[owner[new]]], minlength=len(nxt))
+            levels.append(nxt)
+
+        delta = np.zeros(n)
+        for d in range(len(levels) - 2, -1, -1):
+            level = levels[d]
+            owner, nbrs = _gather(indptr, indices, level)
+            child = dist[nbrs] == d + 1
+            contrib = (1.0 + delta[nbrs[child]]) / sigma[nbrs[child]]
+            delta[level] = sigma[level] * np.bincount(owner[child], weights=contrib, minlength=len(level))
+        delta[s] = 0.0
+        bc += delta
+        done += 1
+    return bc, done
+
+
+_memory_cache: "OrderedDict[tuple, BetweennessResult]" = OrderedDict()
+_MEMORY_CACHE_SIZE = 8
+
+
+def _cache_key(version: str, k: int, seed: int) -> tuple:
+    return (version, k, seed)
+
+
+def _load_cached(key: tuple, cache_dir: Optional[Path], nodes: np.ndarray) -> Optional[BetweennessResult]:
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return _memory_cache[key]
+    if cache_dir is None:
+        return None
+    path = cache_dir / f"{key[0]}-{key[1]}-{key[2]}.npz"
+    if not path.exists():
+        return None
+    data = np.load(path)
+    result = BetweennessResult(
+        nodes=nodes, values=data["values"], pivots=int(data["pivots"]), exact=bool(data["exact"]),
+        error_bound=float(data["error_bound"]), seconds=float(data["seconds"]), version=key[0],
+    )
+    _remember(key, result)
+    return result
+
+
+def _remember(key: tuple, result: BetweennessResult) -> None:
+    _memory_cache[key] = result
+    _memory_cache.move_to_end(key)
+    while len(_memory_cache) > _MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+
+def betweenness(
+    graph: nx.Graph | ContactCSR,
+    epsilon: float = BETWEENNESS_EPSILON,
+    delta: float = BETWEENNESS_DELTA,
+    time_budget: float = BETWEENNESS_TIME_BUDGET,
+    workers: int = BETWEENNESS_WORKERS,
+    seed: int = 42,
+    version: Optional[str] = None,
+    cache_dir: Optional[str | Path] = CENTRALITY_CACHE_DIR,
+) -> BetweennessResult:
+    """
+    Normalized betweenness, exact when the error target needs every node as
+    a pivot and time allows, otherwise estimated from the pivots processed
+    within `time_budget` seconds (per worker). Pivots are taken in a seeded
+    random order even when all are planned, so a run cut short still
+    processed a uniform sample. `version` identifies the graph for caching
+    and defaults to a fingerprint of its structure.
+    """
+    csr = graph if isinstance(graph, ContactCSR) else csr_from_graph(graph)
+    n = csr.number_of_nodes
+    version = version or graph_version(csr)
+    k = pivots_for_error(n, epsilon, delta)
+    cache_path = Path(cache_dir) if cache_dir else None
+    key = _cache_key(version, k, seed)
+    cached = _load_cached(key, cache_path, csr.nodes)
+    if cached is not None:
+        return cached
+
+    t0 = time.monotonic()
+    sources = np.random.default_rng(seed).permutation(n)[:k]
+    deadline = t0 + time_budget
+    indptr, indices = np.asarray(csr.indptr, dtype=np.int64), np.asarray(csr.indices, dtype=np.int64)
+    if workers > 1 and k > workers:
+        # Interleaved slices keep each worker's partial sample uniformly random.
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_accumulate, [indptr] * workers, [indices] * workers,
+                                  [sources[i::workers] for i in range(workers)], [deadline] * workers))
+        raw = sum(p[0] for p in parts) if parts else np.zeros(n)
+        done = sum(p[1] for p in parts)
+    else:
+        raw, done = _accumulate(indptr, indices, sources, deadline)
+
+    values = np.zeros(n)
+    if n > 2 and done:
+        values = raw * (n / done) / ((n - 1) * (n - 2))
+    exact = done == n
+    bound = 0.0 if exact or not done else math.sqrt(math.log(2 * n / delta) / (2 * done))
+    result = BetweennessResult(
+        nodes=csr.nodes, values=values, pivots=done, exact=exact,
+        error_bound=bound, seconds=time.monotonic() - t0, version=version,
+    )
+    if done < len(sources):
+        return result
+    _remember(key, result)
+    if cache_path is not None:
+        cache_path.mkdir(parents=True, exist_ok=True)
+        np.savez(cache_path / f"{key[0]}-{key[1]}-{key[2]}.npz", values=values, pivots=done, exact=exact,
+                 error_bound=bound, seconds=result.seconds)
+    return result
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.ai.relations import FINANCIAL_RULE, COMMUNICATION_RULE
+
+ENTITY_FEATURES = [
+    "base_risk", "confidence", "mentions", "mention_density", "spread", "first_position",
+    "degree", "mean_strength", "max_strength", "financial_links", "communication_links",
+]
+
+def entity_feature_frame(entities: List[Dict[str, Any]], relationships: List[Dict[str, Any]],
+                         n_chars: int) -> pd.DataFrame:
+    """
+    One numeric row per discovered entity: how often and where it is
+    mentioned, plus aggregates of the links the agent found for it.
+    Columns are ENTITY_FEATURES, in that order.
+    """
+    n_chars = max(n_chars, 1)
+    offsets = [e.get("offsets") or [(0, 0)] for e in entities]
+    mentions = np.array([len(o) for o in offsets], dtype=np.float64)
+    first = np.array([o[0][0] for o in offsets], dtype=np.float64)
+    last = np.array([o[-1][0] for o in offsets], dtype=np.float64)
+    X = pd.DataFrame({
+        "base_risk": [float(e.get("base_risk_score", e["risk_score"])) for e in entities],
+        "confidence": [float(e["confidence_score"]) for e in entities],
+        "mentions": mentions,
+        "mention_density": mentions * 10_000.0 / n_chars,
+        "spread": (last - first) / n_chars,
+        "first_position": first / n_chars,
+    })
+
+    labels = pd.Series([e["label"] for e in entities])
+    if relationships:
+        rels = pd.DataFrame(relationships)
+        ends = pd.concat([
+            rels[["source_label", "basis", "strength_score"]].rename(columns={"source_label": "label"}),
+            rels[["target_label", "basis", "strength_score"]].rename(columns={"target_label": "label"}),
+        ])
+        g = ends.groupby("label")
+        links = pd.DataFrame({
+            "degree": g.size(),
+            "mean_strength": g["strength_score"].mean(),
+            "max_strength": g["strength_score"].max(),
+            "financial_links": g["basis"].agg(lambda b: (b == FINANCIAL_RULE.basis).sum()),
+            "communication_links": g["basis"].agg(lambda b: (b == COMMUNICATION_RULE.basis).sum()),
+        })
+        per_entity = links.reindex(labels).fillna(0.0).reset_index(drop=True)
+    else:
+        per_entity = pd.DataFrame(0.0, index=range(len(entities)), columns=ENTITY_FEATURES[6:])
+    for col in ENTITY_FEATURES[6:]:
+        X[col] = per_entity[col].astype(np.float64).to_numpy()
+    return X[ENTITY_FEATURES]
@@ -1,21 +1,116 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 import networkx as nx
 
+
+@dataclass
+class ContactEdges:
+    """
+    Unordered contact pairs with call counts. `nodes` holds the party labels
+    in order of first appearance; `src`/`dst` index into it with src <= dst.
+    """
+    nodes: np.ndarray
+    src: np.ndarray
+    dst: np.ndarray
+    counts: np.ndarray
+
+
+@dataclass
+class ContactCSR:
+    """
+    Compact symmetric adjacency of the contact graph: the neighbours of node
+    i are indices[indptr[i]:indptr[i + 1]], with call counts in `counts`.
+    """
+    nodes: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    counts: np.ndarray
+
+    @property
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def degree(self) -> np.ndarray:
+        """Per-node degree, counting a self-loop twice as networkx does."""
+        deg = np.diff(self.indptr)
+        rows = np.repeat(np.arange(len(self.nodes)), deg)
+        return deg + np.bincount(rows[rows == self.indices], minlength=len(self.nodes))
+
+    def to_scipy(self):
+        from scipy.sparse import csr_matrix
+        n = len(self.nodes)
+        return csr_matrix((self.counts, self.indices, self.indptr), shape=(n, n))
+
+
+def contact_edges(df: pd.DataFrame, a_col: str = "a_party", b_col: str = "b_party") -> ContactEdges:
+    """
+    Vectorized edge list: drops rows with a missing party, stringifies
+    labels, folds (a, b) and (b, a) together and counts each pair once with
+    np.unique over int64 pair keys.
+    """
+    pairs = df[[a_col, b_col]].dropna()
+    # Factorize the interleaved a/b values so node ids follow first appearance.
+    raw_codes, uniques = pd.factorize(pairs.to_numpy().ravel())
+    # Distinct raw values may share a string form (1 vs "1"); merge them.
+    str_codes, nodes = pd.factorize(pd.Index(uniques).astype(str))
+    codes = str_codes[raw_codes].reshape(-1, 2).astype(np.int64)
+
+    lo = codes.min(axis=1)
+    hi = codes.max(axis=1)
+    n = max(len(nodes), 1)
+    keys, counts = np.unique(lo * n + hi, return_counts=True)
+    return ContactEdges(
+        nodes=np.asarray(nodes, dtype=object),
+        src=keys // n,
+        dst=keys % n,
+        counts=counts,
+    )
+
+
 def build_contact_graph(df: pd.DataFrame) -> nx.Graph:
+    """Undirected contact graph with a `count` attribute per edge, built in bulk from `contact_edges`."""
+    edges = contact_edges(df)
+    nodes = edges.nodes
     g = nx.Graph()
-    for _, r in df.iterrows():
-        a, b = str(r.get("a_party")), str(r.get("b_party"))
-        if a == "nan" or b == "nan":
-            continue
-        if g.has_edge(a, b):
-            g[a][b]["count"] += 1
-        else:
-            g.add_edge(a, b, count=1)
+    g.add_nodes_from(nodes.tolist())
+    g.add_weighted_edges_from(
+        zip(nodes[edges.src].tolist(), nodes[edges.dst].tolist(), edges.counts.tolist()),
+        weight="count",
+    )
     return g
 
-def graph_features(g: nx.Graph, nodes: list[str]) -> pd.DataFrame:
-    deg = dict(g.degree())
-    bt = nx.betweenness_centrality(g) if g.number_of_nodes() < 5000 else {n: 0.0 for n in g.nodes()}
+
+def build_contact_csr(df: pd.DataFrame) -> ContactCSR:
+    """Same graph as `build_contact_graph` as a CSR adjacency, without any per-edge Python objects."""
+    edges = contact_edges(df)
+    n = len(edges.nodes)
+    loops = edges.src == edges.dst
+    rows = np.concatenate([edges.src, edges.dst[~loops]])
+    cols = np.concatenate([edges.dst, edges.src[~loops]])
+    data = np.concatenate([edges.counts, edges.counts[~loops]])
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return ContactCSR(nodes=edges.nodes, indptr=indptr, indices=cols[order], counts=data[order])
+
+
+def graph_features(g: nx.Graph | ContactCSR, nodes: list[str], **centrality_options) -> pd.DataFrame:
+    """
+    Degree and betweenness per node. Betweenness comes from
+    `centrality.betweenness` (exact on small graphs, sampled on large ones,
+    cached per graph version); `centrality_options` are passed through.
+    """
+    from app.features.centrality import betweenness
+
+    if isinstance(g, ContactCSR):
+        deg = dict(zip(g.nodes.tolist(), g.degree().tolist()))
+    else:
+        deg = dict(g.degree())
+    bt = betweenness(g, **centrality_options).as_dict()
     out = []
     for n in nodes:
         out.append({
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from app.core.config import CDR_CHUNK_ROWS, LINK_CACHE_DIR
+from app.features.temporal_features import NIGHT_HOURS, TemporalFeatureStore, column_key
+
+PAIR_FEATURES = ["calls_count", "unique_days", "night_calls", "distinct_cells", "active_span_days"]
+# Activity of the pair's two parties across all their calls, from the temporal store's rollups
+PARTY_FEATURES = ["party_calls_min", "party_calls_max", "party_night_ratio_min", "party_night_ratio_max"]
+LINK_FEATURES = PAIR_FEATURES + PARTY_FEATURES
+
+_NO_FIRST = np.iinfo(np.int32).max
+_NO_LAST = np.iinfo(np.int32).min
+_LOW32 = np.int64(0xFFFFFFFF)
+# Pending partial rows merged at once by LinkAccumulator (at least; grows with the state).
+_REDUCE_ROWS = 5_000_000
+
+
+@dataclass
+class LinkPartials:
+    """
+    Link aggregates over some set of CDR rows. One entry per party pair
+    (codes into `parties`, lexicographically smaller party first) plus the
+    distinct (pair, day) and (pair, cell) combinations, so partials over
+    disjoint rows merge exactly.
+    """
+    parties: np.ndarray
+    cells: np.ndarray
+    pair_a: np.ndarray
+    pair_b: np.ndarray
+    calls: np.ndarray
+    night_calls: np.ndarray
+    first_day: np.ndarray   # days since epoch; _NO_FIRST when no call had a timestamp
+    last_day: np.ndarray
+    day_pair: np.ndarray    # index into the pairs
+    day: np.ndarray
+    cell_pair: np.ndarray
+    cell: np.ndarray        # code into `cells`
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+
+def _categorical(s: pd.Series) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    return s.astype(str).where(s.notna()).astype("category")
+
+
+def link_partials(df: pd.DataFrame, a_col: str = "a_party", b_col: str = "b_party",
+                  cell_col: str = "cell_id") -> LinkPartials:
+    """Aggregates one CDR chunk. Rows missing a party, or calling themselves, are ignored."""
+    n = len(df)
+    parties = union_categoricals([_categorical(df[a_col]), _categorical(df[b_col])], sort_categories=True)
+    codes = parties.codes.astype(np.int64)
+    a, b = codes[:n], codes[n:]
+    ok = (a >= 0) & (b >= 0) & (a != b)
+    lo, hi = np.minimum(a, b)[ok], np.maximum(a, b)[ok]
+    m = max(len(parties.categories), 1)
+    keys, inv = np.unique(lo * m + hi, return_inverse=True)
+    k = len(keys)
+
+    t = df["timestamp"]
+    if not pd.api.types.is_datetime64_any_dtype(t):
+        t = pd.to_datetime(t, errors="coerce")
+    timed = t.notna().to_numpy()[ok]
+    day = t.to_numpy().astype("datetime64[D]").astype(np.int64)[ok]
+    hour = t.dt.hour.to_numpy(na_value=-1)[ok]
+    night = timed & (hour >= NIGHT_HOURS[0]) & (hour <= NIGHT_HOURS[1])
+
+    first_day = np.full(k, _NO_FIRST, dtype=np.int32)
+    last_day = np.full(k, _NO_LAST, dtype=np.int32)
+    np.minimum.at(first_day, inv[timed], day[timed].astype(np.int32))
+    np.maximum.at(last_day, inv[timed], day[timed].astype(np.int32))
+    pair_days = np.unique((inv[timed] << 32) | (day[timed] & _LOW32))
+
+    if cell_col in df.columns:
+        cells = _categorical(df[cell_col]).cat
+        cell = cells.codes.to_numpy().astype(np.int64)[ok]
+        cell_names = np.asarray(cells.categories, dtype=str)
+    else:
+        cell = np.full(len(inv), -1, dtype=np.int64)
+        cell_names = np.array([], dtype=str)
+    located = cell >= 0
+    pair_cells = np.unique((inv[located] << 32) | cell[located])
+
+    return LinkPartials(
+        parties=np.asarray(parties.categories, dtype=str),
+        cells=cell_names,
+        pair_a=keys // m,
+        pair_b=keys % m,
+        calls=np.bincount(inv, minlength=k).astype(np.int64),
+        night_calls=np.bincount(inv, weights=night, minlength=k).astype(np.int64),
+        first_day=first_day,
+        last_day=last_day,
+        day_pair=pair_days >> 32,
+        day=(pair_days & _LOW32).astype(np.uint32).astype(np.int32),
+        cell_pair=pair_cells >> 32,
+        cell=pair_cells & _LOW32,
+    )
+
+
+def _reduce(parts: list[LinkPartials]) -> LinkPartials:
+    """Merges partials that share one party/cell vocabulary."""
+    offsets = np.cumsum([0] + [len(p) for p in parts[:-1]])
+    cat = lambda name: np.concatenate([getattr(p, name) for p in parts])
+    keys, inv = np.unique((cat("pair_a") << 32) | cat("pair_b"), return_inverse=True)
+    k = len(keys)
+
+    first_day = np.full(k, _NO_FIRST, dtype=np.int32)
+    last_day = np.full(k, _NO_LAST, dtype=np.int32)
+    np.minimum.at(first_day, inv, cat("first_day"))
+    np.maximum.at(last_day, inv, cat("last_day"))
+    day_pair = inv[np.concatenate([p.day_pair + o for p, o in zip(parts, offsets)])]
+    pair_days = np.unique((day_pair << 32) | (cat("day").astype(np.int64) & _LOW32))
+    cell_pair = inv[np.concatenate([p.cell_pair + o for p, o in zip(parts, offsets)])]
+    pair_cells = np.unique((cell_pair << 32) | cat("cell"))
+
+    return replace(
+        parts[0],
+        pair_a=keys >> 32,
+        pair_b=keys & _LOW32,
+        calls=np.bincount(inv, weights=cat("calls"), minlength=k).astype(np.int64),
+        night_calls=np.bincount(inv, weights=cat("night_calls"), minlength=k).astype(np.int64),
+        first_day=first_day,
+        last_day=last_day,
+        day_pair=pair_days >> 32,
+        day=(pair_days & _LOW32).astype(np.uint32).astype(np.int32),
+        cell_pair=pair_cells >> 32,
+        cell=pair_cells & _LOW32,
+    )
+
+
+class LinkAccumulator:
+    """
+    Merges LinkPartials from many chunks or files into one global party and
+    cell vocabulary. Partials are reduced in batches that grow with the
+    merged state, so memory tracks the number of distinct pairs, pair-days
+    and pair-cells rather than the number of CDR rows.
+    """
+
+    def __init__(self, reduce_rows: int = _REDUCE_ROWS):
+        self.reduce_rows = reduce_rows
+        self._parties = pd.Index([], dtype=object)
+        self._cells = pd.Index([], dtype=object)
+        self._state: Optional[LinkPartials] = None
+        self._pending: list[LinkPartials] = []
+        self._pending_rows = 0
+
+    def _codes(self, attr: str, values: np.ndarray) -> np.ndarray:
+        vocab = getattr(self, attr)
+        idx = vocab.get_indexer(values)
+        if (idx < 0).any():
+            vocab = vocab.append(pd.Index(values[idx < 0], dtype=object))
+            setattr(self, attr, vocab)
+            idx = vocab.get_indexer(values)
+        return idx.astype(np.int64)
+
+    def add(self, part: LinkPartials) -> None:
+        if not len(part):
+            return
+        parties = self._codes("_parties", part.parties)
+        cells = self._codes("_cells", part.cells)
+        self._pending.append(replace(part, parties=None, cells=None, pair_a=parties[part.pair_a],
+                                     pair_b=parties[part.pair_b], cell=cells[part.cell]))
+        self._pending_rows += len(part)
+        if self._pending_rows > max(self.reduce_rows, 2 * len(self._state or ())):
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._state = _reduce(([self._state] if self._state is not None else []) + self._pending)
+            self._pending, self._pending_rows = [], 0
+
+    def result(self) -> LinkPartials:
+        self._flush()
+        parties = np.asarray(self._parties, dtype=str)
+        cells = np.asarray(self._cells, dtype=str)
+        if self._state is None:
+            empty = np.array([], dtype=np.int64)
+            return LinkPartials(parties, cells, empty, empty, empty, empty, empty.astype(np.int32),
+                                empty.astype(np.int32), empty, empty.astype(np.int32), empty, empty)
+        return replace(self._state, parties=parties, cells=cells)
+
+
+@dataclass
+class LinkDataset:
+    """Link-feature matrix: row i describes the pair (parties[pair_a[i]], parties[pair_b[i]])."""
+    parties: np.ndarray
+    pair_a: np.ndarray
+    pair_b: np.ndarray
+    X: pd.DataFrame
+
+    @classmethod
+    def from_partials(cls, p: LinkPartials, rollups: pd.DataFrame) -> "LinkDataset":
+        """Pair features from merged partials, plus each pair's lower and higher party activity from `rollups`."""
+        k = len(p)
+        timed = p.first_day != _NO_FIRST
+        per_party = rollups.reindex(p.parties)[["calls", "night_ratio"]].fillna(0.0).to_numpy(np.float32)
+        a, b = per_party[p.pair_a], per_party[p.pair_b]
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        X = pd.DataFrame({
+            "calls_count": p.calls,
+            "unique_days": np.bincount(p.day_pair, minlength=k),
+            "night_calls": p.night_calls,
+            "distinct_cells": np.bincount(p.cell_pair, minlength=k),
+            "active_span_days": np.where(timed, p.last_day.astype(np.int64) - p.first_day + 1, 0),
+            "party_calls_min": lo[:, 0],
+            "party_calls_max": hi[:, 0],
+            "party_night_ratio_min": lo[:, 1],
+            "party_night_ratio_max": hi[:, 1],
+        }, dtype=np.float32)
+        return cls(p.parties, p.pair_a, p.pair_b, X[LINK_FEATURES])
+
+    def pair_labels(self, pairs: Iterable[tuple[str, str]]) -> np.ndarray:
+        """1 for rows whose party pair (in either order) is in `pairs`, else 0."""
+        pairs = list(pairs)
+        vocab = pd.Index(self.parties)
+        if not pairs or not len(vocab):
+            return np.zeros(len(self.X), dtype=np.int8)
+        a = vocab.get_indexer([p[0] for p in pairs])
+        b = vocab.get_indexer([p[1] for p in pairs])
+        known = (a >= 0) & (b >= 0)
+        # Pair codes are ordered by party string, and the vocabulary is not sorted.
+        lo = np.where(self.parties[a[known]] <= self.parties[b[known]], a[known], b[known]).astype(np.int64)
+        hi = np.where(self.parties[a[known]] <= self.parties[b[known]], b[known], a[known]).astype(np.int64)
+        positive = np.unique((lo << 32) | hi)
+        return np.isin((self.pair_a << 32) | self.pair_b, positive).astype(np.int8)
+
+
+class LinkFeatureStore:
+    """
+    Per-file link partials cached under LINK_CACHE_DIR/<hash[:2]>/<hash>-<column key>.npz.
+    Ingest aggregates each CDR once, chunk by chunk from the Parquet cache
+    or the raw file; a training set is then a merge of cached partials
+    joined with the temporal store's party rollups.
+    """
+
+    def __init__(self, root: str | Path = LINK_CACHE_DIR, a_col: str = "a_party", b_col: str = "b_party",
+                 cell_col: str = "cell_id", chunksize: int = CDR_CHUNK_ROWS,
+                 temporal: Optional[TemporalFeatureStore] = None):
+        self.root = Path(root)
+        self.a_col = a_col
+        self.b_col = b_col
+        self.cell_col = cell_col
+        self.chunksize = chunksize
+        self.temporal = temporal or TemporalFeatureStore(a_col=a_col, b_col=b_col)
+
+    def _path(self, file_hash: str) -> Path:
+        return self.root / file_hash[:2] / f"{file_hash}-{column_key(self.a_col, self.b_col, self.cell_col)}.npz"
+
+    def has(self, file_hash: str) -> bool:
+        return self._path(file_hash).exists()
+
+    def file_partials(self, file_hash: str, path: Optional[str] = None) -> LinkPartials:
+        cache_path = self._path(file_hash)
+        if cache_path.exists():
+            with np.load(cache_path) as data:
+                return LinkPartials(**{f.name: data[f.name] for f in fields(LinkPartials)})
+
+        from app.ingest.parsers import iter_cdr
+        acc = LinkAccumulator()
+        for chunk in iter_cdr(path, file_hash, self.chunksize):
+            acc.add(link_partials(chunk, self.a_col, self.b_col, self.cell_col))
+        partials = acc.result()
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_name(f".{uuid.uuid4().hex}.npz")
+        np.savez(tmp, **partials.__dict__)
+        tmp.replace(cache_path)
+        return partials
+
+    def dataset(self, files: Iterable[str | tuple[str, Optional[str]]]) -> LinkDataset:
+        """Link features over the given file hashes (or (hash, path) pairs for files not cached yet)."""
+        files = [(f, None) if isinstance(f, str) else f for f in files]
+        acc = LinkAccumulator()
+        for file_hash, path in files:
+            acc.add(self.file_partials(file_hash, path))
+        return LinkDataset.from_partials(acc.result(), self.temporal.party_rollups(files))
@@ -1,9 +1,144 @@
+from __future__ import annotations
+
+import hashlib
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
 import pandas as pd
 
+from app.core.config import TEMPORAL_CACHE_DIR
+
+NIGHT_HOURS = (0, 5)
+
 def temporal_features(df: pd.DataFrame) -> pd.DataFrame:
-    t = pd.to_datetime(df["timestamp"], errors="coerce")
-    out = pd.DataFrame(index=df.index)
-    out["hour"] = t.dt.hour.fillna(-1).astype(int)
-    out["dow"] = t.dt.dayofweek.fillna(-1).astype(int)
-    out["is_night"] = out["hour"].between(0, 5).astype(int)
-    return out
+    """hour / dow / is_night per row as int8, -1 where the timestamp is missing or unparseable."""
+    t = df["timestamp"]
+    if not pd.api.types.is_datetime64_any_dtype(t):
+        t = pd.to_datetime(t, errors="coerce")
+    valid = t.notna().to_numpy()
+    hour = np.where(valid, t.dt.hour.to_numpy(na_value=0), -1).astype(np.int8)
+    dow = np.where(valid, t.dt.dayofweek.to_numpy(na_value=0), -1).astype(np.int8)
+    is_night = ((hour >= NIGHT_HOURS[0]) & (hour <= NIGHT_HOURS[1])).astype(np.int8)
+    return pd.DataFrame({"hour": hour, "dow": dow, "is_night": is_night}, index=df.index)
+
+
+@dataclass
+class FileTemporalFeatures:
+    """
+    One CDR file's temporal features: int8 row columns plus per-party
+    partial counts, which add up across files into `party_rollups`.
+    """
+    hour: np.ndarray
+    dow: np.ndarray
+    is_night: np.ndarray
+    parties: np.ndarray
+    calls: np.ndarray
+    night_calls: np.ndarray
+    hour_hist: np.ndarray   # parties x 24
+    dow_hist: np.ndarray    # parties x 7
+
+    def rows(self) -> pd.DataFrame:
+        return pd.DataFrame({"hour": self.hour, "dow": self.dow, "is_night": self.is_night})
+
+
+def _party_counts(df: pd.DataFrame, rows: pd.DataFrame, a_col: str, b_col: str) -> dict:
+    """Every call counts once for each distinct party on it."""
+    a = df[a_col].to_numpy(dtype=object)
+    b = df[b_col].to_numpy(dtype=object)
+    a_ok = ~pd.isna(a)
+    b_ok = ~pd.isna(b) & ~(a_ok & (a == b))
+    values = np.concatenate([a[a_ok], b[b_ok]])
+    hour = np.concatenate([rows["hour"].to_numpy()[a_ok], rows["hour"].to_numpy()[b_ok]]).astype(np.int64)
+    dow = np.concatenate([rows["dow"].to_numpy()[a_ok], rows["dow"].to_numpy()[b_ok]]).astype(np.int64)
+    night = np.concatenate([rows["is_night"].to_numpy()[a_ok], rows["is_night"].to_numpy()[b_ok]])
+
+    codes, parties = pd.factorize(pd.Index(values).astype(str) if len(values) else pd.Index([], dtype=object))
+    n = len(parties)
+    timed = hour >= 0
+    return {
+        "parties": np.asarray(parties, dtype=str),
+        "calls": np.bincount(codes, minlength=n).astype(np.int64),
+        "night_calls": np.bincount(codes, weights=night, minlength=n).astype(np.int64),
+        "hour_hist": np.bincount(codes[timed] * 24 + hour[timed], minlength=n * 24).reshape(n, 24).astype(np.int32),
+        "dow_hist": np.bincount(codes[timed] * 7 + dow[timed], minlength=n * 7).reshape(n, 7).astype(np.int32),
+    }
+
+
+def column_key(*columns: str) -> str:
+    """Short, filename-safe key of the column names a cached aggregate was built from."""
+    return hashlib.sha1("\0".join(columns).encode()).hexdigest()[:8]
+
+
+class TemporalFeatureStore:
+    """
+    Temporal features per ingested CDR file, cached under
+    TEMPORAL_CACHE_DIR/<hash[:2]>/<hash>-<column key>.npz. Ingest fills it
+    for every CDR upload; a file is computed once, and a case's rollups are
+    then a sum over its files' cached partial counts, so appending a file
+    only costs that file.
+    """
+
+    def __init__(self, root: str | Path = TEMPORAL_CACHE_DIR, a_col: str = "a_party", b_col: str = "b_party"):
+        self.root = Path(root)
+        self.a_col = a_col
+        self.b_col = b_col
+
+    def _path(self, file_hash: str) -> Path:
+        return self.root / file_hash[:2] / f"{file_hash}-{column_key(self.a_col, self.b_col)}.npz"
+
+    def has(self, file_hash: str) -> bool:
+        return self._path(file_hash).exists()
+
+    def file_features(self, file_hash: str, df: Optional[pd.DataFrame] = None,
+                      path: Optional[str] = None) -> FileTemporalFeatures:
+        """Cached features for one file; computed from `df` (or by reading `path`) on a miss."""
+        cache_path = self._path(file_hash)
+        if cache_path.exists():
+            with np.load(cache_path) as data:
+                return FileTemporalFeatures(**{k: data[k] for k in data.files})
+
+        if df is None:
+            if path is None:
+                raise ValueError(f"No cached temporal features for {file_hash}; pass df or path")
+            from app.ingest.parsers import read_cdr
+            df, _ = read_cdr(path, file_hash=file_hash)
+        rows = temporal_features(df)
+        features = FileTemporalFeatures(
+            hour=rows["hour"].to_numpy(),
+            dow=rows["dow"].to_numpy(),
+            is_night=rows["is_night"].to_numpy(),
+            **_party_counts(df, rows, self.a_col, self.b_col),
+        )
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_name(f".{uuid.uuid4().hex}.npz")
+        np.savez(tmp, **features.__dict__)
+        tmp.replace(cache_path)
+        return features
+
+    def party_rollups(self, files: Iterable[str | tuple[str, Optional[str]]]) -> pd.DataFrame:
+        """
+        Per-party activity over the given file hashes (or (hash, path) pairs
+        for files not cached yet): calls, night_calls, night_ratio and
+        hour_00..hour_23 / dow_0..dow_6 counts.
+        """
+        frames = []
+        for file in files:
+            file_hash, path = (file, None) if isinstance(file, str) else file
+            f = self.file_features(file_hash, path=path)
+            frames.append(pd.DataFrame(
+                np.column_stack([f.calls, f.night_calls, f.hour_hist, f.dow_hist]),
+                index=f.parties,
+            ))
+        columns = ["calls", "night_calls"] + [f"hour_{h:02d}" for h in range(24)] + [f"dow_{d}" for d in range(7)]
+        if not frames:
+            out = pd.DataFrame(columns=columns + ["night_ratio"])
+            out.index.name = "party"
+            return out
+        out = pd.concat(frames).groupby(level=0, sort=False).sum()
+        out.columns = columns
+        out.index.name = "party"
+        out["night_ratio"] = (out["night_calls"] / out["calls"].where(out["calls"] > 0)).fillna(0.0).astype(np.float32)
+        return out
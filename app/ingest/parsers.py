@@ -1,4 +1,26 @@
+from __future__ import annotations
+
+import json
+import uuid
+from pathlib import Path
+from typing import Iterator, Optional
+
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+from app.core.config import CDR_CHUNK_ROWS, CDR_CACHE_DIR
+from app.ingest.pdf_text import file_sha256
+from app.ingest.validators import CDRValidationStats
+
+try:
+    import pyarrow  # noqa: F401  (Parquet engine)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Identifier columns: read as text (keeps leading '+'/'0') and stored as categoricals
+CDR_CATEGORY_COLUMNS = ("a_party", "b_party", "cell_id")
+CDR_SUFFIXES = (".csv", ".xlsx")
 
 def load_file_to_df(path: str) -> pd.DataFrame:
     p = path.lower()
@@ -7,3 +29,127 @@ def load_file_to_df(path: str) -> pd.DataFrame:
     if p.endswith(".xlsx"):
         return pd.read_excel(path)
     raise ValueError("Unsupported file format")
+
+def _cdr_format(path: str) -> str:
+    """Format by suffix. Spooled files have none, so an XLSX is told apart by its zip signature."""
+    p = path.lower()
+    for suffix in CDR_SUFFIXES:
+        if p.endswith(suffix):
+            return suffix[1:]
+    if Path(path).suffix:
+        raise ValueError("Unsupported file format")
+    with open(path, "rb") as fh:
+        return "xlsx" if fh.read(4) == b"PK\x03\x04" else "csv"
+
+def is_cdr_file(path: str, filename: str = "") -> bool:
+    """True for a CSV/XLSX (by `filename`, or `path`) whose header names both parties and a timestamp."""
+    if not (filename or path).lower().endswith(CDR_SUFFIXES):
+        return False
+    try:
+        if _cdr_format(path) == "csv":
+            header = pd.read_csv(path, nrows=0).columns
+        else:
+            header = pd.read_excel(path, nrows=0).columns
+    except Exception:
+        return False
+    return {"a_party", "b_party", "timestamp"} <= {str(c).lower() for c in header}
+
+def _typed_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    if _cdr_format(path) == "csv":
+        header = pd.read_csv(path, nrows=0).columns
+        # The C parser builds categoricals of the raw text directly.
+        dtypes = {c: "category" for c in header if str(c).lower() in CDR_CATEGORY_COLUMNS}
+        dtypes.update({c: str for c in header if str(c).lower() == "timestamp"})
+        yield from pd.read_csv(path, dtype=dtypes, chunksize=chunksize)
+    else:
+        # openpyxl cannot stream through pandas; slice the sheet instead.
+        df = pd.read_excel(path)
+        for i in range(0, max(len(df), 1), chunksize):
+            yield df.iloc[i:i + chunksize].copy()
+
+def iter_cdr_chunks(path: str, chunksize: int = CDR_CHUNK_ROWS,
+                    stats: Optional[CDRValidationStats] = None) -> Iterator[pd.DataFrame]:
+    """
+    Reads a CDR file `chunksize` rows at a time with explicit types:
+    party and cell ids as categoricals, `timestamp` as datetime64.
+    Validation statistics are folded into `stats` as each chunk is read.
+    """
+    for chunk in _typed_chunks(path, chunksize):
+        names = {str(c).lower(): c for c in chunk.columns}
+        parsed = None
+        failures = 0
+        if "timestamp" in names:
+            raw = chunk[names["timestamp"]]
+            parsed = pd.to_datetime(raw, errors="coerce")
+            failures = int((parsed.isna() & raw.notna()).sum())
+        if stats is not None:
+            # Nulls as read: unparseable timestamps count as failures only
+            stats.update(chunk, failures)
+        if parsed is not None:
+            chunk[names["timestamp"]] = parsed
+        for key in CDR_CATEGORY_COLUMNS:
+            col = names.get(key)
+            if col is not None and not isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                chunk[col] = chunk[col].astype(str).where(chunk[col].notna()).astype("category")
+        yield chunk
+
+def _concat_chunks(chunks: list[pd.DataFrame]) -> pd.DataFrame:
+    if not chunks:
+        return pd.DataFrame()
+    columns = list(chunks[0].columns)
+    cat_cols = [c for c in columns if isinstance(chunks[0][c].dtype, pd.CategoricalDtype)]
+    # Each chunk has its own categories; union them instead of falling back to object.
+    merged = {c: union_categoricals([ch[c] for ch in chunks], ignore_order=True) for c in cat_cols}
+    df = pd.concat([ch.drop(columns=cat_cols) for ch in chunks], ignore_index=True)
+    for c in cat_cols:
+        df[c] = merged[c]
+    return df[columns]
+
+def _cache_paths(cache_dir: str | Path, file_hash: str) -> tuple[Path, Path]:
+    base = Path(cache_dir) / file_hash[:2]
+    return base / f"{file_hash}.parquet", base / f"{file_hash}.json"
+
+def read_cdr(path: str, chunksize: int = CDR_CHUNK_ROWS, file_hash: Optional[str] = None,
+             cache_dir: Optional[str | Path] = CDR_CACHE_DIR) -> tuple[pd.DataFrame, dict]:
+    """
+    Typed, chunked CDR load. Returns (df, validation) where `validation` has
+    the same fields as `validate_cdr`, computed while reading. With pyarrow
+    installed the result is cached as Parquet keyed by the file's SHA-256,
+    so later loads skip parsing entirely.
+    """
+    use_cache = cache_dir is not None and PARQUET_AVAILABLE
+    if use_cache:
+        file_hash = file_hash or file_sha256(Path(path))
+        data_path, meta_path = _cache_paths(cache_dir, file_hash)
+        if data_path.exists() and meta_path.exists():
+            return pd.read_parquet(data_path), json.loads(meta_path.read_text())["validation"]
+
+    stats = CDRValidationStats()
+    df = _concat_chunks(list(iter_cdr_chunks(path, chunksize, stats)))
+    validation = stats.result()
+
+    if use_cache:
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = data_path.with_name(f".{uuid.uuid4().hex}.part")
+        df.to_parquet(tmp, index=False)
+        tmp.replace(data_path)
+        meta_path.write_text(json.dumps({"validation": validation, "rows": len(df)}))
+    return df, validation
+
+def iter_cdr(path: Optional[str], file_hash: Optional[str] = None, chunksize: int = CDR_CHUNK_ROWS,
+             cache_dir: Optional[str | Path] = CDR_CACHE_DIR) -> Iterator[pd.DataFrame]:
+    """
+    Typed CDR chunks for out-of-core consumers: record batches of the
+    Parquet cache when `read_cdr` already cached the file, else
+    `iter_cdr_chunks` over the raw file. Never holds the whole file.
+    """
+    if cache_dir is not None and file_hash and PARQUET_AVAILABLE:
+        data_path, _ = _cache_paths(cache_dir, file_hash)
+        if data_path.exists():
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(data_path).iter_batches(batch_size=chunksize):
+                yield batch.to_pandas()
+            return
+    if path is None:
+        raise ValueError(f"CDR {file_hash} is not cached; pass its path")
+    yield from iter_cdr_chunks(path, chunksize)
@@ -0,0 +1,140 @@
+"""
+Page-level PDF text extraction.
+
+Pages are extracted in batches on a process pool and cached on disk under
+PDF_CACHE_DIR/<hash[:2]>/<hash>/<page>.txt, so re-analysis of the same file
+never runs pypdf again. `iter_pdf_pages` yields page text in page order as
+soon as each page is available, letting callers start work on early pages
+while later ones are still being extracted.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from app.core.config import PDF_CACHE_DIR, PDF_EXTRACT_WORKERS, PDF_PAGES_PER_TASK, SPOOL_CHUNK_SIZE
+
+try:
+    from pypdf import PdfReader
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+
+def file_sha256(path: Path, chunk_size: int = SPOOL_CHUNK_SIZE) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PageTextCache:
+    """Extracted text per (file hash, page number), plus the page count once a file is complete."""
+
+    def __init__(self, root: str | Path = PDF_CACHE_DIR):
+        self.root = Path(root)
+
+    def _dir(self, file_hash: str) -> Path:
+        return self.root / file_hash[:2] / file_hash
+
+    @staticmethod
+    def _write(path: Path, data: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+        tmp.write_text(data, encoding="utf-8")
+        tmp.replace(path)
+
+    def get(self, file_hash: str, page: int) -> Optional[str]:
+        path = self._dir(file_hash) / f"{page:06d}.txt"
+        try:
+            return path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def put(self, file_hash: str, page: int, text: str) -> None:
+        self._write(self._dir(file_hash) / f"{page:06d}.txt", text)
+
+    def page_count(self, file_hash: str) -> Optional[int]:
+        try:
+            return json.loads((self._dir(file_hash) / "meta.json").read_text())["page_count"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def mark_complete(self, file_hash: str, page_count: int) -> None:
+        self._write(self._dir(file_hash) / "meta.json", json.dumps({"page_count": page_count}))
+
+
+def _extract_pages(path: str, pages: List[int], reader: Optional[PdfReader] = None) -> List[tuple[int, str]]:
+    """Pool task: opens the PDF in the worker process and extracts a batch of pages."""
+    reader = reader or PdfReader(path)
+    return [(p, reader.pages[p].extract_text() or "") for p in pages]
+
+
+def iter_pdf_pages(
+    path: str | Path,
+    file_hash: Optional[str] = None,
+    workers: int = PDF_EXTRACT_WORKERS,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+    cache: Optional[PageTextCache] = None,
+) -> Iterator[str]:
+    """
+    Yields the text of every page in order. Cached pages are read from disk;
+    the rest are extracted in batches of `pages_per_task`, on a pool of
+    `workers` processes when there is more than one batch to do.
+    """
+    path = Path(path)
+    cache = cache or PageTextCache()
+    file_hash = file_hash or file_sha256(path)
+
+    start = 0
+    page_count = cache.page_count(file_hash)
+    if page_count is not None:
+        for start in range(page_count):
+            text = cache.get(file_hash, start)
+            if text is None:
+                break  # cache was pruned; extract from here on
+            yield text
+        else:
+            return
+
+    if not PYPDF_AVAILABLE:
+        raise ImportError("pypdf library not found.")
+    reader = PdfReader(str(path))
+    page_count = len(reader.pages)
+    cached = {p: t for p in range(start, page_count) if (t := cache.get(file_hash, p)) is not None}
+    missing = [p for p in range(start, page_count) if p not in cached]
+    batches = [missing[i:i + pages_per_task] for i in range(0, len(missing), pages_per_task)]
+
+    if len(batches) > 1 and workers > 1:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(batches)))
+        pending = [pool.submit(_extract_pages, str(path), batch) for batch in batches]
+    else:
+        pool, pending = None, None
+
+    try:
+        next_batch = 0
+        for p in range(start, page_count):
+            while p not in cached:
+                if pending is not None:
+                    results = pending[next_batch].result()
+                else:
+                    results = _extract_pages(str(path), batches[next_batch], reader)
+                next_batch += 1
+                for page, text in results:
+                    cache.put(file_hash, page, text)
+                    cached[page] = text
+            yield cached.pop(p)
+        cache.mark_complete(file_hash, page_count)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def extract_pdf_text(path: str | Path, file_hash: Optional[str] = None, **kwargs) -> str:
+    return " ".join(iter_pdf_pages(path, file_hash, **kwargs))
+
@@ -1,18 +1,53 @@
 from __future__ import annotations
 import pandas as pd
 
-def validate_cdr(df: pd.DataFrame) -> dict:
-    required_cols = {"a_party", "b_party", "timestamp", "cell_id"}
-    cols = set([str(c).lower() for c in df.columns])
-    missing = sorted(list(required_cols - cols))
-    completeness = 100.0 * (1.0 - (len(missing) / max(len(required_cols), 1)))
+REQUIRED_CDR_COLUMNS = {"a_party", "b_party", "timestamp", "cell_id"}
 
+def validate_cdr(df: pd.DataFrame) -> dict:
     null_rate = float(df.isna().mean().mean())
     time_parse_ok = 1.0
     try:
         pd.to_datetime(df["timestamp"], errors="raise")
     except Exception:
         time_parse_ok = 0.0
+    return cdr_validation_result(df.columns, null_rate, time_parse_ok)
+
+class CDRValidationStats:
+    """
+    Accumulates `validate_cdr` statistics chunk by chunk, so a CDR file can
+    be validated while it is read instead of in extra passes afterwards.
+    """
+
+    def __init__(self):
+        self.columns: list = []
+        self.rows = 0
+        self.null_counts: dict = {}
+        self.timestamp_failures = 0
+        self.has_timestamp = False
+
+    def update(self, chunk: pd.DataFrame, timestamp_failures: int = 0) -> None:
+        """`chunk` as read, before typing; `timestamp_failures` = non-null values that failed to parse."""
+        if not self.columns:
+            self.columns = list(chunk.columns)
+            self.has_timestamp = "timestamp" in chunk.columns
+        self.rows += len(chunk)
+        for col, n in chunk.isna().sum().items():
+            self.null_counts[col] = self.null_counts.get(col, 0) + int(n)
+        self.timestamp_failures += timestamp_failures
+
+    def result(self) -> dict:
+        if self.rows and self.columns:
+            null_rate = sum(self.null_counts.values()) / (self.rows * len(self.columns))
+        else:
+            null_rate = float("nan")
+        time_parse_ok = 1.0 if self.has_timestamp and self.timestamp_failures == 0 else 0.0
+        return cdr_validation_result(self.columns, null_rate, time_parse_ok)
+
+def cdr_validation_result(columns, null_rate: float, time_parse_ok: float) -> dict:
+    required_cols = REQUIRED_CDR_COLUMNS
+    cols = set([str(c).lower() for c in columns])
+    missing = sorted(list(required_cols - cols))
+    completeness = 100.0 * (1.0 - (len(missing) / max(len(required_cols), 1)))
 
     validation_score = max(0.0, completeness - (null_rate * 50.0) + (time_parse_ok * 10.0))
     validation_score = min(100.0, validation_score)
@@ -0,0 +1,237 @@
+"""
+Ingest worker pool: claims queued IngestJobs and runs forensic discovery
+on their spooled files outside the HTTP request. The files of one job are
+analyzed in parallel and their findings written in a single transaction.
+
+Run with: python -m app.ingest.worker [--workers N]
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from uuid import UUID
+
+from app.ai.models import load_anomaly_model
+from app.core.config import (
+    INGEST_WORKERS, INGEST_POLL_SECONDS, INGEST_FILE_WORKERS, INGEST_LEASE_RENEW_SECONDS, PDF_EXTRACT_WORKERS,
+)
+from app.core.logging import get_logger
+from app.db.models import IngestJob, IngestFile
+from app.db.session import SessionLocal, engine
+from app.services import ingest_service
+from app.services.agent_service import agent_service
+
+log = get_logger("intelweave.ingest.worker")
+
+
+def analyze_spooled_file(path: str, filename: str, file_hash: str, pdf_workers: int) -> dict:
+    """Pool task: discovery for one spooled file. Never touches the database."""
+    return agent_service.analyze_file(Path(path), filename, file_hash, pdf_workers)
+
+
+def _init_pool_process() -> None:
+    # Forked children must not use (or close) the parent's pooled connections.
+    engine.dispose(close=False)
+
+
+def analyze_files(files: list[IngestFile], workers: int = INGEST_FILE_WORKERS) -> dict[UUID, dict | Exception]:
+    """
+    Runs discovery for every file, across `workers` processes when there is
+    more than one file. Returns findings (or the raised error) per file_id.
+    """
+    tasks = {
+        f.file_id: (str(ingest_service.spool_path(f.sha256_hash)), f.filename, f.sha256_hash)
+        for f in files
+    }
+    workers = min(max(workers, 1), len(tasks))
+    results: dict[UUID, dict | Exception] = {}
+    if workers <= 1:
+        for file_id, args in tasks.items():
+            try:
+                results[file_id] = analyze_spooled_file(*args, PDF_EXTRACT_WORKERS)
+            except Exception as e:
+                log.exception("Discovery failed for file %s", file_id)
+                results[file_id] = e
+        return results
+
+    # Load the anomaly model before forking so every pool process shares the parent's copy.
+    load_anomaly_model()
+    # Share the CPU budget for page extraction between the files in flight.
+    pdf_workers = max(1, PDF_EXTRACT_WORKERS // workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_process) as pool:
+        futures = {pool.submit(analyze_spooled_file, *args, pdf_workers): file_id for file_id, args in tasks.items()}
+        for future in as_completed(futures):
+            file_id = futures[future]
+            try:
+                results[file_id] = future.result()
+            except Exception as e:
+                log.exception("Discovery failed for file %s", file_id)
+                results[file_id] = e
+    return results
+
+
+def persist_results(db, job: IngestJob, file_ids: list[UUID], results: dict[UUID, dict | Exception],
+                    lease_token: UUID) -> None:
+    """
+    Writes every successful file's findings in one batched transaction, then
+    records per-file status. Both transactions are fenced on `lease_token`,
+    so a worker whose job was reclaimed writes nothing.
+    """
+    analyzed = [
+        (file_id, r) for file_id, r in results.items()
+        if isinstance(r, dict) and not r.get("skipped_reason")
+    ]
+    write_error = None
+    ingest_service.hold_lease(db, job.job_id, lease_token)
+    try:
+        agent_service.persist_files_batched(db, job.case_id, analyzed)
+    except Exception as e:
+        log.exception("Persisting findings failed for job %s", job.job_id)
+        write_error = e
+
+    ingest_service.hold_lease(db, job.job_id, lease_token)
+    for file_id in file_ids:
+        file_record = db.get(IngestFile, file_id)
+        result = results.get(file_id)
+        if isinstance(result, Exception) or result is None:
+            file_record.status = "failed"
+            file_record.error = str(result) if result else "No result"
+        elif result.get("skipped_reason"):
+            file_record.status = "skipped"
+            file_record.error = result["skipped_reason"]
+        elif write_error is not None:
+            file_record.status = "failed"
+            file_record.error = str(write_error)
+        else:
+            file_record.status = "completed"
+            file_record.entities_found = len(result["entities"])
+            file_record.insights_found = len(result["insights"])
+    db.commit()
+
+
+@contextmanager
+def keep_lease(db, job_id: UUID, lease_token: UUID, every: float = INGEST_LEASE_RENEW_SECONDS):
+    """
+    Renews the job's lease from a background thread (with its own session)
+    while the block runs. On the way out `db` is rolled back before the
+    thread is joined: a block that failed while `hold_lease` held the job
+    row lock would otherwise wait on a renewal blocked on that same lock.
+    """
+    stop = threading.Event()
+
+    def renew() -> None:
+        while not stop.wait(every):
+            db = SessionLocal()
+            try:
+                if not ingest_service.renew_lease(db, job_id, lease_token):
+                    log.warning("Lease on ingest job %s was lost", job_id)
+                    return
+            except Exception:
+                log.exception("Renewing the lease on ingest job %s failed", job_id)
+            finally:
+                db.close()
+
+    thread = threading.Thread(target=renew, name=f"lease-{job_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        db.rollback()
+        thread.join()
+
+
+def process_job(db, job: IngestJob, file_workers: int = INGEST_FILE_WORKERS) -> IngestJob:
+    """Runs a claimed job while renewing its lease. Raises LeaseLost if another worker reclaimed it."""
+    # Read once: the attribute reloads after each commit and would follow a reclaim
+    lease_token = job.lease_token
+    with keep_lease(db, job.job_id, lease_token):
+        files = db.query(IngestFile)\
+            .filter(IngestFile.job_id == job.job_id, IngestFile.status.in_(["queued", "running"]))\
+            .order_by(IngestFile.created_at.asc())\
+            .all()
+        file_ids = [f.file_id for f in files]
+        ingest_service.hold_lease(db, job.job_id, lease_token)
+        for file_record in files:
+            file_record.status = "running"
+        db.commit()
+
+        results = analyze_files(files, file_workers)
+        persist_results(db, job, file_ids, results, lease_token)
+        for file_id in file_ids:
+            ingest_service.hold_lease(db, job.job_id, lease_token)
+            ingest_service.resolve_pending_links(db, db.get(IngestFile, file_id))
+        ingest_service.hold_lease(db, job.job_id, lease_token)
+        return ingest_service.finish_job(db, job)
+
+
+def run_once(file_workers: int = INGEST_FILE_WORKERS) -> bool:
+    """Claims and processes at most one job. Returns False when the queue is empty."""
+    db = SessionLocal()
+    try:
+        expired = ingest_service.expire_pending_jobs(db)
+        if expired:
+            log.warning("Failed %d ingest job(s) whose upload never completed", expired)
+        job = ingest_service.claim_next_job(db)
+        if not job:
+            return False
+        log.info("Claimed ingest job %s", job.job_id)
+        try:
+            job = process_job(db, job, file_workers)
+        except ingest_service.LeaseLost:
+            log.warning("Ingest job %s was reclaimed by another worker; dropping this run", job.job_id)
+            return True
+        log.info("Ingest job %s finished: %s", job.job_id, job.status)
+        return True
+    finally:
+        db.close()
+
+
+def run_worker(poll_seconds: float = INGEST_POLL_SECONDS, file_workers: int = INGEST_FILE_WORKERS) -> None:
+    # Connections inherited from the parent process must not be reused after fork.
+    engine.dispose(close=False)
+    while True:
+        try:
+            if not run_once(file_workers):
+                time.sleep(poll_seconds)
+        except Exception:
+            log.exception("Ingest worker loop error")
+            time.sleep(poll_seconds)
+
+
+def start_worker_pool(workers: int = INGEST_WORKERS, poll_seconds: float = INGEST_POLL_SECONDS,
+                      file_workers: int = INGEST_FILE_WORKERS) -> list[mp.Process]:
+    procs = []
+    for i in range(max(workers, 1)):
+        # Not daemonic: workers start their own process pools for PDF page extraction.
+        p = mp.Process(target=run_worker, args=(poll_seconds, file_workers), name=f"ingest-worker-{i}")
+        p.start()
+        procs.append(p)
+    log.info("Started %d ingest worker(s)", len(procs))
+    return procs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="IntelWeave ingest worker pool")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--poll", type=float, default=INGEST_POLL_SECONDS)
+    parser.add_argument("--file-workers", type=int, default=INGEST_FILE_WORKERS,
+                        help="processes per worker for analyzing the files of one job")
+    args = parser.parse_args()
+
+    procs = start_worker_pool(args.workers, args.poll, args.file_workers)
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from sqlalchemy import insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from typing import Iterable, List, Type
+
+from app.core.config import BULK_INSERT_CHUNK_SIZE
+
+
+def chunked(rows: List[dict], size: int) -> Iterable[List[dict]]:
+    for i in range(0, len(rows), max(size, 1)):
+        yield rows[i:i + size]
+
+
+def insert_rows(db: Session, model: Type, rows: List[dict], chunk_size: int | None = None) -> int:
+    """
+    Multi-row INSERT of plain dicts, `chunk_size` rows per statement.
+    Does not commit: callers own the transaction.
+    """
+    size = chunk_size or BULK_INSERT_CHUNK_SIZE
+    for chunk in chunked(rows, size):
+        db.execute(insert(model).values(chunk))
+    return len(rows)
+
+
+def insert_missing_rows(db: Session, model: Type, rows: List[dict], conflict_column: str,
+                        chunk_size: int | None = None) -> int:
+    """
+    Like `insert_rows`, but rows whose `conflict_column` (a unique column)
+    already exists are skipped rather than failing the statement:
+    INSERT ... ON CONFLICT DO NOTHING on PostgreSQL and SQLite, ON DUPLICATE
+    KEY UPDATE of the key to itself on MySQL. Does not commit.
+    """
+    size = chunk_size or BULK_INSERT_CHUNK_SIZE
+    dialect = db.get_bind().dialect.name
+    for chunk in chunked(rows, size):
+        if dialect == "mysql":
+            stmt = mysql_insert(model).values(chunk)
+            stmt = stmt.on_duplicate_key_update({conflict_column: stmt.inserted[conflict_column]})
+        else:
+            upsert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            stmt = upsert(model).values(chunk).on_conflict_do_nothing(index_elements=[conflict_column])
+        db.execute(stmt)
+    return len(rows)
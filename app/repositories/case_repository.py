@@ -1,13 +1,27 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from uuid import UUID
 from app.db import models
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from app.repositories.pagination import keyset_page
+
+CASE_FIELDS = {
+    "case_id": models.Case.case_id,
+    "title": models.Case.title,
+    "status": models.Case.status,
+    "jurisdiction": models.Case.jurisdiction,
+    "integrity_score": models.Case.integrity_score,
+    "created_at": models.Case.created_at,
+}
 
 def get_case_by_id(db: Session, case_id: UUID) -> Optional[models.Case]:
     return db.get(models.Case, case_id)
 
-def get_all_cases(db: Session, limit: int = 100) -> List[models.Case]:
-    return db.query(models.Case).limit(limit).all()
+def get_all_cases(db: Session, limit: int = 100, cursor: Optional[str] = None,
+                  fields: Optional[List[str]] = None) -> Tuple[List[dict], Optional[str]]:
+    """One (created_at, case_id) page of cases, and the cursor of the next one."""
+    return keyset_page(db, CASE_FIELDS, fields or list(CASE_FIELDS), select(models.Case),
+                       models.Case.created_at, models.Case.case_id, cursor, limit)
 
 def count_total_cases(db: Session) -> int:
     return db.query(models.Case).count()
@@ -23,6 +37,9 @@ def create_case(db: Session, title: str, status: str, jurisdiction: str) -> mode
         created_by=None
     )
     db.add(db_case)
+    db.flush()
+    # Graph writes lock this row to number their versions; creating it here avoids racing to insert it later.
+    db.add(models.CaseGraphState(case_id=db_case.case_id, version=0))
     db.commit()
     db.refresh(db_case)
     return db_case
@@ -1,13 +1,90 @@
 from sqlalchemy.orm import Session
-from uuid import UUID
+from sqlalchemy import bindparam, case, delete, func, literal, null, or_, select, tuple_, union, update
+from datetime import datetime
+from uuid import UUID, uuid4
 from app.db import models
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.repositories.bulk import chunked, insert_missing_rows, insert_rows
+from app.repositories.graph_repository import stamp_graph_version
+from app.repositories.pagination import iter_keyset, keyset_page
+
+# Field names of the /cases/{id}/entities listing
+CASE_ENTITY_FIELDS = {
+    "entity_id": models.Entity.entity_id,
+    "label": models.Entity.label,
+    "type": models.Entity.entity_type,
+    "role": models.CaseEntity.role_in_case,
+    "confidence": models.Entity.confidence_score,
+}
 
 def get_entity_by_id(db: Session, entity_id: UUID) -> Optional[models.Entity]:
     return db.get(models.Entity, entity_id)
 
-def search_entities(db: Session, query: str, limit: int = 50) -> List[models.Entity]:
-    return db.query(models.Entity).filter(models.Entity.label.ilike(f"%{query}%")).limit(limit).all()
+def _search_filters(stmt, entity_type: Optional[str], case_id: Optional[UUID]):
+    if entity_type:
+        stmt = stmt.where(models.Entity.entity_type == entity_type)
+    if case_id:
+        stmt = stmt.where(models.Entity.entity_id.in_(
+            select(models.CaseEntity.entity_id).where(models.CaseEntity.case_id == case_id)
+        ))
+    return stmt
+
+def search_entities(db: Session, query: str, entity_type: Optional[str] = None, case_id: Optional[UUID] = None,
+                    fuzzy: bool = True, limit: int = 50, candidates: int = 200,
+                    threshold: float = 0.5) -> List[Tuple[models.Entity, float]]:
+    """
+    Ranked label search on PostgreSQL (pg_trgm). `query` is already
+    lowercased. Candidates come from two index-ordered scans of at most
+    `candidates` rows each:
+    - labels starting with the query (btree on lower(label) text_pattern_ops);
+    - labels whose words resemble it (word_similarity >= `threshold`, nearest
+      first by GiST trigram KNN), or with `fuzzy` off, labels containing it,
+      most word-similar first (then by label, so the cut is deterministic).
+    The candidates are then ranked: +2 exact, +1 prefix, + word_similarity.
+    """
+    e = models.Entity
+    label = func.lower(e.label)
+    prefix = _search_filters(select(e.entity_id).where(label.startswith(query, autoescape=True)), entity_type, case_id)
+    branches = [prefix.order_by(label).limit(candidates)]
+    if len(query) >= 3:  # shorter queries have no full trigram to match on
+        if fuzzy:
+            db.execute(select(func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True)))
+            near = select(e.entity_id).where(literal(query).op("<%")(label))
+            branches.append(_search_filters(near, entity_type, case_id).order_by(literal(query).op("<<->")(label)).limit(candidates))
+        else:
+            inside = select(e.entity_id).where(label.contains(query, autoescape=True))
+            similarity = func.word_similarity(query, label)
+            branches.append(_search_filters(inside, entity_type, case_id).order_by(similarity.desc(), label).limit(candidates))
+    score = (
+        case((label == query, 2.0), else_=0.0)
+        + case((label.startswith(query, autoescape=True), 1.0), else_=0.0)
+        + func.word_similarity(query, label)
+    )
+    found = (union(*branches) if len(branches) > 1 else branches[0]).subquery()
+    stmt = (
+        select(e, score.label("score"))
+        .where(e.entity_id.in_(select(found.c.entity_id)))
+        .order_by(score.desc(), e.label)
+        .limit(limit)
+    )
+    return [(entity, float(rank)) for entity, rank in db.execute(stmt).all()]
+
+def get_entities_by_ids(db: Session, entity_ids: List[UUID]) -> Dict[UUID, models.Entity]:
+    if not entity_ids:
+        return {}
+    return {e.entity_id: e for e in db.scalars(select(models.Entity).where(models.Entity.entity_id.in_(entity_ids)))}
+
+def iter_entity_labels(db: Session, since: Optional[datetime] = None, batch_rows: int = 10000) -> Iterator[list]:
+    """(entity_id, label, entity_type, created_at) of entities created at or after `since`, oldest first, in batches."""
+    e = models.Entity
+    stmt = select(e.entity_id, e.label, e.entity_type, e.created_at)
+    if since is not None:
+        stmt = stmt.where(e.created_at >= since)
+    result = db.execute(stmt.order_by(e.created_at, e.entity_id).execution_options(yield_per=batch_rows))
+    return result.partitions()
+
+def get_case_entity_ids(db: Session, case_id: UUID) -> List[UUID]:
+    return list(db.scalars(select(models.CaseEntity.entity_id).where(models.CaseEntity.case_id == case_id)))
 
 def get_entities_by_case(db: Session, case_id: UUID) -> List[tuple[models.CaseEntity, models.Entity]]:
     return db.query(models.CaseEntity, models.Entity)\
@@ -15,17 +92,264 @@ def get_entities_by_case(db: Session, case_id: UUID) -> List[tuple[models.CaseEn
         .filter(models.CaseEntity.case_id == case_id)\
         .all()
 
+def get_case_entity_page(db: Session, case_id: UUID, fields: List[str], cursor: Optional[str] = None,
+                         limit: int = 500) -> Tuple[List[dict], Optional[str]]:
+    """Entities of a case in the order they were linked into it: (case_entities.created_at, entity_id)."""
+    return keyset_page(db, CASE_ENTITY_FIELDS, fields, _case_entities(case_id), models.CaseEntity.created_at,
+                       models.CaseEntity.entity_id, cursor, limit)
+
+def iter_case_entities(db: Session, case_id: UUID, fields: List[str], cursor: Optional[str] = None,
+                       batch_rows: int = 1000) -> Iterator[List[dict]]:
+    return iter_keyset(db, CASE_ENTITY_FIELDS, fields, _case_entities(case_id), models.CaseEntity.created_at,
+                       models.CaseEntity.entity_id, cursor, batch_rows)
+
+def _case_entities(case_id: UUID):
+    return select(models.CaseEntity)\
+        .join(models.Entity, models.CaseEntity.entity_id == models.Entity.entity_id)\
+        .where(models.CaseEntity.case_id == case_id)
+
 def get_entities_by_case_raw(db: Session, case_id: UUID) -> List[models.Entity]:
     return db.query(models.Entity).join(models.CaseEntity).filter(models.CaseEntity.case_id == case_id).all()
 
-def create_entity(db: Session, entity_type: str, label: str, risk_score: float = 0.0, confidence_score: float = 0.0) -> models.Entity:
+def create_entity(db: Session, entity_type: str, label: str, risk_score: float = 0.0, confidence_score: float = 0.0,
+                  resolution_key: Optional[str] = None) -> models.Entity:
     db_entity = models.Entity(
         entity_type=entity_type,
         label=label,
         risk_score=risk_score,
-        confidence_score=confidence_score
+        confidence_score=confidence_score,
+        resolution_key=resolution_key
     )
     db.add(db_entity)
     db.commit()
     db.refresh(db_entity)
     return db_entity
+
+
+def bulk_create_entities(db: Session, rows: List[dict], chunk_size: Optional[int] = None) -> int:
+    """Rows must carry a client-generated `entity_id`. Does not commit."""
+    created_at = models.now()
+    for row in rows:
+        row.setdefault("created_at", created_at)
+    return insert_rows(db, models.Entity, rows, chunk_size)
+
+def get_entity_ids_by_keys(db: Session, keys: Iterable[str], chunk_size: int = 1000) -> Dict[str, UUID]:
+    """resolution_key -> entity_id for the keys some entity holds, looked up `chunk_size` keys per query."""
+    found: Dict[str, UUID] = {}
+    for chunk in chunked(list(keys), chunk_size):
+        stmt = select(models.Entity.resolution_key, models.Entity.entity_id).where(models.Entity.resolution_key.in_(chunk))
+        found.update(db.execute(stmt).all())
+    return found
+
+def insert_resolved_entities(db: Session, rows: List[dict], chunk_size: Optional[int] = None) -> Dict[str, UUID]:
+    """
+    Rows carry a client-generated `entity_id` and a distinct `resolution_key`
+    that no entity held when the caller looked. A key taken since by another
+    writer is skipped (ON CONFLICT) and its holder read back. Returns
+    resolution_key -> entity_id of the entity holding each key. Does not commit.
+    """
+    created_at = models.now()
+    for row in rows:
+        row.setdefault("created_at", created_at)
+    insert_missing_rows(db, models.Entity, rows, "resolution_key", chunk_size)
+    return get_entity_ids_by_keys(db, [row["resolution_key"] for row in rows])
+
+def raise_entity_scores(db: Session, scores: Dict[UUID, Tuple[float, float]]) -> None:
+    """
+    entity_id -> (risk_score, confidence_score): raises each entity's scores
+    to at least these values, in SQL so concurrent raises are not lost (the
+    same max `merge_entities` keeps). Does not commit.
+    """
+    if not scores:
+        return
+    # Core table, not the ORM entity: an ORM UPDATE with many parameter sets only updates by primary key
+    e = models.Entity.__table__.c
+    risk, confidence = bindparam("b_risk"), bindparam("b_confidence")
+    stmt = update(models.Entity.__table__).where(e.entity_id == bindparam("b_entity_id")).values(
+        risk_score=case((e.risk_score < risk, risk), else_=e.risk_score),
+        confidence_score=case((e.confidence_score < confidence, confidence), else_=e.confidence_score),
+    )
+    db.execute(stmt, [
+        {"b_entity_id": entity_id, "b_risk": risk_score, "b_confidence": confidence_score}
+        for entity_id, (risk_score, confidence_score) in scores.items()
+    ])
+
+def get_or_create_entity(db: Session, entity_type: str, label: str, risk_score: float, confidence_score: float,
+                         resolution_key: str) -> models.Entity:
+    """
+    The entity holding `resolution_key`, inserted when there is none. An
+    entity inserted concurrently under the same key is returned instead of
+    failing on the unique constraint. An existing entity has its risk and
+    confidence raised to the new values when they are higher. Commits.
+    """
+    row = {
+        "entity_id": uuid4(),
+        "entity_type": entity_type,
+        "label": label,
+        "risk_score": risk_score,
+        "confidence_score": confidence_score,
+        "resolution_key": resolution_key,
+    }
+    holders = insert_resolved_entities(db, [row])
+    if holders[resolution_key] != row["entity_id"]:
+        raise_entity_scores(db, {holders[resolution_key]: (risk_score, confidence_score)})
+    db.commit()
+    return get_entity_by_id(db, holders[resolution_key])
+
+def get_unresolved_entities(db: Session, after: Optional[Tuple[datetime, UUID]], limit: int) -> list:
+    """(entity_id, entity_type, label, created_at) of entities without a resolution key, in (created_at, entity_id) order after `after`."""
+    e = models.Entity
+    stmt = select(e.entity_id, e.entity_type, e.label, e.created_at).where(e.resolution_key.is_(None))
+    if after is not None:
+        stmt = stmt.where(tuple_(e.created_at, e.entity_id) > tuple_(*after))
+    return db.execute(stmt.order_by(e.created_at, e.entity_id).limit(limit)).all()
+
+def set_resolution_keys(db: Session, keys: Dict[UUID, str]) -> None:
+    """Does not commit."""
+    if keys:
+        db.execute(update(models.Entity), [{"entity_id": eid, "resolution_key": key} for eid, key in keys.items()])
+
+def _relinked(db: Session, model, owner_col, merges: Dict[UUID, UUID]) -> Tuple[List[dict], Set[UUID]]:
+    """
+    Link rows (`model` keyed by (`owner_col`, entity_id)) re-pointed from the
+    duplicates in `merges` to their survivors, oldest first, skipping links
+    the survivor already has; plus the owners the duplicates were linked to.
+    """
+    survivors = set(merges.values())
+    rows = db.scalars(select(model).where(model.entity_id.in_(list(merges) + list(survivors)))).all()
+    held = {(getattr(r, owner_col), r.entity_id) for r in rows if r.entity_id in survivors}
+    moved, owners = [], set()
+    dup_rows = [r for r in rows if r.entity_id in merges]
+    dup_rows.sort(key=lambda r: getattr(r, "created_at", None) or datetime.min)
+    for r in dup_rows:
+        owners.add(getattr(r, owner_col))
+        key = (getattr(r, owner_col), merges[r.entity_id])
+        if key in held:
+            continue
+        held.add(key)
+        row = {c.key: getattr(r, c.key) for c in model.__table__.columns}
+        row["entity_id"] = key[1]
+        moved.append(row)
+    return moved, owners
+
+def _dedupe_relationships(db: Session, moved: Set[UUID]) -> None:
+    """
+    Drops the relationships in `moved` (just re-pointed by a merge) that
+    became self-loops or now repeat another relationship of the case with
+    the same endpoints and basis. Of repeats the oldest is kept, taking the
+    highest strength and confidence and the widest first/last seen; evidence
+    of dropped relationships is moved to it (or unset for self-loops).
+    """
+    r = models.Relationship
+    ends = select(r.case_id, r.source_entity_id, r.target_entity_id, r.basis).where(r.rel_id.in_(moved))
+    rows = db.execute(
+        select(r.rel_id, r.case_id, r.source_entity_id, r.target_entity_id, r.basis, r.strength_score,
+               r.confidence_score, r.first_seen, r.last_seen, r.created_at)
+        .where(tuple_(r.case_id, r.source_entity_id, r.target_entity_id, r.basis).in_(ends))
+    ).all()
+    rows.sort(key=lambda row: (row.created_at, str(row.rel_id)))
+    kept: Dict[tuple, dict] = {}
+    dropped: Dict[UUID, Optional[UUID]] = {}
+    changed: Set[tuple] = set()
+    for row in rows:
+        if row.source_entity_id == row.target_entity_id:
+            if row.rel_id in moved:
+                dropped[row.rel_id] = None
+            continue
+        key = (row.case_id, row.source_entity_id, row.target_entity_id, row.basis)
+        k = kept.get(key)
+        if k is None:
+            kept[key] = {"rel_id": row.rel_id, "strength_score": row.strength_score,
+                         "confidence_score": row.confidence_score, "first_seen": row.first_seen,
+                         "last_seen": row.last_seen}
+            continue
+        dropped[row.rel_id] = k["rel_id"]
+        changed.add(key)
+        k["strength_score"] = max(k["strength_score"], row.strength_score)
+        k["confidence_score"] = max(k["confidence_score"], row.confidence_score)
+        k["first_seen"] = min(filter(None, (k["first_seen"], row.first_seen)), default=None)
+        k["last_seen"] = max(filter(None, (k["last_seen"], row.last_seen)), default=None)
+    if not dropped:
+        return
+    ev = models.EvidenceItem.rel_id
+    target = case({rel: literal(keep, ev.type) if keep else null() for rel, keep in dropped.items()}, value=ev)
+    db.execute(
+        update(models.EvidenceItem).where(ev.in_(list(dropped))).values(rel_id=target)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(delete(r).where(r.rel_id.in_(list(dropped))).execution_options(synchronize_session=False))
+    if changed:
+        db.execute(update(r), [kept[key] for key in changed])
+
+def merge_entities(db: Session, merges: Dict[UUID, UUID]) -> Set[UUID]:
+    """
+    Folds each duplicate in `merges` (duplicate -> survivor) into its
+    survivor. Relationship endpoints and evidence are re-pointed, dropping
+    the self-loops and repeated relationships this leaves, and case and
+    file links are moved unless the survivor already has them. The
+    survivor keeps the highest risk and confidence and the widest
+    first/last seen. The duplicates are then deleted. Returns the cases
+    whose graph rows changed. Does not commit.
+    """
+    if not merges:
+        return set()
+    dups = list(merges)
+    r = models.Relationship
+    touched = db.execute(
+        select(r.rel_id, r.case_id).where(or_(r.source_entity_id.in_(dups), r.target_entity_id.in_(dups)))
+    ).all()
+    cases = {case_id for _, case_id in touched}
+    for col in (r.source_entity_id, r.target_entity_id, models.EvidenceItem.entity_id):
+        survivor = case({dup: literal(keep, col.type) for dup, keep in merges.items()}, value=col)
+        db.execute(
+            update(col.class_).where(col.in_(dups)).values({col.key: survivor})
+            .execution_options(synchronize_session=False)
+        )
+    if touched:
+        _dedupe_relationships(db, {rel_id for rel_id, _ in touched})
+
+    case_links, linked_cases = _relinked(db, models.CaseEntity, "case_id", merges)
+    file_links, _ = _relinked(db, models.IngestFileEntity, "file_id", merges)
+    for model in (models.CaseEntity, models.IngestFileEntity):
+        db.execute(delete(model).where(model.entity_id.in_(dups)).execution_options(synchronize_session=False))
+    insert_rows(db, models.CaseEntity, case_links)
+    insert_rows(db, models.IngestFileEntity, file_links)
+
+    e = models.Entity
+    rows = db.execute(
+        select(e.entity_id, e.risk_score, e.confidence_score, e.first_seen, e.last_seen)
+        .where(e.entity_id.in_(dups + list(set(merges.values()))))
+    ).all()
+    merged: Dict[UUID, dict] = {}
+    for entity_id, risk, confidence, first_seen, last_seen in rows:
+        keep = merges.get(entity_id, entity_id)
+        m = merged.setdefault(keep, {"entity_id": keep, "risk_score": risk, "confidence_score": confidence,
+                                     "first_seen": first_seen, "last_seen": last_seen})
+        m["risk_score"] = max(m["risk_score"], risk)
+        m["confidence_score"] = max(m["confidence_score"], confidence)
+        m["first_seen"] = min(filter(None, (m["first_seen"], first_seen)), default=None)
+        m["last_seen"] = max(filter(None, (m["last_seen"], last_seen)), default=None)
+    db.execute(delete(e).where(e.entity_id.in_(dups)).execution_options(synchronize_session=False))
+    db.execute(update(e), list(merged.values()))
+    return cases | linked_cases
+
+def bulk_link_case_entities(db: Session, case_id: UUID, entity_ids: List[UUID], chunk_size: Optional[int] = None) -> int:
+    created_at = models.now()
+    rows = [{"case_id": case_id, "entity_id": eid, "created_at": created_at} for eid in entity_ids]
+    stamp_graph_version(db, rows)
+    return insert_rows(db, models.CaseEntity, rows, chunk_size)
+
+def bulk_link_file_entities(db: Session, rows: List[dict], chunk_size: Optional[int] = None) -> int:
+    """Rows are {"file_id", "entity_id"} provenance pairs. Does not commit."""
+    return insert_rows(db, models.IngestFileEntity, rows, chunk_size)
+
+def get_entity_ids_by_file(db: Session, file_id: UUID) -> List[UUID]:
+    return [eid for (eid,) in db.query(models.IngestFileEntity.entity_id).filter(models.IngestFileEntity.file_id == file_id)]
+
+def get_linked_entity_ids(db: Session, case_id: UUID, entity_ids: List[UUID]) -> set:
+    if not entity_ids:
+        return set()
+    return {eid for (eid,) in db.query(models.CaseEntity.entity_id).filter(
+        models.CaseEntity.case_id == case_id,
+        models.CaseEntity.entity_id.in_(entity_ids)
+    )}
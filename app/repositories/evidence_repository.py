@@ -1,8 +1,16 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from uuid import UUID
 from app.db import models
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from datetime import datetime
+from app.repositories.pagination import iter_keyset, keyset_page
+
+EVIDENCE_FIELDS = {
+    name: getattr(models.EvidenceItem, name)
+    for name in ("evidence_id", "case_id", "insight_id", "entity_id", "rel_id",
+                 "evidence_type", "description", "evidence_hash", "created_at")
+}
 
 def create_evidence(db: Session, case_id: UUID, insight_id: Optional[UUID], entity_id: Optional[UUID], 
                     rel_id: Optional[UUID], evidence_type: str, description: str, evidence_hash: str) -> models.EvidenceItem:
@@ -26,6 +34,18 @@ def get_evidence_by_case(db: Session, case_id: UUID, since: Optional[datetime] =
         query = query.filter(models.EvidenceItem.created_at >= since)
     return query.order_by(models.EvidenceItem.created_at.asc()).all()
 
+def get_evidence_page(db: Session, case_id: UUID, fields: List[str], cursor: Optional[str] = None,
+                      limit: int = 500) -> Tuple[List[dict], Optional[str]]:
+    stmt = select(models.EvidenceItem).where(models.EvidenceItem.case_id == case_id)
+    return keyset_page(db, EVIDENCE_FIELDS, fields, stmt, models.EvidenceItem.created_at,
+                       models.EvidenceItem.evidence_id, cursor, limit)
+
+def iter_evidence(db: Session, case_id: UUID, fields: List[str], cursor: Optional[str] = None,
+                  batch_rows: int = 1000) -> Iterator[List[dict]]:
+    stmt = select(models.EvidenceItem).where(models.EvidenceItem.case_id == case_id)
+    return iter_keyset(db, EVIDENCE_FIELDS, fields, stmt, models.EvidenceItem.created_at,
+                       models.EvidenceItem.evidence_id, cursor, batch_rows)
+
 def get_evidence_by_entity(db: Session, entity_id: UUID) -> List[models.EvidenceItem]:
     return db.query(models.EvidenceItem)\
         .filter(models.EvidenceItem.entity_id == entity_id)\
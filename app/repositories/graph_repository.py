@@ -0,0 +1,71 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from uuid import UUID
+from typing import List, Tuple
+from app.db import models
+
+def next_graph_version(db: Session, case_id: UUID) -> int:
+    """
+    Bumps the case's graph version and returns it; the caller stamps the
+    relationship / case_entity rows it writes with it. The state row stays
+    locked until the caller commits, so versions become visible in order.
+    Does not commit.
+    """
+    state = db.get(models.CaseGraphState, case_id, with_for_update=True)
+    if state is None:
+        state = models.CaseGraphState(case_id=case_id, version=0)
+        db.add(state)
+    state.version += 1
+    state.updated_at = models.now()
+    db.flush()
+    return state.version
+
+def get_graph_state(db: Session, case_id: UUID) -> Tuple[int, int]:
+    """(version, rewrite_version) of the case's graph; (0, 0) before its first write."""
+    row = db.query(models.CaseGraphState.version, models.CaseGraphState.rewrite_version)\
+        .filter(models.CaseGraphState.case_id == case_id).first()
+    return (row[0], row[1]) if row else (0, 0)
+
+def mark_graph_rewritten(db: Session, case_id: UUID) -> int:
+    """
+    Bumps the version after rows already stamped were changed in place, and
+    records it as the rewrite version so held snapshots are rebuilt rather
+    than extended. Does not commit.
+    """
+    version = next_graph_version(db, case_id)
+    db.get(models.CaseGraphState, case_id).rewrite_version = version
+    db.flush()
+    return version
+
+def get_graph_node_rows(db: Session, case_id: UUID, after: int, upto: int) -> List[tuple]:
+    """(entity_id, label, entity_type, graph_version) of entities linked into the case by writes in (after, upto]."""
+    stmt = (
+        select(models.Entity.entity_id, models.Entity.label, models.Entity.entity_type, models.CaseEntity.graph_version)
+        .join(models.CaseEntity, models.CaseEntity.entity_id == models.Entity.entity_id)
+        .where(
+            models.CaseEntity.case_id == case_id,
+            models.CaseEntity.graph_version > after,
+            models.CaseEntity.graph_version <= upto,
+        )
+        .order_by(models.CaseEntity.graph_version)
+    )
+    return db.execute(stmt).all()
+
+def get_graph_edge_rows(db: Session, case_id: UUID, after: int, upto: int) -> List[tuple]:
+    """(rel_id, source_entity_id, target_entity_id, basis, strength_score, created_at) of relationships written in (after, upto]."""
+    r = models.Relationship
+    stmt = (
+        select(r.rel_id, r.source_entity_id, r.target_entity_id, r.basis, r.strength_score, r.created_at)
+        .where(r.case_id == case_id, r.graph_version > after, r.graph_version <= upto)
+        .order_by(r.graph_version)
+    )
+    return db.execute(stmt).all()
+
+def stamp_graph_version(db: Session, rows: List[dict]) -> None:
+    """Stamps relationship / case_entity row dicts with the next graph version of their case. Does not commit."""
+    versions = {}
+    for row in rows:
+        cid = row["case_id"]
+        if cid not in versions:
+            versions[cid] = next_graph_version(db, cid)
+        row["graph_version"] = versions[cid]
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from uuid import UUID
 from app.db import models
 from typing import List, Optional
+from app.repositories.bulk import insert_rows
 
 def get_insights_by_case(db: Session, case_id: UUID, limit: int = 200) -> List[models.Insight]:
     return db.query(models.Insight)\
@@ -17,16 +18,33 @@ def get_high_priority_signals(db: Session, limit: int = 50) -> List[models.Insig
 def count_insights_by_case(db: Session, case_id: UUID) -> int:
     return db.query(models.Insight).filter(models.Insight.case_id == case_id).count()
 
-def create_insight(db: Session, case_id: UUID, severity: str, summary: str, confidence_score: float, created_by: Optional[UUID] = None, explanation: Optional[str] = None) -> models.Insight:
+def create_insight(db: Session, case_id: UUID, severity: str, summary: str, confidence_score: float, created_by: Optional[UUID] = None, explanation: Optional[str] = None,
+                   evidence: Optional[list] = None, evidence_count: int = 0) -> models.Insight:
     db_insight = models.Insight(
         case_id=case_id,
         severity=severity,
         summary=summary,
         explanation=explanation,
         confidence_score=confidence_score,
+        evidence=evidence,
+        evidence_count=evidence_count,
         created_by=created_by
     )
     db.add(db_insight)
     db.commit()
     db.refresh(db_insight)
     return db_insight
+
+
+def bulk_create_insights(db: Session, rows: List[dict], chunk_size: Optional[int] = None) -> int:
+    """Rows must carry a client-generated `insight_id`. Does not commit."""
+    created_at = models.now()
+    for row in rows:
+        row.setdefault("created_at", created_at)
+    return insert_rows(db, models.Insight, rows, chunk_size)
+
+def get_insights_by_file(db: Session, file_id: UUID, case_id: Optional[UUID] = None) -> List[models.Insight]:
+    query = db.query(models.Insight).filter(models.Insight.source_file_id == file_id)
+    if case_id:
+        query = query.filter(models.Insight.case_id == case_id)
+    return query.all()
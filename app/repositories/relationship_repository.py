@@ -1,9 +1,18 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select, union_all
 from uuid import UUID
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from app.db import models
+from app.repositories.bulk import insert_rows
+from app.repositories.graph_repository import next_graph_version, stamp_graph_version
+from app.repositories.pagination import iter_keyset, keyset_page
+
+RELATIONSHIP_FIELDS = {
+    name: getattr(models.Relationship, name)
+    for name in ("rel_id", "case_id", "source_entity_id", "target_entity_id", "basis",
+                 "strength_score", "confidence_score", "first_seen", "last_seen", "created_at")
+}
 
 def create_relationship(db: Session, case_id: UUID, source_id: UUID, target_id: UUID, 
                        basis: str, strength: float, confidence: float) -> models.Relationship:
@@ -15,7 +24,8 @@ def create_relationship(db: Session, case_id: UUID, source_id: UUID, target_id:
         strength_score=strength,
         confidence_score=confidence,
         first_seen=datetime.utcnow(),
-        last_seen=datetime.utcnow()
+        last_seen=datetime.utcnow(),
+        graph_version=next_graph_version(db, case_id)
     )
     db.add(db_rel)
     db.commit()
@@ -29,11 +39,60 @@ def get_relationships_by_case(db: Session, case_id: UUID) -> List[models.Relatio
     stmt = select(models.Relationship).where(models.Relationship.case_id == case_id)
     return list(db.scalars(stmt).all())
 
+def get_relationship_page(db: Session, case_id: UUID, fields: List[str], cursor: Optional[str] = None,
+                          limit: int = 500) -> Tuple[List[dict], Optional[str]]:
+    stmt = select(models.Relationship).where(models.Relationship.case_id == case_id)
+    return keyset_page(db, RELATIONSHIP_FIELDS, fields, stmt, models.Relationship.created_at,
+                       models.Relationship.rel_id, cursor, limit)
+
+def iter_relationships(db: Session, case_id: UUID, fields: List[str], cursor: Optional[str] = None,
+                       batch_rows: int = 1000) -> Iterator[List[dict]]:
+    stmt = select(models.Relationship).where(models.Relationship.case_id == case_id)
+    return iter_keyset(db, RELATIONSHIP_FIELDS, fields, stmt, models.Relationship.created_at,
+                       models.Relationship.rel_id, cursor, batch_rows)
+
 def get_relationships_by_entity(db: Session, entity_id: UUID) -> List[models.Relationship]:
-    return db.query(models.Relationship).filter(
-        (models.Relationship.source_entity_id == entity_id) | 
-        (models.Relationship.target_entity_id == entity_id)
-    ).all()
+    """
+    Relationships with the entity at either end, as a UNION ALL of a lookup
+    on each endpoint index (an OR across the two columns tends to scan).
+    Self-links come from the source side only.
+    """
+    r = models.Relationship
+    stmt = union_all(
+        select(r).where(r.source_entity_id == entity_id),
+        select(r).where(r.target_entity_id == entity_id, r.source_entity_id != entity_id),
+    )
+    return list(db.scalars(select(r).from_statement(stmt)).all())
 
 def count_relationships_by_case(db: Session, case_id: UUID) -> int:
     return db.query(models.Relationship).filter(models.Relationship.case_id == case_id).count()
+
+
+def bulk_create_relationships(db: Session, rows: List[dict], chunk_size: Optional[int] = None) -> int:
+    """Rows must carry a client-generated `rel_id`. Does not commit."""
+    ts = datetime.utcnow()
+    for row in rows:
+        row.setdefault("first_seen", ts)
+        row.setdefault("last_seen", ts)
+        row.setdefault("created_at", ts)
+    stamp_graph_version(db, rows)
+    return insert_rows(db, models.Relationship, rows, chunk_size)
+
+def get_relationships_by_file(db: Session, file_id: UUID, case_id: Optional[UUID] = None) -> List[models.Relationship]:
+    query = db.query(models.Relationship).filter(models.Relationship.source_file_id == file_id)
+    if case_id:
+        query = query.filter(models.Relationship.case_id == case_id)
+    return query.all()
+
+def get_relationship_label_pairs(db: Session, case_id: Optional[UUID] = None) -> List[Tuple[str, str]]:
+    """(source label, target label) of every relationship; link-strength training labels."""
+    src, tgt = aliased(models.Entity), aliased(models.Entity)
+    stmt = (
+        select(src.label, tgt.label)
+        .select_from(models.Relationship)
+        .join(src, src.entity_id == models.Relationship.source_entity_id)
+        .join(tgt, tgt.entity_id == models.Relationship.target_entity_id)
+    )
+    if case_id:
+        stmt = stmt.where(models.Relationship.case_id == case_id)
+    return [tuple(row) for row in db.execute(stmt).all()]
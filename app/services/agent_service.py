@@ -1,10 +1,18 @@
 from sqlalchemy.orm import Session
 from uuid import UUID
+from typing import Optional, Iterator
+from pathlib import Path
+import uuid
 from app.ai.agent import ForensicAgent
 from app.db import models
-from app.repositories import entity_repository, relationship_repository, insight_repository
-from app.services import entity_service
+from app.repositories import entity_repository, relationship_repository, insight_repository, graph_repository
+from app.services import entity_service, entity_resolution
 from app.db.schemas import EntityCreate, InsightCreate
+from app.core.config import SPOOL_CHUNK_SIZE, PDF_EXTRACT_WORKERS
+from app.ingest.pdf_text import extract_pdf_text, iter_pdf_pages
+from app.ingest.parsers import is_cdr_file
+from app.features.temporal_features import TemporalFeatureStore
+from app.features.link_features import LinkFeatureStore
 import io
 try:
     from pypdf import PdfReader
@@ -17,13 +25,17 @@ class AgentService:
     def __init__(self):
         self.agent = ForensicAgent()
 
-    def extract_text_from_pdf(self, content: bytes) -> str:
+    def extract_text_from_pdf(self, content: bytes | Path, file_hash: Optional[str] = None) -> str:
         """
         Helper to extract structured text from forensic PDF binaries.
+        Paths go through the parallel, page-cached extractor; raw bytes are
+        extracted in-process.
         """
         try:
             if not PYPDF_AVAILABLE:
                 raise ImportError("pypdf library not found.")
+            if not isinstance(content, bytes):
+                return extract_pdf_text(content, file_hash)
             reader = PdfReader(io.BytesIO(content))
             return " ".join([page.extract_text() for page in reader.pages])
         except ImportError:
@@ -33,18 +45,18 @@ class AgentService:
             print(f"PDF Extraction failed: {e}")
             return ""
 
-    def run_forensic_discovery(self, db: Session, job_id: UUID, content: bytes, filename: str = ""):
+    def run_forensic_discovery(self, db: Session, job_id: UUID, content: bytes, filename: str = "",
+                               batched: bool = True, chunk_size: Optional[int] = None):
         """
         Coordinates the agent's reasoning and persists findings to the database.
         Detects if content is PDF or Text and extracts accordingly.
+        Findings are written in one batched transaction unless `batched=False`.
         """
         # 1. Get Job and Case Details
         job = db.get(models.IngestJob, job_id)
         if not job:
             return
         
-        case_id = job.case_id
-        
         # 2. Extract Text based on File Type
         text_content = ""
         if filename.lower().endswith(".pdf") or (content and content.startswith(b"%PDF")):
@@ -54,37 +66,257 @@ class AgentService:
             print(f"Discovery: Processing Text {filename}")
             text_content = content.decode("utf-8", errors="ignore")
 
+        return self._analyze_and_persist(db, job.case_id, text_content, filename, batched, chunk_size)
+
+    def run_forensic_discovery_from_file(self, db: Session, job_id: UUID, path: Path, filename: str = "",
+                                         batched: bool = True, chunk_size: Optional[int] = None,
+                                         file_id: Optional[UUID] = None, file_hash: Optional[str] = None):
+        """
+        Same as `run_forensic_discovery`, streaming a spooled file from disk
+        chunk by chunk (PDF pages or fixed-size text reads) through the
+        agent, so the document is never held in memory as one string.
+        When `file_id` is given, findings are recorded against it so
+        re-uploads of the same content can reuse them. `file_hash` keys the
+        extracted-page cache (computed if omitted).
+        """
+        job = db.get(models.IngestJob, job_id)
+        if not job:
+            return
+
+        findings = self.analyze_file(path, filename, file_hash)
+        if findings["skipped_reason"]:
+            return findings
+        return self._persist(db, job.case_id, findings, batched, chunk_size, file_id)
+
+    def analyze_file(self, path: Path, filename: str = "", file_hash: Optional[str] = None,
+                     pdf_workers: int = PDF_EXTRACT_WORKERS) -> dict:
+        """
+        Runs the agent over a spooled file without touching the database,
+        so it can run in a worker process. Returns the findings, with
+        `skipped_reason` set when no text could be extracted. A CDR is also
+        indexed into the feature stores (see `index_cdr`).
+        """
+        path = Path(path)
+        if file_hash and is_cdr_file(str(path), filename):
+            try:
+                self.index_cdr(path, file_hash)
+            except Exception as e:
+                print(f"CDR indexing failed for {filename}: {e}")
+        with path.open("rb") as fh:
+            is_pdf = filename.lower().endswith(".pdf") or fh.read(4) == b"%PDF"
+        if is_pdf:
+            print(f"Discovery: Processing PDF {filename}")
+            chunks = self.iter_pdf_text(path, file_hash, pdf_workers)
+        else:
+            print(f"Discovery: Processing Text {filename}")
+            chunks = self.iter_text_file(path)
+
+        findings = self.agent.analyze_document_stream(chunks)
+        if not findings["chars"]:
+            return self._skipped(filename)
+        findings["skipped_reason"] = None
+        return findings
+
+    def index_cdr(self, path: Path, file_hash: str) -> None:
+        """
+        Caches a CDR's typed frame, temporal features and link partials
+        under its content hash, so training and rollups over it only merge
+        cached aggregates.
+        """
+        print(f"Discovery: Indexing CDR {file_hash[:12]}")
+        TemporalFeatureStore().file_features(file_hash, path=str(path))
+        LinkFeatureStore().file_partials(file_hash, str(path))
+
+    def iter_pdf_text(self, path: Path, file_hash: Optional[str] = None,
+                      workers: int = PDF_EXTRACT_WORKERS) -> Iterator[str]:
+        """Page texts with the separators `extract_text_from_pdf` joins them with."""
+        if not PYPDF_AVAILABLE:
+            print("pypdf library not found. Run 'pip install pypdf'")
+            return
+        for i, page in enumerate(iter_pdf_pages(path, file_hash, workers=workers)):
+            if i:
+                yield " "
+            yield page
+
+    def iter_text_file(self, path: Path, chunk_chars: int = SPOOL_CHUNK_SIZE) -> Iterator[str]:
+        with Path(path).open("r", encoding="utf-8", errors="ignore") as fh:
+            yield from iter(lambda: fh.read(chunk_chars), "")
+
+    def _skipped(self, filename: str) -> dict:
+        reason = "Missing pypdf library" if filename.lower().endswith(".pdf") else "Empty content"
+        print(f"Discovery: No text extracted. Reason: {reason}")
+        return {"entities": [], "relationships": [], "insights": [], "skipped_reason": reason}
+
+    def _analyze_and_persist(self, db: Session, case_id: UUID, text_content: str, filename: str,
+                             batched: bool, chunk_size: Optional[int], file_id: Optional[UUID] = None):
         if not text_content:
-            reason = "Missing pypdf library" if filename.lower().endswith(".pdf") else "Empty content"
-            print(f"Discovery: No text extracted. Reason: {reason}")
-            return {"entities": [], "relationships": [], "insights": [], "skipped_reason": reason}
+            return self._skipped(filename)
 
         # 3. Run AI Agent Analysis
         findings = self.agent.analyze_document(text_content)
+        return self._persist(db, case_id, findings, batched, chunk_size, file_id)
+
+    def _persist(self, db: Session, case_id: UUID, findings: dict, batched: bool,
+                 chunk_size: Optional[int], file_id: Optional[UUID] = None) -> dict:
         findings["skipped_reason"] = None 
         print(f"Discovery: Found {len(findings['entities'])} entities, {len(findings['insights'])} insights.")
         
-        # 3. Persist Entities
-        entity_map = {} 
-        for entity_data in findings["entities"]:
-            print(f"Saving Entity: {entity_data['label']}")
-            db_entity = entity_repository.create_entity(
-                db, 
-                entity_type=entity_data["type"],
-                label=entity_data["label"],
-                risk_score=entity_data["risk_score"],
-                confidence_score=entity_data["confidence_score"]
+        # 4. Persist Findings
+        if batched:
+            self.persist_findings_batched(db, case_id, findings, chunk_size, source_file_id=file_id)
+        else:
+            self.persist_findings_rowwise(db, case_id, findings)
+        return findings
+
+    def persist_findings_batched(self, db: Session, case_id: UUID, findings: dict, chunk_size: Optional[int] = None,
+                                 source_file_id: Optional[UUID] = None) -> None:
+        """
+        Writes entities, case links, relationships and insights with
+        client-generated UUIDs as multi-row INSERTs in a single transaction.
+        `source_file_id` records which ingested file the findings came from.
+        """
+        self.persist_files_batched(db, case_id, [(source_file_id, findings)], chunk_size)
+
+    def persist_files_batched(self, db: Session, case_id: UUID, results: list[tuple[Optional[UUID], dict]],
+                              chunk_size: Optional[int] = None) -> None:
+        """
+        Merges the findings of several files, given as (file_id, findings)
+        pairs, into one set of multi-row INSERTs and a single commit.
+        Phones, emails and IPs resolve to the entity already holding their
+        key (looked up in bulk), so only unseen ones are inserted, and carry
+        the highest risk and confidence any finding gave them (as the merge
+        job keeps); links the case or file already has are not repeated.
+        """
+        keyed: dict[str, tuple[float, float]] = {}
+        for _, findings in results:
+            for entity_data in findings["entities"]:
+                key = entity_resolution.resolution_key(entity_data["type"], entity_data["label"], entity_data.get("pattern"))
+                entity_data["resolution_key"] = key
+                if key is not None:
+                    risk, confidence = keyed.get(key, (entity_data["risk_score"], entity_data["confidence_score"]))
+                    keyed[key] = (max(risk, entity_data["risk_score"]), max(confidence, entity_data["confidence_score"]))
+        existing = entity_repository.get_entity_ids_by_keys(db, keyed)
+        resolved = dict(existing)
+
+        found_ids, entity_rows, new_keyed_rows, file_entity_rows, rel_rows, insight_rows = [], [], [], [], [], []
+        for source_file_id, findings in results:
+            entity_map = {}
+            for entity_data in findings["entities"]:
+                key = entity_data.pop("resolution_key")
+                entity_id = resolved.get(key) if key is not None else None
+                if entity_id is None:
+                    entity_id = uuid.uuid4()
+                    row = {
+                        "entity_id": entity_id,
+                        "entity_type": entity_data["type"],
+                        "label": entity_data["label"],
+                        "risk_score": entity_data["risk_score"],
+                        "confidence_score": entity_data["confidence_score"],
+                    }
+                    if key is None:
+                        entity_rows.append(row)
+                    else:
+                        row["risk_score"], row["confidence_score"] = keyed[key]
+                        row["resolution_key"] = key
+                        new_keyed_rows.append(row)
+                        resolved[key] = entity_id
+                entity_map[entity_data["label"]] = entity_id
+                found_ids.append(entity_id)
+                if source_file_id:
+                    file_entity_rows.append({"file_id": source_file_id, "entity_id": entity_id})
+
+            for rel_data in findings["relationships"]:
+                source_id = entity_map.get(rel_data["source_label"])
+                target_id = entity_map.get(rel_data["target_label"])
+                if source_id and target_id:
+                    rel_rows.append({
+                        "rel_id": uuid.uuid4(),
+                        "case_id": case_id,
+                        "source_entity_id": source_id,
+                        "target_entity_id": target_id,
+                        "basis": rel_data["basis"],
+                        "strength_score": rel_data["strength_score"],
+                        "confidence_score": rel_data["confidence_score"],
+                        "source_file_id": source_file_id,
+                    })
+
+            insight_rows.extend(
+                {
+                    "insight_id": uuid.uuid4(),
+                    "case_id": case_id,
+                    "severity": insight_data["severity"],
+                    "summary": insight_data["summary"],
+                    "explanation": insight_data["explanation"],
+                    "confidence_score": insight_data["confidence_score"],
+                    "evidence": insight_data.get("evidence"),
+                    "evidence_count": insight_data.get("evidence_count", 0),
+                    "created_by": None,  # System generated
+                    "source_file_id": source_file_id,
+                }
+                for insight_data in findings["insights"]
             )
+
+        try:
+            entity_repository.bulk_create_entities(db, entity_rows, chunk_size)
+            holders = entity_repository.insert_resolved_entities(db, new_keyed_rows, chunk_size)
+            # Keys another writer inserted since the lookup resolve to its entity
+            moved = {row["entity_id"]: holders[row["resolution_key"]] for row in new_keyed_rows
+                     if holders[row["resolution_key"]] != row["entity_id"]}
+            reused = {**existing, **{row["resolution_key"]: moved[row["entity_id"]]
+                                     for row in new_keyed_rows if row["entity_id"] in moved}}
+            entity_repository.raise_entity_scores(db, {entity_id: keyed[key] for key, entity_id in reused.items()})
+            for row in file_entity_rows:
+                row["entity_id"] = moved.get(row["entity_id"], row["entity_id"])
+            for row in rel_rows:
+                row["source_entity_id"] = moved.get(row["source_entity_id"], row["source_entity_id"])
+                row["target_entity_id"] = moved.get(row["target_entity_id"], row["target_entity_id"])
+
+            entity_ids = list(dict.fromkeys(moved.get(eid, eid) for eid in found_ids))
+            linked = entity_repository.get_linked_entity_ids(db, case_id, entity_ids)
+            entity_repository.bulk_link_case_entities(db, case_id, [eid for eid in entity_ids if eid not in linked], chunk_size)
+            file_links = list(dict.fromkeys((row["file_id"], row["entity_id"]) for row in file_entity_rows))
+            entity_repository.bulk_link_file_entities(db, [{"file_id": f, "entity_id": e} for f, e in file_links], chunk_size)
+            relationship_repository.bulk_create_relationships(db, rel_rows, chunk_size)
+            insight_repository.bulk_create_insights(db, insight_rows, chunk_size)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    def persist_findings_rowwise(self, db: Session, case_id: UUID, findings: dict) -> None:
+        """
+        Legacy path: one repository call (and commit) per finding.
+        """
+        entity_map = {}
+        for entity_data in findings["entities"]:
+            key = entity_resolution.resolution_key(entity_data["type"], entity_data["label"], entity_data.get("pattern"))
+            if key is not None:
+                entity_id = entity_repository.get_or_create_entity(
+                    db, entity_data["type"], entity_data["label"], entity_data["risk_score"],
+                    entity_data["confidence_score"], key
+                ).entity_id
+            else:
+                entity_id = entity_repository.create_entity(
+                    db,
+                    entity_type=entity_data["type"],
+                    label=entity_data["label"],
+                    risk_score=entity_data["risk_score"],
+                    confidence_score=entity_data["confidence_score"]
+                ).entity_id
             # Link to case
-            case_entity = models.CaseEntity(case_id=case_id, entity_id=db_entity.entity_id)
-            db.add(case_entity)
-            entity_map[entity_data["label"]] = db_entity.entity_id
+            if not entity_repository.get_linked_entity_ids(db, case_id, [entity_id]):
+                case_entity = models.CaseEntity(
+                    case_id=case_id,
+                    entity_id=entity_id,
+                    graph_version=graph_repository.next_graph_version(db, case_id),
+                )
+                db.add(case_entity)
+            entity_map[entity_data["label"]] = entity_id
 
-        # 4. Persist Relationships
         for rel_data in findings["relationships"]:
             source_id = entity_map.get(rel_data["source_label"])
             target_id = entity_map.get(rel_data["target_label"])
-            
+
             if source_id and target_id:
                 relationship_repository.create_relationship(
                     db,
@@ -96,7 +328,6 @@ class AgentService:
                     confidence=rel_data["confidence_score"]
                 )
 
-        # 5. Persist Insights
         for insight_data in findings["insights"]:
             insight_repository.create_insight(
                 db,
@@ -105,10 +336,11 @@ class AgentService:
                 summary=insight_data["summary"],
                 explanation=insight_data["explanation"],
                 confidence_score=insight_data["confidence_score"],
+                evidence=insight_data.get("evidence"),
+                evidence_count=insight_data.get("evidence_count", 0),
                 created_by=None # System generated
             )
-            
+
         db.commit()
-        return findings
 
 agent_service = AgentService()
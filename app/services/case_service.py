@@ -1,16 +1,23 @@
 from sqlalchemy.orm import Session
 from uuid import UUID
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import hashlib
 
 from app.db import models
 from app.db.schemas import CaseCreate
 from app.repositories import case_repository, entity_repository, evidence_repository, insight_repository, relationship_repository
+from app.repositories.pagination import decode_cursor, parse_fields
+from app.db.session import iter_with_session
+from app.core.config import STREAM_BATCH_ROWS
+from app.services.graph_store import case_graph_store, GRAPH_FIELDS
 
 def create_case(db: Session, payload: CaseCreate, user_id: UUID) -> models.Case:
     return case_repository.create_case(db, payload.title, payload.status, payload.jurisdiction)
 
+def list_cases(db: Session, cursor: Optional[str], limit: int, fields: Optional[str] = None) -> tuple[List[dict], Optional[str]]:
+    return case_repository.get_all_cases(db, limit, cursor, parse_fields(fields, list(case_repository.CASE_FIELDS)))
+
 def get_case(db: Session, case_id: UUID) -> models.Case | None:
     return case_repository.get_case_by_id(db, case_id)
 
@@ -54,21 +61,31 @@ def get_case_entities(db: Session, case_id: UUID) -> List[dict]:
         })
     return entities
 
+def get_case_entity_page(db: Session, case_id: UUID, cursor: Optional[str], limit: int,
+                         fields: Optional[str] = None) -> tuple[List[dict], Optional[str]]:
+    fields = parse_fields(fields, list(entity_repository.CASE_ENTITY_FIELDS))
+    return entity_repository.get_case_entity_page(db, case_id, fields, cursor, limit)
+
+def stream_case_entities(case_id: UUID, cursor: Optional[str], fields: Optional[str] = None) -> Iterator[List[dict]]:
+    """Batches of every case entity after `cursor`, read on their own session for a streamed response."""
+    fields = parse_fields(fields, list(entity_repository.CASE_ENTITY_FIELDS))
+    if cursor:
+        decode_cursor(cursor)
+    return iter_with_session(entity_repository.iter_case_entities, case_id, fields, cursor, STREAM_BATCH_ROWS)
+
 def get_case_graph(db: Session, case_id: UUID) -> dict:
-    entities = entity_repository.get_entities_by_case_raw(db, case_id)
-    relationships = relationship_repository.get_relationships_by_case(db, case_id)
-    
-    nodes = [{"id": e.entity_id, "label": e.label, "type": e.entity_type} for e in entities]
-    edges = [
-        {
-            "id": r.rel_id, 
-            "source": r.source_entity_id, 
-            "target": r.target_entity_id, 
-            "basis": r.basis,
-            "weight": float(r.strength_score)
-        } for r in relationships
-    ]
-    return {"nodes": nodes, "edges": edges}
+    return case_graph_store.get(db, case_id).as_dict()
+
+def get_case_graph_json(db: Session, case_id: UUID) -> bytes:
+    """CaseGraph JSON straight from the materialized graph store."""
+    return case_graph_store.get(db, case_id).json_bytes()
+
+def get_case_graph_page(db: Session, case_id: UUID, cursor: Optional[str], limit: int, fields: Optional[str] = None) -> dict:
+    return case_graph_store.get(db, case_id).page(cursor, limit, parse_fields(fields, GRAPH_FIELDS))
+
+def stream_case_graph(db: Session, case_id: UUID) -> Iterator[tuple[str, List[str]]]:
+    """Encoded node then edge batches of the materialized graph; nothing is read from the database while streaming."""
+    return case_graph_store.get(db, case_id).iter_fragments(STREAM_BATCH_ROWS)
 
 def get_case_timeline(db: Session, case_id: UUID, time_range: Optional[str] = None) -> List[models.EvidenceItem]:
     since = None
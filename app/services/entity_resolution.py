@@ -0,0 +1,142 @@
+"""
+Entity resolution: one `Entity` row per real-world phone, email or IP.
+
+Each such label is reduced to a resolution key, "<kind>:<normalized
+value>": E.164 for phones, lowercase for emails, the canonical text form
+for IPs. `entities.resolution_key` is unique, so discovery looks its keys
+up in bulk and inserts only the missing ones, and a key inserted
+concurrently by another writer is skipped by ON CONFLICT and then read
+back. Labels of other kinds (names, addresses, dates) get no key and are
+not resolved.
+
+`merge_duplicate_entities` backfills keys on rows written before
+resolution existed and folds every duplicate into the first entity that
+holds its key.
+"""
+from __future__ import annotations
+
+import ipaddress
+import re
+from typing import Dict, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.core.config import ENTITY_MERGE_BATCH, ENTITY_PHONE_COUNTRY_CODE
+from app.repositories import entity_repository, graph_repository
+
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_IPV4 = re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}$")
+
+
+def normalize_phone(label: str, country_code: str = ENTITY_PHONE_COUNTRY_CODE) -> Optional[str]:
+    """
+    E.164 form of a phone number: "+" and 8-15 digits. International
+    numbers ("+..." or "00...") keep their country code. A bare national
+    number of 10 digits gets `country_code`, and one of 11 digits that
+    already starts with it is taken as-is; without a `country_code`
+    (ENTITY_PHONE_COUNTRY_CODE unset) national numbers are not resolved.
+    Other numbers have no key.
+    """
+    label = label.strip()
+    digits = re.sub(r"\D", "", label)
+    if label.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif not country_code:
+        return None
+    elif len(digits) == 10:
+        digits = country_code + digits
+    elif not (len(digits) == 10 + len(country_code) and digits.startswith(country_code)):
+        return None
+    if not 8 <= len(digits) <= 15 or digits[0] == "0":
+        return None
+    return "+" + digits
+
+
+def normalize_email(label: str) -> Optional[str]:
+    value = label.strip().strip("<>").lower()
+    if value.startswith("mailto:"):
+        value = value[len("mailto:"):]
+    value = value.rstrip(".")
+    return value if _EMAIL.match(value) else None
+
+
+def normalize_ip(label: str) -> Optional[str]:
+    """Canonical text of an IPv4/IPv6 address: no leading zeros, compressed IPv6, IPv4-mapped IPv6 as IPv4."""
+    value = label.strip()
+    try:
+        if _IPV4.match(value):
+            return str(ipaddress.IPv4Address(".".join(str(int(octet)) for octet in value.split("."))))
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    mapped = getattr(address, "ipv4_mapped", None)
+    return str(mapped or address)
+
+
+_NORMALIZERS = {"phone": normalize_phone, "email": normalize_email, "ip": normalize_ip}
+
+
+def resolution_key(entity_type: str, label: str, pattern: Optional[str] = None) -> Optional[str]:
+    """
+    Key of a label, or None when it is not a resolvable kind. The scanner
+    `pattern` that found the label decides the kind when given (its entity
+    types are coarse: emails are "person", addresses "ip"); otherwise phone
+    and ip entities use their type and any other label containing "@" is
+    tried as an email.
+    """
+    kind = pattern if pattern in _NORMALIZERS else None
+    if kind is None:
+        if entity_type in ("phone", "ip"):
+            kind = entity_type
+        elif "@" in label:
+            kind = "email"
+        else:
+            return None
+    value = _NORMALIZERS[kind](label)
+    return f"{kind}:{value}" if value else None
+
+
+def merge_duplicate_entities(db: Session, batch_size: int = ENTITY_MERGE_BATCH) -> Dict[str, int]:
+    """
+    Walks the entities that have no resolution key, oldest first, one
+    transaction per `batch_size`. Each entity whose label has a key either
+    takes the key (nobody holds it yet) or is merged into the entity that
+    does (`entity_repository.merge_entities`). Cases whose relationships or
+    links were re-pointed get their graph marked rewritten, so cached
+    snapshots are rebuilt. Safe to re-run; returns counts.
+    """
+    stats = {"examined": 0, "keyed": 0, "merged": 0}
+    rewritten = set()
+    after = None
+    while True:
+        batch = entity_repository.get_unresolved_entities(db, after, batch_size)
+        if not batch:
+            return {**stats, "cases_rewritten": len(rewritten)}
+        after = (batch[-1].created_at, batch[-1].entity_id)
+        keys: Dict[UUID, str] = {}
+        for row in batch:
+            key = resolution_key(row.entity_type, row.label)
+            if key is not None:
+                keys[row.entity_id] = key
+        holders = entity_repository.get_entity_ids_by_keys(db, set(keys.values()))
+        new_keys: Dict[UUID, str] = {}
+        merges: Dict[UUID, UUID] = {}
+        for entity_id, key in keys.items():
+            holder = holders.get(key)
+            if holder is None:
+                holders[key] = entity_id
+                new_keys[entity_id] = key
+            else:
+                merges[entity_id] = holder
+        cases = entity_repository.merge_entities(db, merges)
+        entity_repository.set_resolution_keys(db, new_keys)
+        for case_id in cases:
+            graph_repository.mark_graph_rewritten(db, case_id)
+        db.commit()
+        stats["examined"] += len(batch)
+        stats["keyed"] += len(new_keys)
+        stats["merged"] += len(merges)
+        rewritten |= cases
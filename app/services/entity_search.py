@@ -0,0 +1,205 @@
+"""
+Entity label search behind GET /entities/search: prefix and fuzzy matches
+filtered by entity type and case, ranked the same way on every database.
+
+On PostgreSQL the search runs in SQL (`entity_repository.search_entities`)
+on a btree prefix index and a pg_trgm GiST index over lower(label). Other
+databases (SQLite in tests, MySQL) have no trigram operators, so each
+process keeps an `EntityNgramIndex` instead. It holds trigram postings over
+every entity label, built once with pg_trgm's word padding and then
+extended with the entities created since it last looked. Without fuzzy
+matching a label must contain the query, as on PostgreSQL; the index
+takes the labels holding the query's unpadded trigrams and checks each.
+
+The rank is +2 for an exact match and +1 for a prefix match, plus how
+much of the query resembles the label. On PostgreSQL that last part is
+pg_trgm's word_similarity. In the n-gram index it is the share of the
+query's trigrams found in the label. The last query word counts as a
+prefix, so a partially typed word still matches.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    SEARCH_CANDIDATES, SEARCH_FUZZY_THRESHOLD, SEARCH_INDEX_COMMIT_LAG_SECONDS, SEARCH_INDEX_REFRESH_SECONDS
+)
+from app.db import models
+from app.repositories import entity_repository
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def trigrams(text: str, prefix: bool = False) -> List[str]:
+    """
+    Distinct trigrams of `text` the way pg_trgm pads them: each word as
+    "  word ". With `prefix` the last word's trailing-pad trigram is
+    dropped, so it also matches longer words.
+    """
+    words = _WORD.findall(text.lower())
+    grams: List[str] = []
+    for i, word in enumerate(words):
+        padded = f"  {word} "
+        stop = len(padded) - 2 - (prefix and i == len(words) - 1)
+        grams.extend(padded[j:j + 3] for j in range(stop))
+    return list(dict.fromkeys(grams))
+
+
+def inner_trigrams(text: str) -> List[str]:
+    """
+    Distinct unpadded trigrams of the words of `text`. Every label that
+    contains `text` holds them all, wherever in a word the match starts.
+    """
+    return list(dict.fromkeys(word[j:j + 3] for word in _WORD.findall(text.lower()) for j in range(len(word) - 2)))
+
+
+class EntityNgramIndex:
+    """Trigram postings (trigram -> rows) over every entity label, with labels and types by row."""
+
+    def __init__(self, refresh_seconds: float = SEARCH_INDEX_REFRESH_SECONDS,
+                 commit_lag_seconds: float = SEARCH_INDEX_COMMIT_LAG_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.commit_lag = timedelta(seconds=commit_lag_seconds)
+        self.ids: List[UUID] = []
+        self.labels: List[str] = []
+        self.types: List[str] = []
+        self.rows: Dict[UUID, int] = {}
+        self._postings: Dict[str, array] = {}
+        self._since: Optional[datetime] = None
+        self._checked = -math.inf
+        self._lock = threading.Lock()
+
+    def _add(self, entity_id: UUID, label: str, entity_type: str) -> None:
+        row = self.rows[entity_id] = len(self.ids)
+        self.ids.append(entity_id)
+        self.labels.append(normalize_query(label))
+        self.types.append(entity_type)
+        for gram in trigrams(label):
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("i")
+            postings.append(row)
+
+    def refresh(self, db: Session) -> None:
+        """Indexes entities created since the last refresh, at most once per `refresh_seconds`."""
+        if time.monotonic() - self._checked < self.refresh_seconds:
+            return
+        with self._lock:
+            since = self._since - self.commit_lag if self._since is not None else None
+            for batch in entity_repository.iter_entity_labels(db, since):
+                for entity_id, label, entity_type, created_at in batch:
+                    if entity_id not in self.rows:
+                        self._add(entity_id, label, entity_type)
+                    if self._since is None or created_at > self._since:
+                        self._since = created_at
+            self._checked = time.monotonic()
+
+    def _shared(self, grams: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows holding any of `grams`, and how many of them each holds."""
+        with self._lock:
+            lists = [np.array(self._postings[g], dtype=np.int64) for g in grams if g in self._postings]
+        if not lists:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(lists), return_counts=True)
+
+    def _containing(self, query: str) -> np.ndarray:
+        """
+        Rows whose label contains `query`, or starts with it when it is
+        shorter than a trigram (as on PostgreSQL). Candidates hold every
+        unpadded trigram of the query and are then checked one by one.
+        """
+        grams = inner_trigrams(query)
+        if grams:
+            rows, shared = self._shared(grams)
+            rows = rows[shared == len(grams)]
+        elif len(query) < 3:
+            grams = trigrams(query, prefix=True)
+            rows, shared = self._shared(grams)
+            rows = rows[shared == len(grams)]
+        else:  # only words shorter than a trigram, e.g. "a b"
+            rows = np.arange(len(self.ids), dtype=np.int64)
+        labels = self.labels
+        if len(query) < 3:
+            hit = [labels[r].startswith(query) for r in rows.tolist()]
+        else:
+            hit = [query in labels[r] for r in rows.tolist()]
+        return rows[np.array(hit, dtype=bool)]
+
+    def search(self, query: str, fuzzy: bool, limit: int, entity_type: Optional[str] = None,
+               case_rows: Optional[np.ndarray] = None) -> List[Tuple[UUID, float]]:
+        """
+        (entity_id, score) of the best `limit` labels. With `fuzzy` a label
+        must hold at least SEARCH_FUZZY_THRESHOLD of the query trigrams;
+        without it, it must contain the query. Rows are limited to
+        `case_rows` when given.
+        """
+        grams = trigrams(query, prefix=True)
+        rows, shared = self._shared(grams)
+        if fuzzy:
+            keep = shared >= max(math.ceil(SEARCH_FUZZY_THRESHOLD * len(grams)), 1)
+            rows, shared = rows[keep], shared[keep]
+        else:
+            # Containing labels may hold none of the padded trigrams the similarity counts
+            matched = self._containing(query)
+            at = np.searchsorted(rows, matched)
+            found = at < len(rows)
+            found[found] = rows[at[found]] == matched[found]
+            counts = np.zeros(len(matched), dtype=np.int64)
+            counts[found] = shared[at[found]]
+            rows, shared = matched, counts
+        if case_rows is not None:
+            keep = np.isin(rows, case_rows)
+            rows, shared = rows[keep], shared[keep]
+        similarity = shared / len(grams) if grams else np.zeros(len(rows))
+        if entity_type:
+            typed = np.array([self.types[r] == entity_type for r in rows.tolist()], dtype=bool)
+            rows, similarity = rows[typed], similarity[typed]
+
+        labels = self.labels
+        scored = (
+            (2.0 * (labels[r] == query) + labels[r].startswith(query) + sim, r)
+            for r, sim in zip(rows.tolist(), similarity.tolist())
+        )
+        top = heapq.nsmallest(limit, scored, key=lambda hit: (-hit[0], labels[hit[1]]))
+        return [(self.ids[r], score) for score, r in top]
+
+
+entity_ngram_index = EntityNgramIndex()
+
+
+def search_entities(db: Session, query: str, entity_type: Optional[str] = None, case_id: Optional[UUID] = None,
+                    fuzzy: bool = True, limit: int = 50) -> List[Tuple[models.Entity, float]]:
+    """(entity, score) pairs, best first."""
+    query = normalize_query(query)
+    if not query:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return entity_repository.search_entities(
+            db, query, entity_type, case_id, fuzzy, limit, SEARCH_CANDIDATES, SEARCH_FUZZY_THRESHOLD
+        )
+    index = entity_ngram_index
+    index.refresh(db)
+    case_rows = None
+    if case_id is not None:
+        rows = index.rows
+        case_rows = np.array([rows[eid] for eid in entity_repository.get_case_entity_ids(db, case_id) if eid in rows],
+                             dtype=np.int64)
+    hits = index.search(query, fuzzy, limit, entity_type, case_rows)
+    entities = entity_repository.get_entities_by_ids(db, [eid for eid, _ in hits])
+    # Entities merged away since they were indexed are gone from the database
+    return [(entities[eid], score) for eid, score in hits if eid in entities]
@@ -1,15 +1,19 @@
 from sqlalchemy.orm import Session
 from uuid import UUID
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from app.db import models
 from app.db.schemas import EntityCreate
 from app.repositories import entity_repository, evidence_repository, relationship_repository
+from app.core.config import TRAVERSAL_MAX_NODES, TRAVERSAL_TIME_BUDGET
+from app.services import entity_resolution, entity_search, graph_traversal
+from app.services.graph_store import case_graph_store
 
 def get_entity(db: Session, entity_id: UUID) -> Optional[models.Entity]:
     return entity_repository.get_entity_by_id(db, entity_id)
 
-def search_entities(db: Session, query: str, limit: int = 50) -> List[models.Entity]:
-    return entity_repository.search_entities(db, query, limit)
+def search_entities(db: Session, query: str, limit: int = 50, entity_type: Optional[str] = None,
+                    case_id: Optional[UUID] = None, fuzzy: bool = True) -> List[Tuple[models.Entity, float]]:
+    return entity_search.search_entities(db, query, entity_type, case_id, fuzzy, limit)
 
 def get_entity_timeline(db: Session, entity_id: UUID) -> List[models.EvidenceItem]:
     return evidence_repository.get_evidence_by_entity(db, entity_id)
@@ -17,7 +21,25 @@ def get_entity_timeline(db: Session, entity_id: UUID) -> List[models.EvidenceIte
 def get_entity_connections(db: Session, entity_id: UUID) -> List[models.Relationship]:
     return relationship_repository.get_relationships_by_entity(db, entity_id)
 
+def get_entity_neighborhood(db: Session, entity_id: UUID, case_id: UUID, hops: int, max_fanout: int) -> Optional[dict]:
+    """Entities within `hops` links of `entity_id` in the case graph; None when it is not in that graph."""
+    return graph_traversal.neighborhood(
+        case_graph_store.get(db, case_id), entity_id, hops, max_fanout, TRAVERSAL_MAX_NODES, TRAVERSAL_TIME_BUDGET
+    )
+
+def find_entity_path(db: Session, source_id: UUID, target_id: UUID, case_id: UUID, weighted: bool,
+                     max_hops: int, max_fanout: int) -> Optional[dict]:
+    return graph_traversal.shortest_path(
+        case_graph_store.get(db, case_id), source_id, target_id, weighted, max_hops, max_fanout, TRAVERSAL_TIME_BUDGET
+    )
+
 def create_entity(db: Session, payload: EntityCreate) -> models.Entity:
+    """A phone, email or IP that already has an entity returns that entity instead of a duplicate."""
+    key = entity_resolution.resolution_key(payload.entity_type, payload.label)
+    if key is not None:
+        return entity_repository.get_or_create_entity(
+            db, payload.entity_type, payload.label, payload.risk_score, payload.confidence_score, key
+        )
     return entity_repository.create_entity(
         db,
         entity_type=payload.entity_type,
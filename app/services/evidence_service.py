@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session
 from uuid import UUID
-from typing import List
+from typing import Iterator, List, Optional
 from app.db.models import EvidenceItem
 from app.db.schemas import EvidenceCreate
 from app.services.audit_service import log_action
 from app.repositories import evidence_repository
+from app.repositories.pagination import decode_cursor, parse_fields
+from app.db.session import iter_with_session
+from app.core.config import STREAM_BATCH_ROWS
 
 def create_evidence(db: Session, case_id: UUID, evidence: EvidenceCreate, user_id: UUID) -> EvidenceItem:
     import hashlib
@@ -27,3 +30,15 @@ def create_evidence(db: Session, case_id: UUID, evidence: EvidenceCreate, user_i
 
 def get_case_evidence(db: Session, case_id: UUID) -> List[EvidenceItem]:
     return evidence_repository.get_evidence_by_case(db, case_id)
+
+def get_case_evidence_page(db: Session, case_id: UUID, cursor: Optional[str], limit: int,
+                           fields: Optional[str] = None) -> tuple[List[dict], Optional[str]]:
+    fields = parse_fields(fields, list(evidence_repository.EVIDENCE_FIELDS))
+    return evidence_repository.get_evidence_page(db, case_id, fields, cursor, limit)
+
+def stream_case_evidence(case_id: UUID, cursor: Optional[str], fields: Optional[str] = None) -> Iterator[List[dict]]:
+    """Batches of every evidence row after `cursor`, read on their own session for a streamed response."""
+    fields = parse_fields(fields, list(evidence_repository.EVIDENCE_FIELDS))
+    if cursor:
+        decode_cursor(cursor)  # reject a bad cursor before the response starts
+    return iter_with_session(evidence_repository.iter_evidence, case_id, fields, cursor, STREAM_BATCH_ROWS)
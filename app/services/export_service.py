@@ -11,6 +11,11 @@ from sqlalchemy.orm import Session
 from app.db import models
 from app.db.models import Export
 from app.services.audit_service import log_action
+from app.ai.explain import Explanations, explanation_cache
+from app.ai.relations import FINANCIAL_RULE, COMMUNICATION_RULE, PROXIMITY_RULE, NARRATIVE_RULE
+
+import numpy as np
+import pandas as pd
 
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
@@ -28,6 +33,47 @@ def sha256_file(path: Path) -> str:
             h.update(chunk)
     return h.hexdigest()
 
+# Heuristic weights summarizing what a stored relationship rests on: its basis and how long it was seen.
+# Not the link model's attribution, and deliberately not the relationship's own strength or confidence.
+RELATIONSHIP_EXPLAIN_WEIGHTS = {
+    "financial_basis": 25.0,
+    "communication_basis": 25.0,
+    "narrative_basis": 15.0,
+    "proximity_basis": 5.0,
+    "active_days": 0.5,
+}
+# Cache namespace of RELATIONSHIP_EXPLAIN_WEIGHTS; they do not depend on any trained model
+RELATIONSHIP_EXPLAIN_VERSION = "relationship-heuristic-v1"
+
+def relationship_feature_frame(rels: list[models.Relationship]) -> pd.DataFrame:
+    basis = np.array([r.basis for r in rels], dtype=object)
+    first = pd.to_datetime(pd.Series([r.first_seen for r in rels], dtype=object))
+    last = pd.to_datetime(pd.Series([r.last_seen for r in rels], dtype=object))
+    return pd.DataFrame({
+        "financial_basis": (basis == FINANCIAL_RULE.basis).astype(float),
+        "communication_basis": (basis == COMMUNICATION_RULE.basis).astype(float),
+        "narrative_basis": (basis == NARRATIVE_RULE.basis).astype(float),
+        "proximity_basis": (basis == PROXIMITY_RULE.basis).astype(float),
+        "active_days": ((last - first).dt.total_seconds() / 86400.0).fillna(0.0).to_numpy(),
+    })
+
+def explain_relationships(rels: list[models.Relationship], k: int = 3) -> Explanations:
+    """Heuristic basis summary (RELATIONSHIP_EXPLAIN_WEIGHTS) of every relationship in one batch, cached per row."""
+    X = relationship_feature_frame(rels)
+    return explanation_cache.explain(X, RELATIONSHIP_EXPLAIN_WEIGHTS, RELATIONSHIP_EXPLAIN_VERSION, k)
+
+def _format_contributors(explanations: Explanations, i: int) -> str:
+    return ", ".join(f"{name} ({value:.1f})" for name, value in explanations.row(i)["top_contributors"])
+
+def write_link_explanations(db: Session, case_id: UUID) -> Path:
+    """Explanations for every relationship of the case, as a JSON file for the export pack."""
+    rels = db.query(models.Relationship).filter(models.Relationship.case_id == case_id).all()
+    explanations = explain_relationships(rels) if rels else None
+    rows = [{"rel_id": str(r.rel_id), **explanations.row(i)} for i, r in enumerate(rels)]
+    out = EXPORT_DIR / f"link_explanations_{case_id}_{int(datetime.utcnow().timestamp())}.json"
+    out.write_text(json.dumps({"case_id": str(case_id), "relationships": rows}, indent=2), encoding="utf-8")
+    return out
+
 def generate_court_pdf(db: Session, case_id: UUID, payload: dict) -> Path:
     """Generate a court-safe PDF: fetches actual case data from the database."""
     case = db.get(models.Case, case_id)
@@ -90,12 +136,16 @@ def generate_court_pdf(db: Session, case_id: UUID, payload: dict) -> Path:
     c.drawString(50, y, "Validated Relationships")
     y -= 18
     c.setFont("Helvetica", 9)
-    for r in rel_objs[:20]:
+    shown = rel_objs[:20]
+    why = explain_relationships(shown) if shown else None
+    for i, r in enumerate(shown):
         if y < 80:
             c.showPage()
             y = h - 60
             c.setFont("Helvetica", 9)
         c.drawString(70, y, f"Source: {str(r.source_entity_id)[:8]}... ➔ Target: {str(r.target_entity_id)[:8]}... | Strength: {float(r.strength_score)}")
+        y -= 12
+        c.drawString(90, y, f"Heuristic basis summary (not model attribution): {_format_contributors(why, i)}")
         y -= 14
 
     y -= 25
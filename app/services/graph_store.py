@@ -0,0 +1,454 @@
+"""
+Materialized read model behind GET /cases/{case_id}/graph.
+
+Each case's graph is held as a `CaseGraphSnapshot`: a vertex index (entity
+uuid -> row) over flat numpy arrays, plus parallel edge arrays holding
+source/target rows, basis codes, weights and creation times. Snapshots are versioned by
+`case_graph_state.version`. Every relationship or case_entity write bumps
+that version and stamps its rows with it, so bringing a snapshot up to
+date only reads the rows written since its version (a snapshot older than
+the case's `rewrite_version` is rebuilt instead). Snapshots persist as
+npz under GRAPH_CACHE_DIR, and the most recently read ones stay in memory
+together with their JSON encoding. Pages of the graph list the case
+nodes first, in (link version, entity_id) order, then the edges in
+(created_at, rel_id) order; both orders are sorted once per version, so
+a cursor resolves with a binary search. Traversals
+(`graph_traversal`) run over an undirected CSR derived from the edge arrays,
+likewise built once per version.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, List, Optional
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import GRAPH_CACHE_DIR, GRAPH_CACHE_CASES
+from app.repositories import graph_repository
+from app.repositories.pagination import PageError, decode_cursor, encode_cursor, from_timestamp_us, timestamp_us
+
+NODE_FIELDS = ["id", "label", "type"]
+EDGE_FIELDS = ["id", "source", "target", "basis", "weight"]
+GRAPH_FIELDS = ["id", "label", "type", "source", "target", "basis", "weight"]
+
+# Edge sort key for pages: created_at in microseconds, then the rel_id bytes as two big-endian halves
+_PAGE_KEY = np.dtype([("created", "<i8"), ("hi", "<u8"), ("lo", "<u8")])
+# Node sort key for pages: the version that linked the entity into the case, then its id halves
+_NODE_KEY = np.dtype([("version", "<i8"), ("hi", "<u8"), ("lo", "<u8")])
+
+
+def _encode_node_cursor(version: int, entity_id: UUID) -> str:
+    raw = json.dumps(["n", version, str(entity_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+# Cursor of a page that ends exactly with the last node: the next page starts at the first edge
+_EDGES_START = base64.urlsafe_b64encode(b'["e"]').rstrip(b"=").decode()
+
+
+def _decode_graph_cursor(cursor: Optional[str]) -> tuple[str, Optional[np.ndarray]]:
+    """("nodes" | "edges", sort key to resume after, or None to start the phase)."""
+    if not cursor:
+        return "nodes", None
+    if cursor == _EDGES_START:
+        return "edges", None
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise PageError("invalid cursor") from e
+    if isinstance(raw, list) and len(raw) == 3 and raw[0] == "n":
+        try:
+            version, entity_id = int(raw[1]), UUID(raw[2])
+        except (ValueError, TypeError) as e:
+            raise PageError("invalid cursor") from e
+        hi, lo = np.frombuffer(entity_id.bytes, dtype=">u8")
+        return "nodes", np.array((version, hi, lo), dtype=_NODE_KEY)
+    created_at, rel_id = decode_cursor(cursor)
+    hi, lo = np.frombuffer(rel_id.bytes, dtype=">u8")
+    return "edges", np.array((timestamp_us(created_at), hi, lo), dtype=_PAGE_KEY)
+
+
+def _pack_strings(values: List[str]) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    return [raw[a:b].decode("utf-8") for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+class CaseGraphSnapshot:
+    """
+    Array-backed adjacency of one case at `version`. Vertices are every
+    entity that is a case node or an edge endpoint (`in_case` marks the
+    nodes, listed in `node_order`); edges refer to vertices by row.
+
+    The store hands one snapshot to every reader and applies later deltas
+    to it in place, so `apply` and the lazily built JSON, page index and
+    CSR all hold the snapshot's lock: a cache is built from one version
+    and never half-way through a delta.
+    """
+
+    def __init__(self, case_id: UUID):
+        self.case_id = case_id
+        self.version = -1  # nothing applied yet; every stamped row is newer
+        self.ids = np.empty(0, dtype="V16")
+        self.in_case = np.empty(0, dtype=bool)
+        self.labels: List[str] = []
+        self.types: List[str] = []
+        self.node_order = np.empty(0, dtype=np.int32)
+        self.node_version = np.empty(0, dtype=np.int64)  # link version of each node_order entry
+        self.edge_ids = np.empty(0, dtype="V16")
+        self.src = np.empty(0, dtype=np.int32)
+        self.dst = np.empty(0, dtype=np.int32)
+        self.basis = np.empty(0, dtype=np.int16)
+        self.weight = np.empty(0, dtype=np.float64)
+        self.edge_created = np.empty(0, dtype=np.int64)
+        self.bases: List[str] = []
+        self.index: dict[bytes, int] = {}
+        self._basis_codes: dict[str, int] = {}
+        self._id_strs: List[str] = []
+        self._node_json: Optional[List[str]] = None
+        self._edge_json: Optional[List[str]] = None
+        self._body: Optional[bytes] = None
+        self._page_order: Optional[np.ndarray] = None
+        self._page_keys: Optional[np.ndarray] = None
+        self._node_page: Optional[tuple[np.ndarray, np.ndarray]] = None
+        self._adjacency: Optional[tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._lock = threading.RLock()
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_order)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_ids)
+
+    def adjacency(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Undirected CSR over the vertex rows, built once per version: the
+        neighbours of row i are nbrs[indptr[i]:indptr[i + 1]], reached over the
+        edges in `edges` (indexes into the edge arrays), strongest link first.
+        """
+        with self._lock:
+            if self._adjacency is None:
+                n, m = len(self.ids), self.edge_count
+                loop = self.src == self.dst
+                rows = np.concatenate([self.src, self.dst[~loop]]).astype(np.int64)
+                nbrs = np.concatenate([self.dst, self.src[~loop]]).astype(np.int64)
+                edges = np.concatenate([np.arange(m), np.flatnonzero(~loop)])
+                order = np.lexsort((-self.weight[edges], rows))
+                indptr = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+                self._adjacency = (indptr, nbrs[order], edges[order])
+            return self._adjacency
+
+    def _vertex(self, entity_id: UUID, new_ids: list) -> int:
+        key = entity_id.bytes
+        row = self.index.get(key)
+        if row is None:
+            row = self.index[key] = len(self.index)
+            new_ids.append(key)
+            self.labels.append("")
+            self.types.append("")
+            self._id_strs.append(str(entity_id))
+        return row
+
+    def _basis_code(self, basis: str) -> int:
+        code = self._basis_codes.get(basis)
+        if code is None:
+            code = self._basis_codes[basis] = len(self.bases)
+            self.bases.append(basis)
+        return code
+
+    def apply(self, version: int, node_rows: list, edge_rows: list) -> None:
+        """Appends the nodes and edges written in (self.version, version]."""
+        with self._lock:
+            self._apply(version, node_rows, edge_rows)
+
+    def _apply(self, version: int, node_rows: list, edge_rows: list) -> None:
+        new_ids: list = []
+        joined, joined_versions = [], []
+        for entity_id, label, entity_type, linked_version in node_rows:
+            row = self._vertex(entity_id, new_ids)
+            self.labels[row] = label
+            self.types[row] = entity_type
+            joined.append(row)
+            joined_versions.append(linked_version)
+        src, dst, codes, weights, created, edge_ids = [], [], [], [], [], []
+        for rel_id, source_id, target_id, basis, strength, created_at in edge_rows:
+            edge_ids.append(rel_id.bytes)
+            src.append(self._vertex(source_id, new_ids))
+            dst.append(self._vertex(target_id, new_ids))
+            codes.append(self._basis_code(basis))
+            weights.append(float(strength))
+            created.append(timestamp_us(created_at))
+
+        if new_ids:
+            self.ids = np.concatenate([self.ids, np.frombuffer(b"".join(new_ids), dtype="V16")])
+            self.in_case = np.concatenate([self.in_case, np.zeros(len(new_ids), dtype=bool)])
+        joined = np.asarray(joined, dtype=np.int32)
+        fresh = ~self.in_case[joined]  # rows already in the case stay where they are
+        joined = joined[fresh]
+        self.in_case[joined] = True
+        self.node_order = np.concatenate([self.node_order, joined])
+        self.node_version = np.concatenate([self.node_version, np.asarray(joined_versions, dtype=np.int64)[fresh]])
+        if len(joined):
+            self._node_page = None
+        if edge_ids:
+            self.edge_ids = np.concatenate([self.edge_ids, np.frombuffer(b"".join(edge_ids), dtype="V16")])
+            self.src = np.concatenate([self.src, np.asarray(src, dtype=np.int32)])
+            self.dst = np.concatenate([self.dst, np.asarray(dst, dtype=np.int32)])
+            self.basis = np.concatenate([self.basis, np.asarray(codes, dtype=np.int16)])
+            self.weight = np.concatenate([self.weight, np.asarray(weights, dtype=np.float64)])
+            self.edge_created = np.concatenate([self.edge_created, np.asarray(created, dtype=np.int64)])
+            self._page_order = self._page_keys = None
+            self._adjacency = None
+
+        if self._node_json is not None:
+            self._node_json.extend(self._encode_nodes(joined))
+            self._edge_json.extend(self._encode_edges(self.edge_count - len(edge_ids)))
+        self._body = None
+        self.version = version
+
+    def _encode_nodes(self, rows: np.ndarray) -> List[str]:
+        ids, labels, types = self._id_strs, self.labels, self.types
+        return [
+            f'{{"id":"{ids[i]}","label":{json.dumps(labels[i], ensure_ascii=False)},'
+            f'"type":{json.dumps(types[i], ensure_ascii=False)}}}'
+            for i in rows.tolist()
+        ]
+
+    def _encode_edges(self, start: int, stop: Optional[int] = None) -> List[str]:
+        ids = self._id_strs
+        bases = [json.dumps(b, ensure_ascii=False) for b in self.bases]
+        span = slice(start, stop)
+        return [
+            f'{{"id":"{UUID(bytes=rel_id)}","source":"{ids[s]}","target":"{ids[t]}",'
+            f'"basis":{bases[b]},"weight":{w!r}}}'
+            for rel_id, s, t, b, w in zip(
+                self.edge_ids[span].tolist(), self.src[span].tolist(), self.dst[span].tolist(),
+                self.basis[span].tolist(), self.weight[span].tolist(),
+            )
+        ]
+
+    def json_bytes(self) -> bytes:
+        """The graph as CaseGraph JSON; each node and edge is encoded once and reused across versions."""
+        with self._lock:
+            if self._body is None:
+                if self._node_json is None:
+                    self._node_json = self._encode_nodes(self.node_order)
+                    self._edge_json = self._encode_edges(0)
+                self._body = (
+                    '{"nodes":[' + ",".join(self._node_json) + '],"edges":[' + ",".join(self._edge_json) + "]}"
+                ).encode("utf-8")
+            return self._body
+
+    def _page_index(self) -> tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            if self._page_order is None:
+                halves = self.edge_ids.view(">u8").reshape(-1, 2)
+                keys = np.empty(self.edge_count, dtype=_PAGE_KEY)
+                keys["created"], keys["hi"], keys["lo"] = self.edge_created, halves[:, 0], halves[:, 1]
+                self._page_order = np.lexsort((keys["lo"], keys["hi"], keys["created"]))
+                self._page_keys = keys[self._page_order]
+            return self._page_order, self._page_keys
+
+    def _node_index(self) -> tuple[np.ndarray, np.ndarray]:
+        """Rows of the case nodes in (link version, entity_id) order, and their sort keys."""
+        with self._lock:
+            if self._node_page is None:
+                halves = self.ids[self.node_order].view(">u8").reshape(-1, 2)
+                keys = np.empty(self.node_count, dtype=_NODE_KEY)
+                keys["version"], keys["hi"], keys["lo"] = self.node_version, halves[:, 0], halves[:, 1]
+                order = np.lexsort((keys["lo"], keys["hi"], keys["version"]))
+                self._node_page = (self.node_order[order], keys[order])
+            return self._node_page
+
+    def page(self, cursor: Optional[str], limit: int, fields: List[str]) -> dict:
+        """
+        Up to `limit` records after `cursor`: every case node first, in
+        (link version, entity_id) order, then every edge in (created_at,
+        rel_id) order; a page may hold the last nodes and the first edges.
+        Nodes linked after a client has passed the node phase are not
+        revisited. Ids are always included; other `fields` apply to
+        whichever of nodes and edges carry them.
+        """
+        with self._lock:
+            return self._page(cursor, limit, fields)
+
+    def _page(self, cursor: Optional[str], limit: int, fields: List[str]) -> dict:
+        phase, key = _decode_graph_cursor(cursor)
+        ends = rows = np.empty(0, dtype=np.int64)
+        next_cursor = None
+        if phase == "nodes":
+            node_rows, node_keys = self._node_index()
+            start = int(np.searchsorted(node_keys, key, side="right")) if key is not None else 0
+            ends = node_rows[start:start + limit]
+            if start + limit < len(node_rows):
+                last = node_keys[start + limit - 1]
+                next_cursor = _encode_node_cursor(int(last["version"]), UUID(bytes=self.ids[ends[-1]].tobytes()))
+            else:
+                phase, key, limit = "edges", None, limit - len(ends)
+        if phase == "edges":
+            order, keys = self._page_index()
+            start = int(np.searchsorted(keys, key, side="right")) if key is not None else 0
+            rows = order[start:start + limit]
+            if start + limit < len(order):
+                if limit:
+                    last = keys[start + limit - 1]
+                    next_cursor = encode_cursor(
+                        from_timestamp_us(int(last["created"])),
+                        UUID(bytes=self.edge_ids[rows[-1]].tobytes()),
+                    )
+                else:
+                    next_cursor = _EDGES_START
+
+        ids = self._id_strs
+        node_cols = {"id": lambda i: ids[i], "label": lambda i: self.labels[i], "type": lambda i: self.types[i]}
+        edge_cols = {
+            "id": lambda e: str(UUID(bytes=self.edge_ids[e].tobytes())),
+            "source": lambda e: ids[self.src[e]],
+            "target": lambda e: ids[self.dst[e]],
+            "basis": lambda e: self.bases[self.basis[e]],
+            "weight": lambda e: float(self.weight[e]),
+        }
+        node_fields = ["id"] + [f for f in fields if f in node_cols and f != "id"]
+        edge_fields = ["id"] + [f for f in fields if f in edge_cols and f != "id"]
+        return {
+            "nodes": [{f: node_cols[f](i) for f in node_fields} for i in ends.tolist()],
+            "edges": [{f: edge_cols[f](e) for f in edge_fields} for e in rows.tolist()],
+            "next_cursor": next_cursor,
+        }
+
+    def iter_fragments(self, batch: int) -> Iterator[tuple[str, List[str]]]:
+        """
+        ("nodes" | "edges", JSON-encoded records) in batches of `batch`, nodes
+        first, as of the current version. Arrays only ever grow by
+        concatenation, so later deltas do not disturb a stream in progress;
+        records not yet encoded are encoded a batch at a time.
+        """
+        node_order, n_edges = self.node_order, self.edge_count
+        node_json, edge_json = self._node_json, self._edge_json
+
+        def batches() -> Iterator[tuple[str, List[str]]]:
+            for i in range(0, len(node_order), batch):
+                rows = node_order[i:i + batch]
+                yield "nodes", node_json[i:i + batch] if node_json is not None else self._encode_nodes(rows)
+            for i in range(0, n_edges, batch):
+                stop = min(i + batch, n_edges)
+                yield "edges", edge_json[i:stop] if edge_json is not None else self._encode_edges(i, stop)
+
+        return batches()
+
+    def as_dict(self) -> dict:
+        ids = [UUID(bytes=b) for b in self.ids.tolist()]
+        nodes = [{"id": ids[i], "label": self.labels[i], "type": self.types[i]} for i in self.node_order.tolist()]
+        edges = [
+            {"id": UUID(bytes=rel_id), "source": ids[s], "target": ids[t], "basis": self.bases[b], "weight": w}
+            for rel_id, s, t, b, w in zip(
+                self.edge_ids.tolist(), self.src.tolist(), self.dst.tolist(), self.basis.tolist(), self.weight.tolist()
+            )
+        ]
+        return {"nodes": nodes, "edges": edges}
+
+    def save(self, path: Path) -> None:
+        labels, label_offsets = _pack_strings(self.labels)
+        types, type_offsets = _pack_strings(self.types)
+        bases, basis_offsets = _pack_strings(self.bases)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{uuid.uuid4().hex}.npz")
+        np.savez(
+            tmp, version=self.version, ids=self.ids, in_case=self.in_case, node_order=self.node_order,
+            node_version=self.node_version,
+            labels=labels, label_offsets=label_offsets, types=types, type_offsets=type_offsets,
+            edge_ids=self.edge_ids, src=self.src, dst=self.dst, basis=self.basis, weight=self.weight,
+            edge_created=self.edge_created, bases=bases, basis_offsets=basis_offsets,
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, case_id: UUID, path: Path) -> "CaseGraphSnapshot":
+        snap = cls(case_id)
+        with np.load(path) as data:
+            snap.version = int(data["version"])
+            snap.ids, snap.in_case, snap.node_order = data["ids"], data["in_case"], data["node_order"]
+            snap.node_version = data["node_version"]
+            snap.edge_ids, snap.src, snap.dst = data["edge_ids"], data["src"], data["dst"]
+            snap.basis, snap.weight, snap.edge_created = data["basis"], data["weight"], data["edge_created"]
+            snap.labels = _unpack_strings(data["labels"], data["label_offsets"])
+            snap.types = _unpack_strings(data["types"], data["type_offsets"])
+            snap.bases = _unpack_strings(data["bases"], data["basis_offsets"])
+        snap.index = {key: i for i, key in enumerate(snap.ids.tolist())}
+        snap._basis_codes = {b: i for i, b in enumerate(snap.bases)}
+        snap._id_strs = [str(UUID(bytes=key)) for key in snap.ids.tolist()]
+        return snap
+
+
+class CaseGraphStore:
+    """Per-process front of the case graph snapshots: memory LRU, then disk, then the database."""
+
+    def __init__(self, cache_dir: Optional[str] = GRAPH_CACHE_DIR, max_cases: int = GRAPH_CACHE_CASES):
+        self.root = Path(cache_dir) if cache_dir else None
+        self.max_cases = max_cases
+        self._cases: "OrderedDict[UUID, CaseGraphSnapshot]" = OrderedDict()
+        self._locks: dict[UUID, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, case_id: UUID) -> Optional[Path]:
+        if self.root is None:
+            return None
+        return self.root / case_id.hex[:2] / f"{case_id.hex}.npz"
+
+    def _cached(self, case_id: UUID) -> CaseGraphSnapshot:
+        snap = self._cases.get(case_id)
+        if snap is not None:
+            return snap
+        path = self._path(case_id)
+        if path is not None and path.exists():
+            try:
+                return CaseGraphSnapshot.load(case_id, path)
+            except (OSError, ValueError, KeyError):
+                pass
+        return CaseGraphSnapshot(case_id)
+
+    def get(self, db: Session, case_id: UUID) -> CaseGraphSnapshot:
+        """The case's graph as of its current version, reading only rows written since the held snapshot."""
+        with self._lock:
+            case_lock = self._locks.setdefault(case_id, threading.Lock())
+        with case_lock:
+            version, rewritten = graph_repository.get_graph_state(db, case_id)
+            snap = self._cached(case_id)
+            # Start over if the store outlived its database or rows it holds were rewritten (entity merges)
+            if snap.version > version or snap.version < rewritten:
+                snap = CaseGraphSnapshot(case_id)
+            if snap.version < version or snap.version < 0:
+                snap.apply(
+                    version,
+                    graph_repository.get_graph_node_rows(db, case_id, snap.version, version),
+                    graph_repository.get_graph_edge_rows(db, case_id, snap.version, version),
+                )
+                path = self._path(case_id)
+                if path is not None:
+                    snap.save(path)
+            with self._lock:
+                self._cases[case_id] = snap
+                self._cases.move_to_end(case_id)
+                while len(self._cases) > self.max_cases:
+                    evicted, _ = self._cases.popitem(last=False)
+                    self._locks.pop(evicted, None)
+            return snap
+
+
+case_graph_store = CaseGraphStore()
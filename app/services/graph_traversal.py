@@ -0,0 +1,269 @@
+"""
+Traversals over a case's materialized graph: k-hop ego networks, shortest
+paths by bidirectional BFS, and strongest paths by hop-limited Dijkstra over
+strength_score.
+
+Everything runs on the snapshot's undirected CSR (`CaseGraphSnapshot.adjacency`),
+which is built once per graph version, so a query reads nothing from the
+database beyond the store's version check. Each query is bounded three
+ways. `max_fanout` expands only that many of a vertex's links, strongest
+first, and the cut vertices are reported. `max_nodes` caps an ego network.
+`time_budget` is checked between BFS levels (every few hundred heap pops for
+Dijkstra). A query stopped by any limit says so with `complete: false`.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import time
+from typing import List, Optional
+from uuid import UUID
+
+import numpy as np
+
+from app.services.graph_store import CaseGraphSnapshot
+
+_UNSEEN = -2
+_ROOT = -1
+
+
+def _gather(indptr: np.ndarray, rows: np.ndarray, max_fanout: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(position in rows, CSR slot) of up to `max_fanout` links per row, plus the rows that had more."""
+    starts = indptr[rows]
+    degree = indptr[rows + 1] - starts
+    lens = np.minimum(degree, max_fanout)
+    owner = np.repeat(np.arange(len(rows)), lens)
+    offsets = np.arange(int(lens.sum())) - np.repeat(np.cumsum(lens) - lens, lens)
+    return owner, np.repeat(starts, lens) + offsets, rows[degree > max_fanout]
+
+
+def _first_seen(cand: np.ndarray, order_by: np.ndarray) -> np.ndarray:
+    """Positions of the distinct values of `cand`, each at its first occurrence in `order_by` order."""
+    order = np.argsort(order_by, kind="stable")
+    _, first = np.unique(cand[order], return_index=True)
+    return order[np.sort(first)]
+
+
+def _covered(edges: np.ndarray) -> int:
+    """Edges the adjacency was built over; the snapshot's arrays may have grown since."""
+    return int(edges.max()) + 1 if len(edges) else 0
+
+
+def _nodes(snap: CaseGraphSnapshot, rows: List[int], hops: Optional[List[int]] = None) -> List[dict]:
+    ids, labels, types = snap._id_strs, snap.labels, snap.types
+    out = [{"id": ids[i], "label": labels[i], "type": types[i]} for i in rows]
+    if hops is not None:
+        for node, h in zip(out, hops):
+            node["hops"] = h
+    return out
+
+
+def _edges(snap: CaseGraphSnapshot, rows: List[int]) -> List[dict]:
+    ids = snap._id_strs
+    return [
+        {
+            "id": str(UUID(bytes=snap.edge_ids[e].tobytes())),
+            "source": ids[int(snap.src[e])],
+            "target": ids[int(snap.dst[e])],
+            "basis": snap.bases[int(snap.basis[e])],
+            "weight": float(snap.weight[e]),
+        }
+        for e in rows
+    ]
+
+
+def neighborhood(snap: CaseGraphSnapshot, entity_id: UUID, hops: int, max_fanout: int,
+                 max_nodes: int, time_budget: float) -> Optional[dict]:
+    """
+    The ego network of `entity_id` out to `hops` links: every vertex reached
+    (with its hop distance) and every edge between reached vertices. When
+    `max_nodes` would be exceeded, the last level keeps the vertices behind
+    the strongest links. None when the entity is not in the case graph.
+    """
+    start = snap.index.get(entity_id.bytes)
+    if start is None:
+        return None
+    deadline = time.monotonic() + time_budget
+    indptr, nbrs, edges = snap.adjacency()
+    weight = snap.weight
+
+    dist = np.full(len(indptr) - 1, -1, dtype=np.int64)
+    dist[start] = 0
+    levels = [np.array([start], dtype=np.int64)]
+    truncated: List[np.ndarray] = []
+    reached, complete = 1, True
+    for d in range(1, hops + 1):
+        if time.monotonic() > deadline:
+            complete = False
+            break
+        owner, slots, cut = _gather(indptr, levels[-1], max_fanout)
+        truncated.append(cut)
+        cand = nbrs[slots]
+        new = dist[cand] == -1
+        cand, slots = cand[new], slots[new]
+        if not len(cand):
+            break
+        nxt = cand[_first_seen(cand, -weight[edges[slots]])]
+        if reached + len(nxt) > max_nodes:
+            nxt = nxt[:max_nodes - reached]
+            complete = False
+        dist[nxt] = d
+        levels.append(nxt)
+        reached += len(nxt)
+        if not complete:
+            break
+
+    rows = np.concatenate(levels)
+    inside = dist >= 0
+    n_edges = _covered(edges)
+    between = np.flatnonzero(inside[snap.src[:n_edges]] & inside[snap.dst[:n_edges]])
+    cut_rows = np.concatenate(truncated) if truncated else np.empty(0, dtype=np.int64)
+    return {
+        "entity_id": snap._id_strs[start],
+        "case_id": str(snap.case_id),
+        "hops": hops,
+        "nodes": _nodes(snap, rows.tolist(), dist[rows].tolist()),
+        "edges": _edges(snap, between.tolist()),
+        "truncated": [snap._id_strs[i] for i in cut_rows.tolist()],
+        "complete": complete and not len(cut_rows),
+    }
+
+
+def _walk(parent: np.ndarray, via: np.ndarray, row: int) -> tuple[List[int], List[int]]:
+    """Vertices and edges from `row` back to the root of a BFS/Dijkstra tree."""
+    rows, path_edges = [row], []
+    while parent[row] != _ROOT:
+        path_edges.append(int(via[row]))
+        row = int(parent[row])
+        rows.append(row)
+    return rows, path_edges
+
+
+def _bfs_path(indptr, nbrs, edges, s: int, t: int, max_hops: int, max_fanout: int,
+              deadline: float) -> tuple[Optional[tuple[List[int], List[int]]], bool]:
+    """
+    Fewest-links path by bidirectional BFS, growing the smaller frontier one
+    level at a time. The first level that meets the other side holds a
+    shortest path, since the two searches had not met one level earlier.
+    """
+    n = len(indptr) - 1
+    parent = [np.full(n, _UNSEEN, dtype=np.int64), np.full(n, _UNSEEN, dtype=np.int64)]
+    via = [np.full(n, -1, dtype=np.int64), np.full(n, -1, dtype=np.int64)]
+    parent[0][s] = parent[1][t] = _ROOT
+    fronts = [np.array([s], dtype=np.int64), np.array([t], dtype=np.int64)]
+    if s == t:
+        return ([s], []), True
+    complete = True
+    for _ in range(max_hops):
+        if time.monotonic() > deadline:
+            return None, False
+        side = 0 if len(fronts[0]) <= len(fronts[1]) else 1
+        owner, slots, cut = _gather(indptr, fronts[side], max_fanout)
+        complete = complete and not len(cut)
+        cand = nbrs[slots]
+        new = parent[side][cand] == _UNSEEN
+        cand, owner, slots = cand[new], owner[new], slots[new]
+        if not len(cand):
+            return None, complete
+        _, first = np.unique(cand, return_index=True)
+        cand = cand[first]
+        parent[side][cand] = fronts[side][owner[first]]
+        via[side][cand] = edges[slots[first]]
+        fronts[side] = cand
+        meet = cand[parent[1 - side][cand] != _UNSEEN]
+        if len(meet):
+            row = int(meet[0])
+            head, head_edges = _walk(parent[0], via[0], row)
+            tail, tail_edges = _walk(parent[1], via[1], row)
+            return (head[::-1] + tail[1:], head_edges[::-1] + tail_edges), complete
+    return None, False
+
+
+def _dijkstra_path(snap: CaseGraphSnapshot, indptr, nbrs, edges, s: int, t: int, max_hops: int,
+                   max_fanout: int, deadline: float) -> tuple[Optional[tuple[List[int], List[int]]], bool]:
+    """
+    Strongest path of at most `max_hops` links: each link costs
+    -ln(strength_score / 100), so the cheapest path is the one whose
+    strengths have the highest product. Links with no strength are not
+    followed. Labels are (cost, links) pairs; a vertex is settled again only
+    by a label with fewer links than every earlier one, so a cheap but long
+    route cannot hide a dearer one that fits the hop limit.
+    """
+    n = len(indptr) - 1
+    strength = np.clip(snap.weight[:_covered(edges)], 0.0, 100.0)
+    with np.errstate(divide="ignore"):
+        cost = -np.log(strength / 100.0)
+    # Fewest links of any label settled at each vertex; a later label with as many is dominated
+    settled = np.full(n, max_hops + 1, dtype=np.int64)
+    # label -> (vertex, previous label, edge taken)
+    labels: List[tuple[int, int, int]] = [(s, _ROOT, -1)]
+    best = {(s, 0): 0.0}
+    heap = [(0.0, 0, 0)]
+    complete, pops = True, 0
+    while heap:
+        d, hops, label = heapq.heappop(heap)
+        row = labels[label][0]
+        if settled[row] <= hops:
+            continue
+        if row == t:
+            rows, path_edges = [], []
+            while label != _ROOT:
+                row, label, e = labels[label]
+                rows.append(row)
+                if e >= 0:
+                    path_edges.append(e)
+            return (rows[::-1], path_edges[::-1]), complete
+        settled[row] = hops
+        pops += 1
+        if pops % 256 == 0 and time.monotonic() > deadline:
+            return None, False
+        if hops >= max_hops:
+            continue
+        lo, hi = int(indptr[row]), int(indptr[row + 1])
+        if hi - lo > max_fanout:
+            hi, complete = lo + max_fanout, False
+        for nbr, e in zip(nbrs[lo:hi].tolist(), edges[lo:hi].tolist()):
+            c = cost[e]
+            if math.isinf(c) or settled[nbr] <= hops + 1:
+                continue
+            nd = d + c
+            if nd < best.get((nbr, hops + 1), math.inf):
+                best[nbr, hops + 1] = nd
+                labels.append((nbr, label, e))
+                heapq.heappush(heap, (nd, hops + 1, len(labels) - 1))
+    return None, complete
+
+
+def shortest_path(snap: CaseGraphSnapshot, source_id: UUID, target_id: UUID, weighted: bool,
+                  max_hops: int, max_fanout: int, time_budget: float) -> Optional[dict]:
+    """
+    Path between two entities of the case graph: fewest links, or with
+    `weighted` the strongest chain of links (see `_dijkstra_path`). `found`
+    is false when no path exists within the limits. None when either entity
+    is not in the case graph.
+    """
+    s, t = snap.index.get(source_id.bytes), snap.index.get(target_id.bytes)
+    if s is None or t is None:
+        return None
+    deadline = time.monotonic() + time_budget
+    indptr, nbrs, edges = snap.adjacency()
+    if weighted:
+        path, complete = _dijkstra_path(snap, indptr, nbrs, edges, s, t, max_hops, max_fanout, deadline)
+    else:
+        path, complete = _bfs_path(indptr, nbrs, edges, s, t, max_hops, max_fanout, deadline)
+    rows, path_edges = path or ([], [])
+    strength = None
+    if path is not None:
+        strength = 100.0 * math.prod(float(snap.weight[e]) / 100.0 for e in path_edges)
+    return {
+        "source": snap._id_strs[s],
+        "target": snap._id_strs[t],
+        "case_id": str(snap.case_id),
+        "weighted": weighted,
+        "found": path is not None,
+        "hops": len(path_edges) if path is not None else None,
+        "strength": strength,
+        "nodes": _nodes(snap, rows),
+        "edges": _edges(snap, path_edges),
+        "complete": complete,
+    }
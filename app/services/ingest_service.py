@@ -1,15 +1,27 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_, update
 from uuid import UUID
-from datetime import datetime
-from app.db.models import IngestJob, IngestFile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, BinaryIO
+import hashlib
+import uuid
+from app.core.config import SPOOL_DIR, SPOOL_CHUNK_SIZE, INGEST_JOB_LEASE_SECONDS, INGEST_UPLOAD_TIMEOUT_SECONDS
+from app.db.models import IngestJob, IngestFile, IngestJobFile
 from app.db.schemas import IngestJobCreate
+from app.repositories import entity_repository, relationship_repository, insight_repository
 from app.services.audit_service import log_action
 
-def create_ingest_job(db: Session, case_id: UUID, job_data: IngestJobCreate, user_id: UUID, ip_address: str | None = None) -> IngestJob:
+
+class LeaseLost(Exception):
+    """The job's lease lapsed and another worker claimed it; this worker must not write."""
+
+def create_ingest_job(db: Session, case_id: UUID, job_data: IngestJobCreate, user_id: UUID, ip_address: str | None = None,
+                      status: str = "queued") -> IngestJob:
     job = IngestJob(
         case_id=case_id,
         source_type=job_data.source_type,
-        status="queued",
+        status=status,
         created_at=datetime.utcnow()
     )
     db.add(job)
@@ -67,3 +79,299 @@ def add_file_to_job(
     db.commit()
     db.refresh(file_record)
     return file_record
+
+
+def spool_path(file_hash: str) -> Path:
+    """Content-addressed location of an uploaded file awaiting (or after) analysis."""
+    return Path(SPOOL_DIR) / file_hash[:2] / file_hash
+
+def spool_upload(fileobj: BinaryIO, chunk_size: int = SPOOL_CHUNK_SIZE) -> tuple[str, Path, int]:
+    """
+    Streams an upload to the spool in fixed-size chunks, hashing as it writes,
+    so memory stays flat regardless of file size. Returns (sha256, path, size).
+    """
+    tmp_dir = Path(SPOOL_DIR) / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp = tmp_dir / f"{uuid.uuid4().hex}.part"
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with tmp.open("wb") as out:
+            for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+                h.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        file_hash = h.hexdigest()
+        path = spool_path(file_hash)
+        if path.exists():
+            tmp.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.replace(path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return file_hash, path, size
+
+def find_file_by_hash(db: Session, file_hash: str) -> Optional[IngestFile]:
+    return db.query(IngestFile).filter(IngestFile.sha256_hash == file_hash).first()
+
+def link_known_file(db: Session, job: IngestJob, known: IngestFile) -> dict:
+    """
+    Attaches already-ingested content to `job` without re-parsing it: the
+    job gets a link row and the job's case gets the file's entities,
+    relationships and insights. If the original analysis has not finished
+    yet, the link is left 'pending' and resolved when it does. A failed
+    file is queued for another try, and its job re-run once free.
+    """
+    existing = db.get(IngestJobFile, (job.job_id, known.file_id))
+    if existing:
+        return {"file_id": str(known.file_id), "link_status": existing.status}
+
+    link = IngestJobFile(job_id=job.job_id, file_id=known.file_id, status="pending", created_at=datetime.utcnow())
+    db.add(link)
+    summary = {"file_id": str(known.file_id), "link_status": "pending"}
+    if known.status in ("completed", "skipped"):
+        summary.update(copy_file_findings(db, known.file_id, job.case_id))
+        link.status = summary["link_status"] = "linked"
+    elif known.status == "failed":
+        # Retry the original analysis; every pending link resolves once it finishes.
+        # A job still held by a worker is re-queued by finish_job when that run ends.
+        known.status = "queued"
+        known.error = None
+        origin = db.get(IngestJob, known.job_id)
+        if origin and not (origin.status == "running" and origin.lease_token is not None):
+            origin.status = "queued"
+    db.commit()
+    return summary
+
+def copy_file_findings(db: Session, file_id: UUID, case_id: UUID) -> dict:
+    """
+    Links a file's entities into `case_id` and copies its relationships and
+    insights there, unless the case already holds them. Does not commit.
+    """
+    # Copies are taken from the case that first ingested the file.
+    origin_case_id = db.query(IngestJob.case_id)\
+        .join(IngestFile, IngestFile.job_id == IngestJob.job_id)\
+        .filter(IngestFile.file_id == file_id)\
+        .scalar()
+    entity_ids = entity_repository.get_entity_ids_by_file(db, file_id)
+    linked = entity_repository.get_linked_entity_ids(db, case_id, entity_ids)
+    new_ids = [eid for eid in entity_ids if eid not in linked]
+    entity_repository.bulk_link_case_entities(db, case_id, new_ids)
+
+    rel_rows, insight_rows = [], []
+    if not relationship_repository.get_relationships_by_file(db, file_id, case_id):
+        rel_rows = [{
+            "rel_id": uuid.uuid4(),
+            "case_id": case_id,
+            "source_entity_id": r.source_entity_id,
+            "target_entity_id": r.target_entity_id,
+            "basis": r.basis,
+            "strength_score": r.strength_score,
+            "confidence_score": r.confidence_score,
+            "source_file_id": file_id,
+        } for r in relationship_repository.get_relationships_by_file(db, file_id, origin_case_id)]
+        relationship_repository.bulk_create_relationships(db, rel_rows)
+    if not insight_repository.get_insights_by_file(db, file_id, case_id):
+        insight_rows = [{
+            "insight_id": uuid.uuid4(),
+            "case_id": case_id,
+            "severity": i.severity,
+            "summary": i.summary,
+            "explanation": i.explanation,
+            "confidence_score": i.confidence_score,
+            "evidence": i.evidence,
+            "evidence_count": i.evidence_count,
+            "created_by": None,
+            "source_file_id": file_id,
+        } for i in insight_repository.get_insights_by_file(db, file_id, origin_case_id)]
+        insight_repository.bulk_create_insights(db, insight_rows)
+    return {"entities_linked": len(new_ids), "relationships_copied": len(rel_rows), "insights_copied": len(insight_rows)}
+
+def resolve_pending_links(db: Session, file_record: IngestFile) -> int:
+    """
+    Delivers a just-analyzed file's findings to every job that linked it
+    while it was in flight, or fails those links if the analysis failed.
+    Linking jobs left with nothing outstanding are finished.
+    """
+    if file_record.status not in ("completed", "skipped", "failed"):
+        return 0
+    links = db.query(IngestJobFile)\
+        .filter(IngestJobFile.file_id == file_record.file_id, IngestJobFile.status == "pending")\
+        .all()
+    waiting = []
+    for link in links:
+        job = db.get(IngestJob, link.job_id)
+        if file_record.status == "failed":
+            link.status = "failed"
+        else:
+            if job:
+                copy_file_findings(db, file_record.file_id, job.case_id)
+            link.status = "linked"
+        # A job no worker holds is only waiting on its links
+        if job and job.status == "running" and job.lease_token is None:
+            waiting.append(job)
+    db.flush()
+    for job in waiting:
+        finish_job(db, job, commit=False)
+    db.commit()
+    return len(links)
+
+def get_linked_files(db: Session, job_id: UUID) -> list[tuple[IngestFile, IngestJobFile]]:
+    return db.query(IngestFile, IngestJobFile)\
+        .join(IngestJobFile, IngestJobFile.file_id == IngestFile.file_id)\
+        .filter(IngestJobFile.job_id == job_id)\
+        .all()
+
+def enqueue_job(db: Session, job_id: UUID) -> Optional[IngestJob]:
+    """
+    Hands a fully uploaded job to the worker pool. A job made up only of
+    previously ingested files has nothing to analyze: it completes at once,
+    or stays 'running' until the analyses it linked to finish.
+    """
+    job = db.get(IngestJob, job_id)
+    if not job:
+        return None
+    has_own_files = db.query(IngestFile.file_id).filter(IngestFile.job_id == job_id).first() is not None
+    if has_own_files:
+        job.status = "queued"
+        db.commit()
+        return job
+    job.status = "running"
+    # The heartbeat marks a job started under leases, so claim_next_job leaves it to its links
+    job.started_at = job.heartbeat_at = datetime.utcnow()
+    db.commit()
+    # Analyses that finished after their link was made have not delivered to it
+    for file_record, link in get_linked_files(db, job_id):
+        if link.status == "pending" and file_record.status in ("completed", "skipped", "failed"):
+            resolve_pending_links(db, file_record)
+    db.refresh(job)
+    if job.status == "running":
+        finish_job(db, job)
+    return job
+
+def claim_next_job(db: Session, lease_seconds: int = INGEST_JOB_LEASE_SECONDS) -> Optional[IngestJob]:
+    """
+    Atomically claims the oldest queued job (or a 'running' one whose lease
+    has not been renewed for `lease_seconds`; jobs only waiting on links
+    hold no lease) using SELECT ... FOR UPDATE
+    SKIP LOCKED, so concurrent workers never pick the same job. The claim
+    takes a fresh lease token; the previous holder's writes are refused.
+    A 'running' job with no heartbeat at all was started before leases
+    existed and is claimed as well.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    job = db.query(IngestJob)\
+        .filter(or_(
+            IngestJob.status == "queued",
+            and_(IngestJob.status == "running", IngestJob.lease_token.isnot(None),
+                 IngestJob.heartbeat_at < cutoff),
+            and_(IngestJob.status == "running", IngestJob.heartbeat_at.is_(None))
+        ))\
+        .order_by(IngestJob.created_at.asc())\
+        .with_for_update(skip_locked=True)\
+        .first()
+    if not job:
+        db.rollback()
+        return None
+    job.status = "running"
+    job.started_at = job.heartbeat_at = datetime.utcnow()
+    job.completed_at = None
+    job.lease_token = uuid.uuid4()
+    db.commit()
+    return job
+
+def renew_lease(db: Session, job_id: UUID, lease_token: UUID) -> bool:
+    """Extends a running job's lease. False when the job was reclaimed (or finished) meanwhile."""
+    renewed = db.execute(
+        update(IngestJob)
+        .where(IngestJob.job_id == job_id, IngestJob.lease_token == lease_token, IngestJob.status == "running")
+        .values(heartbeat_at=datetime.utcnow())
+    ).rowcount
+    db.commit()
+    return bool(renewed)
+
+def hold_lease(db: Session, job_id: UUID, lease_token: UUID) -> None:
+    """
+    Fences the writes of the current transaction: locks the job row if this
+    worker's lease token still holds it, else raises LeaseLost. The lock
+    keeps another worker from reclaiming the job until the writes commit.
+    """
+    held = db.query(IngestJob.job_id)\
+        .filter(IngestJob.job_id == job_id, IngestJob.lease_token == lease_token)\
+        .with_for_update()\
+        .first()
+    if held is None:
+        db.rollback()
+        raise LeaseLost(f"Lease on ingest job {job_id} was lost")
+
+def fail_job(db: Session, job_id: UUID, error: str) -> Optional[IngestJob]:
+    """
+    Marks a job that never finished uploading as failed, with its queued
+    files. Jobs that linked one of those files while it was in flight have
+    their links failed (and are finished) too.
+    """
+    job = db.get(IngestJob, job_id)
+    if job:
+        queued = IngestFile.job_id == job_id, IngestFile.status == "queued"
+        failed = [file_id for (file_id,) in db.query(IngestFile.file_id).filter(*queued)]
+        db.query(IngestFile)\
+            .filter(*queued)\
+            .update({IngestFile.status: "failed", IngestFile.error: error}, synchronize_session=False)
+        job.status = "failed"
+        job.completed_at = datetime.utcnow()
+        db.commit()
+        for file_id in failed:
+            resolve_pending_links(db, db.get(IngestFile, file_id))
+    return job
+
+def expire_pending_jobs(db: Session, timeout_seconds: int = INGEST_UPLOAD_TIMEOUT_SECONDS) -> int:
+    """Fails jobs left 'pending' by an upload that died without cleaning up (e.g. the API process was killed)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    stale = [job_id for (job_id,) in db.query(IngestJob.job_id)
+             .filter(IngestJob.status == "pending", IngestJob.created_at < cutoff)]
+    for job_id in stale:
+        fail_job(db, job_id, "Upload did not complete")
+    return len(stale)
+
+def finish_job(db: Session, job: IngestJob, commit: bool = True) -> IngestJob:
+    """
+    Ends a job's run. A file re-queued during the run (a later upload asked
+    for a retry) sends the job back to the queue. A job with links still
+    pending stays 'running', without a lease, until resolve_pending_links
+    finishes it. Otherwise it completes, or fails if a file or link failed.
+    """
+    statuses = {f.status for f in db.query(IngestFile.status).filter(IngestFile.job_id == job.job_id)}
+    statuses |= {link.status for link in db.query(IngestJobFile.status).filter(IngestJobFile.job_id == job.job_id)}
+    job.lease_token = None
+    if "queued" in statuses:
+        job.status = "queued"
+    elif "pending" in statuses:
+        job.status = "running"
+    else:
+        job.status = "failed" if "failed" in statuses else "completed"
+        job.completed_at = datetime.utcnow()
+    if commit:
+        db.commit()
+    return job
+
+def get_job_progress(db: Session, job_id: UUID) -> dict:
+    files = db.query(IngestFile.status).filter(IngestFile.job_id == job_id).all()
+    links = db.query(IngestJobFile.status).filter(IngestJobFile.job_id == job_id).all()
+    total = len(files) + len(links)
+    counts = {}
+    for (status,) in files:
+        counts[status] = counts.get(status, 0) + 1
+    for (status,) in links:
+        if status != "linked":
+            counts[status] = counts.get(status, 0) + 1
+    linked = sum(1 for (status,) in links if status == "linked")
+    done = sum(counts.get(s, 0) for s in ("completed", "skipped", "failed")) + linked
+    return {
+        "files_total": total,
+        "files_done": done,
+        "files_failed": counts.get("failed", 0),
+        "files_deduplicated": len(links),
+        "percent": round(100.0 * done / total, 1) if total else 0.0,
+    }
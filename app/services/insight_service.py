@@ -2,10 +2,12 @@ from __future__ import annotations
 from dataclasses import dataclass
 from sqlalchemy.orm import Session
 from uuid import UUID
-from typing import List
+from typing import List, Optional
+import pandas as pd
 from app.db import models
 from app.db.schemas import InsightCreate
 from app.repositories import insight_repository
+from app.ai.explain import explanation_cache
 
 @dataclass
 class InsightCard:
@@ -16,7 +18,8 @@ class InsightCard:
     basis: list[str]
     counter_evidence: list[str]
 
-def generate_link_insight(strength_score: float, basis: list[str], gaps: list[str]) -> InsightCard:
+def generate_link_insight(strength_score: float, basis: list[str], gaps: list[str],
+                          contributors: Optional[list[tuple[str, float]]] = None) -> InsightCard:
     conf = min(100.0, max(0.0, strength_score))
     severity = "high" if conf >= 80 else "medium" if conf >= 60 else "low"
     summary = "Strong relationship pattern detected" if conf >= 70 else "Relationship pattern observed"
@@ -24,6 +27,9 @@ def generate_link_insight(strength_score: float, basis: list[str], gaps: list[st
         "Signal suggests repeated co-occurrence across sources. "
         "Confidence is derived from calibrated link-strength scoring."
     )
+    if contributors:
+        top = ", ".join(f"{name} ({value:.2f})" for name, value in contributors)
+        explanation += f" Main contributors: {top}."
     return InsightCard(
         severity=severity,
         summary=summary,
@@ -33,6 +39,16 @@ def generate_link_insight(strength_score: float, basis: list[str], gaps: list[st
         counter_evidence=gaps,
     )
 
+def generate_link_insights(X: pd.DataFrame, strength_scores: list[float], feature_weights: dict[str, float],
+                           model_version: str, k: int = 3) -> List[InsightCard]:
+    """`generate_link_insight` for every row of a link-feature matrix, explained in one batch."""
+    explanations = explanation_cache.explain(X, feature_weights, model_version, k)
+    cards = []
+    for i, score in enumerate(strength_scores):
+        top = explanations.row(i)["top_contributors"]
+        cards.append(generate_link_insight(score, [name for name, value in top if value], [], top))
+    return cards
+
 def list_case_insights(db: Session, case_id: UUID, limit: int = 200) -> List[models.Insight]:
     return insight_repository.get_insights_by_case(db, case_id, limit)
 
@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session
 from uuid import UUID
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from app.db import models
 from app.db.schemas import RelationshipCreate
 from app.services.audit_service import log_action
 from app.repositories import relationship_repository
+from app.repositories.pagination import decode_cursor, parse_fields
+from app.db.session import iter_with_session
+from app.core.config import STREAM_BATCH_ROWS
 
 def create_relationship(db: Session, case_id: UUID, relationship: RelationshipCreate, user_id: UUID) -> models.Relationship:
     db_rel = relationship_repository.create_relationship(
@@ -23,5 +26,17 @@ def create_relationship(db: Session, case_id: UUID, relationship: RelationshipCr
 def get_relationships(db: Session, case_id: UUID) -> List[models.Relationship]:
     return relationship_repository.get_relationships_by_case(db, case_id)
 
+def get_relationship_page(db: Session, case_id: UUID, cursor: Optional[str], limit: int,
+                          fields: Optional[str] = None) -> tuple[List[dict], Optional[str]]:
+    fields = parse_fields(fields, list(relationship_repository.RELATIONSHIP_FIELDS))
+    return relationship_repository.get_relationship_page(db, case_id, fields, cursor, limit)
+
+def stream_relationships(case_id: UUID, cursor: Optional[str], fields: Optional[str] = None) -> Iterator[List[dict]]:
+    """Batches of every relationship after `cursor`, read on their own session for a streamed response."""
+    fields = parse_fields(fields, list(relationship_repository.RELATIONSHIP_FIELDS))
+    if cursor:
+        decode_cursor(cursor)
+    return iter_with_session(relationship_repository.iter_relationships, case_id, fields, cursor, STREAM_BATCH_ROWS)
+
 def get_relationship(db: Session, rel_id: UUID) -> Optional[models.Relationship]:
     return relationship_repository.get_relationship_by_id(db, rel_id)
@@ -4,10 +4,37 @@
 -- 2) Confidence-first: every relationship/insight has confidence_score.
 -- 3) Integrity: ingestion validation_score and file sha256_hash.
 -- 4) Uses CHAR(36) UUID strings for portability (application generates UUIDs).
+-- 5) Safe to re-apply: the ALTERs after a table bring a database created by an earlier version up to date.
 
 SET NAMES utf8mb4;
 SET FOREIGN_KEY_CHECKS = 0;
 
+-- Upgrade helpers (MySQL 8.0 has no ADD COLUMN / ADD INDEX IF NOT EXISTS); dropped at the end of the file
+DROP PROCEDURE IF EXISTS add_column_if_missing;
+DROP PROCEDURE IF EXISTS add_index_if_missing;
+DELIMITER //
+CREATE PROCEDURE add_column_if_missing(IN tbl VARCHAR(64), IN col VARCHAR(64), IN definition TEXT)
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                 WHERE table_schema = DATABASE() AND table_name = tbl AND column_name = col) THEN
+    SET @ddl = CONCAT('ALTER TABLE `', tbl, '` ADD COLUMN `', col, '` ', definition);
+    PREPARE stmt FROM @ddl;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+  END IF;
+END //
+CREATE PROCEDURE add_index_if_missing(IN tbl VARCHAR(64), IN idx VARCHAR(64), IN definition TEXT)
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.statistics
+                 WHERE table_schema = DATABASE() AND table_name = tbl AND index_name = idx) THEN
+    SET @ddl = CONCAT('ALTER TABLE `', tbl, '` ADD ', definition);
+    PREPARE stmt FROM @ddl;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+  END IF;
+END //
+DELIMITER ;
+
 CREATE TABLE IF NOT EXISTS users (
   user_id           CHAR(36) PRIMARY KEY,
   email             VARCHAR(320) NOT NULL UNIQUE,
@@ -38,9 +65,13 @@ CREATE TABLE IF NOT EXISTS cases (
   integrity_score   DECIMAL(5,2) NOT NULL DEFAULT 0.00,
   created_by        CHAR(36),
   created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  KEY idx_cases_page (created_at, case_id),
   CONSTRAINT fk_cases_created_by FOREIGN KEY (created_by) REFERENCES users(user_id) ON DELETE SET NULL
 ) ENGINE=InnoDB;
 
+-- Upgrade: keyset pages
+CALL add_index_if_missing('cases', 'idx_cases_page', 'KEY idx_cases_page (created_at, case_id)');
+
 CREATE TABLE IF NOT EXISTS case_assignments (
   case_id           CHAR(36) NOT NULL,
   user_id           CHAR(36) NOT NULL,
@@ -55,10 +86,13 @@ CREATE TABLE IF NOT EXISTS ingest_jobs (
   case_id           CHAR(36) NOT NULL,
   source_type       VARCHAR(40) NOT NULL,
   validation_score  DECIMAL(5,2) NOT NULL DEFAULT 0.00,
-  status            ENUM('queued','running','completed','failed') NOT NULL,
+  status            ENUM('pending','queued','running','completed','failed') NOT NULL,
   started_at        TIMESTAMP NULL,
   completed_at      TIMESTAMP NULL,
   created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  lease_token       CHAR(36) NULL,
+  heartbeat_at      TIMESTAMP NULL,
+  KEY idx_ingest_jobs_status (status, created_at),
   CONSTRAINT fk_ingest_jobs_case FOREIGN KEY (case_id) REFERENCES cases(case_id) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
@@ -69,12 +103,33 @@ CREATE TABLE IF NOT EXISTS ingest_files (
   file_type         VARCHAR(20) NOT NULL,
   sha256_hash       CHAR(64) NOT NULL,
   row_count         BIGINT,
+  status            ENUM('queued','running','completed','skipped','failed') NOT NULL DEFAULT 'queued',
+  error             TEXT NULL,
+  entities_found    INT NOT NULL DEFAULT 0,
+  insights_found    INT NOT NULL DEFAULT 0,
   created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   UNIQUE KEY uq_ingest_files_hash (sha256_hash),
   KEY idx_ingest_files_job (job_id),
   CONSTRAINT fk_ingest_files_job FOREIGN KEY (job_id) REFERENCES ingest_jobs(job_id) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
+-- Upgrade: ingest worker pool and job leases
+ALTER TABLE ingest_jobs MODIFY status ENUM('pending','queued','running','completed','failed') NOT NULL;
+CALL add_column_if_missing('ingest_jobs', 'lease_token', 'CHAR(36) NULL');
+CALL add_column_if_missing('ingest_jobs', 'heartbeat_at', 'TIMESTAMP NULL'); -- NULL on a running job counts as stale
+CALL add_index_if_missing('ingest_jobs', 'idx_ingest_jobs_status', 'KEY idx_ingest_jobs_status (status, created_at)');
+CALL add_column_if_missing('ingest_files', 'status', "ENUM('queued','running','completed','skipped','failed') NULL");
+CALL add_column_if_missing('ingest_files', 'error', 'TEXT NULL');
+CALL add_column_if_missing('ingest_files', 'entities_found', 'INT NOT NULL DEFAULT 0');
+CALL add_column_if_missing('ingest_files', 'insights_found', 'INT NOT NULL DEFAULT 0');
+-- Files written before per-file status take their job's outcome. Those of jobs still open were being
+-- analyzed inside a request that is gone and were never spooled, so they fail (and the worker fails the job).
+UPDATE ingest_files f JOIN ingest_jobs j ON j.job_id = f.job_id
+   SET f.error = CASE WHEN j.status IN ('completed','failed') THEN NULL ELSE 'interrupted before the ingest worker upgrade' END,
+       f.status = CASE j.status WHEN 'completed' THEN 'completed' ELSE 'failed' END
+ WHERE f.status IS NULL;
+ALTER TABLE ingest_files MODIFY status ENUM('queued','running','completed','skipped','failed') NOT NULL DEFAULT 'queued';
+
 CREATE TABLE IF NOT EXISTS entities (
   entity_id         CHAR(36) PRIMARY KEY,
   entity_type       ENUM('person','phone','org','ip','device','vehicle','unknown') NOT NULL,
@@ -83,19 +138,55 @@ CREATE TABLE IF NOT EXISTS entities (
   confidence_score  DECIMAL(5,2) NOT NULL DEFAULT 0.00,
   first_seen        TIMESTAMP NULL,
   last_seen         TIMESTAMP NULL,
-  created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+  resolution_key    VARCHAR(320) NULL,
+  created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE KEY uq_entities_resolution (resolution_key),
+  KEY idx_entities_created (created_at, entity_id)
 ) ENGINE=InnoDB;
 
+-- Upgrade: entity resolution. Existing entities get their keys (and duplicates merged) from
+-- scripts/merge_duplicate_entities.py.
+CALL add_column_if_missing('entities', 'resolution_key', 'VARCHAR(320) NULL');
+CALL add_index_if_missing('entities', 'uq_entities_resolution', 'UNIQUE KEY uq_entities_resolution (resolution_key)');
+-- Upgrade: the entity search index reads new entities in creation order
+CALL add_index_if_missing('entities', 'idx_entities_created', 'KEY idx_entities_created (created_at, entity_id)');
+
 CREATE TABLE IF NOT EXISTS case_entities (
   case_id           CHAR(36) NOT NULL,
   entity_id         CHAR(36) NOT NULL,
   role_in_case      VARCHAR(60),
+  graph_version     BIGINT NOT NULL DEFAULT 0,
+  created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY (case_id, entity_id),
   KEY idx_case_entities_entity (entity_id),
+  KEY idx_case_entities_graph (case_id, graph_version),
+  KEY idx_case_entities_page (case_id, created_at, entity_id),
   CONSTRAINT fk_case_entities_case FOREIGN KEY (case_id) REFERENCES cases(case_id) ON DELETE CASCADE,
   CONSTRAINT fk_case_entities_entity FOREIGN KEY (entity_id) REFERENCES entities(entity_id) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
+-- Upgrade: versioned case graphs. Existing rows stay at version 0, which the first snapshot of a case reads.
+CALL add_column_if_missing('case_entities', 'graph_version', 'BIGINT NOT NULL DEFAULT 0');
+CALL add_index_if_missing('case_entities', 'idx_case_entities_graph', 'KEY idx_case_entities_graph (case_id, graph_version)');
+-- Upgrade: keyset pages of case entities. When an existing row was linked is unknown; its entity's creation stands in.
+CALL add_column_if_missing('case_entities', 'created_at', 'TIMESTAMP NULL');
+UPDATE case_entities ce JOIN entities e ON e.entity_id = ce.entity_id
+   SET ce.created_at = e.created_at
+ WHERE ce.created_at IS NULL;
+ALTER TABLE case_entities MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+CALL add_index_if_missing('case_entities', 'idx_case_entities_page', 'KEY idx_case_entities_page (case_id, created_at, entity_id)');
+
+CREATE TABLE IF NOT EXISTS case_graph_state (
+  case_id           CHAR(36) PRIMARY KEY,
+  version           BIGINT NOT NULL DEFAULT 0,
+  rewrite_version   BIGINT NOT NULL DEFAULT 0,
+  updated_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  CONSTRAINT fk_graph_state_case FOREIGN KEY (case_id) REFERENCES cases(case_id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Upgrade: entity merges rewrite graph rows in place
+CALL add_column_if_missing('case_graph_state', 'rewrite_version', 'BIGINT NOT NULL DEFAULT 0');
+
 CREATE TABLE IF NOT EXISTS relationships (
   rel_id            CHAR(36) PRIMARY KEY,
   case_id           CHAR(36) NOT NULL,
@@ -106,8 +197,13 @@ CREATE TABLE IF NOT EXISTS relationships (
   confidence_score  DECIMAL(5,2) NOT NULL DEFAULT 0.00,
   first_seen        TIMESTAMP NULL,
   last_seen         TIMESTAMP NULL,
+  source_file_id    CHAR(36) NULL,
+  graph_version     BIGINT NOT NULL DEFAULT 0,
   created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   KEY idx_rel_case (case_id),
+  KEY idx_rel_graph (case_id, graph_version),
+  KEY idx_rel_page (case_id, created_at, rel_id),
+  KEY idx_rel_file (source_file_id),
   KEY idx_rel_src (source_entity_id),
   KEY idx_rel_tgt (target_entity_id),
   CONSTRAINT fk_rel_case FOREIGN KEY (case_id) REFERENCES cases(case_id) ON DELETE CASCADE,
@@ -115,6 +211,15 @@ CREATE TABLE IF NOT EXISTS relationships (
   CONSTRAINT fk_rel_tgt FOREIGN KEY (target_entity_id) REFERENCES entities(entity_id) ON DELETE RESTRICT
 ) ENGINE=InnoDB;
 
+-- Upgrade: content-hash dedup (findings remember the file they came from)
+CALL add_column_if_missing('relationships', 'source_file_id', 'CHAR(36) NULL');
+CALL add_index_if_missing('relationships', 'idx_rel_file', 'KEY idx_rel_file (source_file_id)');
+-- Upgrade: versioned case graphs
+CALL add_column_if_missing('relationships', 'graph_version', 'BIGINT NOT NULL DEFAULT 0');
+CALL add_index_if_missing('relationships', 'idx_rel_graph', 'KEY idx_rel_graph (case_id, graph_version)');
+-- Upgrade: keyset pages
+CALL add_index_if_missing('relationships', 'idx_rel_page', 'KEY idx_rel_page (case_id, created_at, rel_id)');
+
 CREATE TABLE IF NOT EXISTS insights (
   insight_id        CHAR(36) PRIMARY KEY,
   case_id           CHAR(36) NOT NULL,
@@ -122,14 +227,44 @@ CREATE TABLE IF NOT EXISTS insights (
   summary           TEXT NOT NULL,
   explanation       TEXT,
   confidence_score  DECIMAL(5,2) NOT NULL DEFAULT 0.00,
+  evidence          JSON NULL,
+  evidence_count    INT NOT NULL DEFAULT 0,
   created_by        CHAR(36),
+  source_file_id    CHAR(36) NULL,
   created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   KEY idx_insights_case (case_id),
   KEY idx_insights_severity (severity),
+  KEY idx_insights_file (source_file_id),
   CONSTRAINT fk_insights_case FOREIGN KEY (case_id) REFERENCES cases(case_id) ON DELETE CASCADE,
   CONSTRAINT fk_insights_created_by FOREIGN KEY (created_by) REFERENCES users(user_id) ON DELETE SET NULL
 ) ENGINE=InnoDB;
 
+-- Upgrade: content-hash dedup
+CALL add_column_if_missing('insights', 'source_file_id', 'CHAR(36) NULL');
+CALL add_index_if_missing('insights', 'idx_insights_file', 'KEY idx_insights_file (source_file_id)');
+-- Upgrade: persisted insight evidence (older insights keep none)
+CALL add_column_if_missing('insights', 'evidence', 'JSON NULL');
+CALL add_column_if_missing('insights', 'evidence_count', 'INT NOT NULL DEFAULT 0');
+
+CREATE TABLE IF NOT EXISTS ingest_file_entities (
+  file_id           CHAR(36) NOT NULL,
+  entity_id         CHAR(36) NOT NULL,
+  PRIMARY KEY (file_id, entity_id),
+  CONSTRAINT fk_ife_file FOREIGN KEY (file_id) REFERENCES ingest_files(file_id) ON DELETE CASCADE,
+  CONSTRAINT fk_ife_entity FOREIGN KEY (entity_id) REFERENCES entities(entity_id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS ingest_job_files (
+  job_id            CHAR(36) NOT NULL,
+  file_id           CHAR(36) NOT NULL,
+  status            VARCHAR(20) NOT NULL DEFAULT 'linked',
+  created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (job_id, file_id),
+  KEY idx_ingest_job_files_file (file_id, status),
+  CONSTRAINT fk_ijf_job FOREIGN KEY (job_id) REFERENCES ingest_jobs(job_id) ON DELETE CASCADE,
+  CONSTRAINT fk_ijf_file FOREIGN KEY (file_id) REFERENCES ingest_files(file_id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
 CREATE TABLE IF NOT EXISTS evidence_items (
   evidence_id       CHAR(36) PRIMARY KEY,
   case_id           CHAR(36) NOT NULL,
@@ -143,6 +278,7 @@ CREATE TABLE IF NOT EXISTS evidence_items (
   created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   UNIQUE KEY uq_evidence_hash (evidence_hash),
   KEY idx_evidence_case (case_id),
+  KEY idx_evidence_page (case_id, created_at, evidence_id),
   CONSTRAINT fk_evidence_case FOREIGN KEY (case_id) REFERENCES cases(case_id) ON DELETE CASCADE,
   CONSTRAINT fk_evidence_insight FOREIGN KEY (insight_id) REFERENCES insights(insight_id) ON DELETE SET NULL,
   CONSTRAINT fk_evidence_entity FOREIGN KEY (entity_id) REFERENCES entities(entity_id) ON DELETE SET NULL,
@@ -150,6 +286,9 @@ CREATE TABLE IF NOT EXISTS evidence_items (
   CONSTRAINT fk_evidence_file FOREIGN KEY (source_file_id) REFERENCES ingest_files(file_id) ON DELETE SET NULL
 ) ENGINE=InnoDB;
 
+-- Upgrade: keyset pages
+CALL add_index_if_missing('evidence_items', 'idx_evidence_page', 'KEY idx_evidence_page (case_id, created_at, evidence_id)');
+
 CREATE TABLE IF NOT EXISTS exports (
   export_id         CHAR(36) PRIMARY KEY,
   case_id           CHAR(36) NOT NULL,
@@ -179,4 +318,7 @@ CREATE TABLE IF NOT EXISTS audit_logs (
   CONSTRAINT fk_audit_case FOREIGN KEY (case_id) REFERENCES cases(case_id) ON DELETE SET NULL
 ) ENGINE=InnoDB;
 
+DROP PROCEDURE add_column_if_missing;
+DROP PROCEDURE add_index_if_missing;
+
 SET FOREIGN_KEY_CHECKS = 1;
@@ -3,8 +3,10 @@
 -- 1) Court-safety: immutable evidence/export hashes; audit logs for every critical action.
 -- 2) Confidence-first: every relationship/insight has confidence_score.
 -- 3) Integrity: ingestion validation_score and file sha256_hash.
+-- 4) Safe to re-apply: the ALTERs after a table bring a database created by an earlier version up to date.
 
 CREATE EXTENSION IF NOT EXISTS pgcrypto;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- USERS & ROLES
 CREATE TABLE IF NOT EXISTS users (
@@ -38,6 +40,8 @@ CREATE TABLE IF NOT EXISTS cases (
   created_at        TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+CREATE INDEX IF NOT EXISTS idx_cases_page ON cases(created_at, case_id);
+
 CREATE TABLE IF NOT EXISTS case_assignments (
   case_id           UUID NOT NULL REFERENCES cases(case_id) ON DELETE CASCADE,
   user_id           UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
@@ -51,10 +55,12 @@ CREATE TABLE IF NOT EXISTS ingest_jobs (
   case_id           UUID NOT NULL REFERENCES cases(case_id) ON DELETE CASCADE,
   source_type       TEXT NOT NULL, -- e.g., 'cdr','tower_dump','ip_logs','finance'
   validation_score  NUMERIC(5,2) NOT NULL DEFAULT 0.00 CHECK (validation_score >= 0 AND validation_score <= 100),
-  status            TEXT NOT NULL CHECK (status IN ('queued','running','completed','failed')),
+  status            TEXT NOT NULL CHECK (status IN ('pending','queued','running','completed','failed')),
   started_at        TIMESTAMPTZ,
   completed_at      TIMESTAMPTZ,
-  created_at        TIMESTAMPTZ NOT NULL DEFAULT NOW()
+  created_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  lease_token       UUID, -- worker holding the job; its writes check this token
+  heartbeat_at      TIMESTAMPTZ -- renewed while running; a stale heartbeat lets another worker reclaim the job
 );
 
 CREATE TABLE IF NOT EXISTS ingest_files (
@@ -64,10 +70,37 @@ CREATE TABLE IF NOT EXISTS ingest_files (
   file_type         TEXT NOT NULL, -- csv/xlsx/pdf/json
   sha256_hash       TEXT NOT NULL,
   row_count         BIGINT,
+  status            TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued','running','completed','skipped','failed')),
+  error             TEXT,
+  entities_found    INTEGER NOT NULL DEFAULT 0,
+  insights_found    INTEGER NOT NULL DEFAULT 0,
   created_at        TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Upgrade: ingest worker pool and job leases
+ALTER TABLE ingest_jobs DROP CONSTRAINT IF EXISTS ingest_jobs_status_check;
+ALTER TABLE ingest_jobs ADD CONSTRAINT ingest_jobs_status_check
+  CHECK (status IN ('pending','queued','running','completed','failed'));
+ALTER TABLE ingest_jobs ADD COLUMN IF NOT EXISTS lease_token UUID;
+ALTER TABLE ingest_jobs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ; -- NULL on a running job counts as stale
+ALTER TABLE ingest_files ADD COLUMN IF NOT EXISTS status TEXT;
+ALTER TABLE ingest_files ADD COLUMN IF NOT EXISTS error TEXT;
+ALTER TABLE ingest_files ADD COLUMN IF NOT EXISTS entities_found INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE ingest_files ADD COLUMN IF NOT EXISTS insights_found INTEGER NOT NULL DEFAULT 0;
+-- Files written before per-file status take their job's outcome. Those of jobs still open were being
+-- analyzed inside a request that is gone and were never spooled, so they fail (and the worker fails the job).
+UPDATE ingest_files f
+   SET status = CASE j.status WHEN 'completed' THEN 'completed' ELSE 'failed' END,
+       error = CASE WHEN j.status IN ('completed','failed') THEN NULL ELSE 'interrupted before the ingest worker upgrade' END
+  FROM ingest_jobs j
+ WHERE j.job_id = f.job_id AND f.status IS NULL;
+ALTER TABLE ingest_files ALTER COLUMN status SET DEFAULT 'queued', ALTER COLUMN status SET NOT NULL;
+ALTER TABLE ingest_files DROP CONSTRAINT IF EXISTS ingest_files_status_check;
+ALTER TABLE ingest_files ADD CONSTRAINT ingest_files_status_check
+  CHECK (status IN ('queued','running','completed','skipped','failed'));
+
 CREATE INDEX IF NOT EXISTS idx_ingest_jobs_case ON ingest_jobs(case_id);
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs(status, created_at);
 CREATE INDEX IF NOT EXISTS idx_ingest_files_job ON ingest_files(job_id);
 CREATE UNIQUE INDEX IF NOT EXISTS uq_ingest_files_hash ON ingest_files(sha256_hash);
 
@@ -80,19 +113,51 @@ CREATE TABLE IF NOT EXISTS entities (
   confidence_score  NUMERIC(5,2) NOT NULL DEFAULT 0.00 CHECK (confidence_score >= 0 AND confidence_score <= 100),
   first_seen        TIMESTAMPTZ,
   last_seen         TIMESTAMPTZ,
+  resolution_key    TEXT UNIQUE, -- '<kind>:<normalized label>' for phones, emails and IPs; one entity per key
   created_at        TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Upgrade: entity resolution. Existing entities get their keys (and duplicates merged) from
+-- scripts/merge_duplicate_entities.py.
+ALTER TABLE entities ADD COLUMN IF NOT EXISTS resolution_key TEXT UNIQUE;
+
+-- /entities/search: prefix scans, and trigram matching with nearest-first (KNN) order
+CREATE INDEX IF NOT EXISTS idx_entities_label_prefix ON entities (lower(label) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_entities_label_trgm ON entities USING gist (lower(label) gist_trgm_ops);
+
 CREATE TABLE IF NOT EXISTS case_entities (
   case_id           UUID NOT NULL REFERENCES cases(case_id) ON DELETE CASCADE,
   entity_id         UUID NOT NULL REFERENCES entities(entity_id) ON DELETE CASCADE,
   role_in_case      TEXT, -- subject/suspect/witness/unknown
+  graph_version     BIGINT NOT NULL DEFAULT 0, -- case_graph_state.version of the write that added the row
+  created_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(), -- when the entity was linked into the case
   PRIMARY KEY (case_id, entity_id)
 );
 
+-- Upgrade: versioned case graphs. Existing rows stay at version 0, which the first snapshot of a case reads.
+ALTER TABLE case_entities ADD COLUMN IF NOT EXISTS graph_version BIGINT NOT NULL DEFAULT 0;
+-- Upgrade: keyset pages of case entities. When an existing row was linked is unknown; its entity's creation stands in.
+ALTER TABLE case_entities ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ;
+UPDATE case_entities ce SET created_at = e.created_at FROM entities e
+ WHERE e.entity_id = ce.entity_id AND ce.created_at IS NULL;
+ALTER TABLE case_entities ALTER COLUMN created_at SET DEFAULT NOW(), ALTER COLUMN created_at SET NOT NULL;
+
 CREATE INDEX IF NOT EXISTS idx_case_entities_case ON case_entities(case_id);
+CREATE INDEX IF NOT EXISTS idx_case_entities_graph ON case_entities(case_id, graph_version);
+CREATE INDEX IF NOT EXISTS idx_case_entities_page ON case_entities(case_id, created_at, entity_id);
 CREATE INDEX IF NOT EXISTS idx_case_entities_entity ON case_entities(entity_id);
 
+-- CASE GRAPH VERSIONS (write counter behind the materialized /cases/{id}/graph read model)
+CREATE TABLE IF NOT EXISTS case_graph_state (
+  case_id           UUID PRIMARY KEY REFERENCES cases(case_id) ON DELETE CASCADE,
+  version           BIGINT NOT NULL DEFAULT 0,
+  rewrite_version   BIGINT NOT NULL DEFAULT 0, -- last version that changed rows in place (entity merges)
+  updated_at        TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Upgrade: entity merges rewrite graph rows in place
+ALTER TABLE case_graph_state ADD COLUMN IF NOT EXISTS rewrite_version BIGINT NOT NULL DEFAULT 0;
+
 -- RELATIONSHIPS (within a case context)
 CREATE TABLE IF NOT EXISTS relationships (
   rel_id            UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -104,10 +169,20 @@ CREATE TABLE IF NOT EXISTS relationships (
   confidence_score  NUMERIC(5,2) NOT NULL DEFAULT 0.00 CHECK (confidence_score >= 0 AND confidence_score <= 100),
   first_seen        TIMESTAMPTZ,
   last_seen         TIMESTAMPTZ,
+  source_file_id    UUID REFERENCES ingest_files(file_id) ON DELETE SET NULL,
+  graph_version     BIGINT NOT NULL DEFAULT 0, -- case_graph_state.version of the write that added the row
   created_at        TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Upgrade: content-hash dedup (findings remember the file they came from)
+ALTER TABLE relationships ADD COLUMN IF NOT EXISTS source_file_id UUID REFERENCES ingest_files(file_id) ON DELETE SET NULL;
+-- Upgrade: versioned case graphs
+ALTER TABLE relationships ADD COLUMN IF NOT EXISTS graph_version BIGINT NOT NULL DEFAULT 0;
+
 CREATE INDEX IF NOT EXISTS idx_relationships_case ON relationships(case_id);
+CREATE INDEX IF NOT EXISTS idx_relationships_graph ON relationships(case_id, graph_version);
+CREATE INDEX IF NOT EXISTS idx_relationships_page ON relationships(case_id, created_at, rel_id);
+CREATE INDEX IF NOT EXISTS idx_relationships_file ON relationships(source_file_id);
 CREATE INDEX IF NOT EXISTS idx_relationships_src ON relationships(source_entity_id);
 CREATE INDEX IF NOT EXISTS idx_relationships_tgt ON relationships(target_entity_id);
 
@@ -119,12 +194,41 @@ CREATE TABLE IF NOT EXISTS insights (
   summary           TEXT NOT NULL,
   explanation       TEXT,
   confidence_score  NUMERIC(5,2) NOT NULL DEFAULT 0.00 CHECK (confidence_score >= 0 AND confidence_score <= 100),
+  evidence          JSONB,
+  evidence_count    INTEGER NOT NULL DEFAULT 0,
   created_by        UUID REFERENCES users(user_id) ON DELETE SET NULL,
+  source_file_id    UUID REFERENCES ingest_files(file_id) ON DELETE SET NULL,
   created_at        TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Upgrade: content-hash dedup
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS source_file_id UUID REFERENCES ingest_files(file_id) ON DELETE SET NULL;
+-- Upgrade: persisted insight evidence (older insights keep none)
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS evidence JSONB;
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS evidence_count INTEGER NOT NULL DEFAULT 0;
+
 CREATE INDEX IF NOT EXISTS idx_insights_case ON insights(case_id);
 CREATE INDEX IF NOT EXISTS idx_insights_severity ON insights(severity);
+CREATE INDEX IF NOT EXISTS idx_insights_file ON insights(source_file_id);
+
+-- INGEST PROVENANCE (content-addressed dedup: reuse findings of a known file)
+CREATE TABLE IF NOT EXISTS ingest_file_entities (
+  file_id           UUID NOT NULL REFERENCES ingest_files(file_id) ON DELETE CASCADE,
+  entity_id         UUID NOT NULL REFERENCES entities(entity_id) ON DELETE CASCADE,
+  PRIMARY KEY (file_id, entity_id)
+);
+
+CREATE TABLE IF NOT EXISTS ingest_job_files (
+  job_id            UUID NOT NULL REFERENCES ingest_jobs(job_id) ON DELETE CASCADE,
+  file_id           UUID NOT NULL REFERENCES ingest_files(file_id) ON DELETE CASCADE,
+  status            TEXT NOT NULL DEFAULT 'linked' CHECK (status IN ('linked','pending','failed')),
+  created_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (job_id, file_id)
+);
+-- Upgrade: links to the file of a failed upload fail with it
+ALTER TABLE ingest_job_files DROP CONSTRAINT IF EXISTS ingest_job_files_status_check;
+ALTER TABLE ingest_job_files ADD CONSTRAINT ingest_job_files_status_check CHECK (status IN ('linked','pending','failed'));
+CREATE INDEX IF NOT EXISTS idx_ingest_job_files_file ON ingest_job_files(file_id, status);
 
 -- EVIDENCE ITEMS (hash-anchored, court-safe)
 CREATE TABLE IF NOT EXISTS evidence_items (
@@ -142,6 +246,7 @@ CREATE TABLE IF NOT EXISTS evidence_items (
 
 CREATE UNIQUE INDEX IF NOT EXISTS uq_evidence_hash ON evidence_items(evidence_hash);
 CREATE INDEX IF NOT EXISTS idx_evidence_case ON evidence_items(case_id);
+CREATE INDEX IF NOT EXISTS idx_evidence_page ON evidence_items(case_id, created_at, evidence_id);
 
 -- EXPORTS (evidence packages)
 CREATE TABLE IF NOT EXISTS exports (
@@ -0,0 +1,66 @@
+"""Benchmark: insight rule evaluation as the rule set grows.
+
+Times the old per-keyword substring checks against the compiled
+`InsightEngine` (one keyword-automaton pass) on a synthetic document, for
+rule sets from the defaults up to several hundred triggers, and checks both
+fire the same insights.
+Usage: python scripts/bench_insight_rules.py [doc_chars]
+"""
+import os
+import random
+import string
+import sys
+import time
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.ai.insights import DEFAULT_INSIGHT_RULES, InsightEngine, InsightRule, evaluate_insights, rule_keywords
+
+
+def make_rules(n: int, rng: random.Random) -> list:
+    rules = list(DEFAULT_INSIGHT_RULES)
+    while sum(len(r.keywords()) for r in rules) < n:
+        group = tuple("".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12))) for _ in range(5))
+        rules.append(InsightRule("low", "Synthetic rule", "", 50.0, (group,)))
+    return rules
+
+
+def make_text(chars: int, rng: random.Random) -> str:
+    vocab = ["the", "subject", "reported", "transfer", "$5,000", "positive", "blunt force", "homicide",
+             "vehicle", "witness", "statement", "evidence", "contusion", "scene"]
+    words = []
+    size = 0
+    while size < chars:
+        w = rng.choice(vocab)
+        words.append(w)
+        size += len(w) + 1
+    return " ".join(words)
+
+
+def legacy(rules, text):
+    text_lower = text.lower()
+    present = {kw for kw in rule_keywords(rules) if kw in text_lower}
+    return evaluate_insights(rules, present)
+
+
+def main():
+    chars = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    rng = random.Random(7)
+    text = make_text(chars, rng)
+    print(f"document: {len(text):,} chars")
+    for n in (20, 100, 300, 600):
+        rules = make_rules(n, rng)
+        engine = InsightEngine(rules)
+        t = time.perf_counter()
+        old = legacy(rules, text)
+        t_old = time.perf_counter() - t
+        t = time.perf_counter()
+        new = engine.evaluate(text.lower())
+        t_new = time.perf_counter() - t
+        same = [{k: v for k, v in i.items() if not k.startswith("evidence")} for i in new] == old
+        print(f"{len(rule_keywords(rules)):4d} triggers: legacy {t_old:6.3f}s  automaton {t_new:6.3f}s  same={same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark: offset-indexed RelationshipReasoner vs. the legacy all-pairs loop.
+
+Checks that both produce identical output, then reports timings. The
+legacy loop located each label with `text.find`; the reasoner uses the
+scanner's first match, which is earlier or equal and differs only when the
+label also occurs inside a longer token. The legacy copy below is given the
+scanner positions so the rules are compared like for like, and the number
+of entities whose position moved is reported.
+Usage: python scripts/bench_relationships.py [entity_count ...]
+"""
+import os
+import random
+import sys
+import time
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.ai.scanner import default_scanner
+from app.ai.relations import RelationshipReasoner
+
+WORDS = "the subject was seen near a car and left quickly after dark without a word".split()
+FIRST = ["John", "Maria", "Dana", "Alan", "Peter", "Lucy", "Omar", "Ivan", "Kate", "Noah"]
+LAST = ["Carter", "Lopez", "Reyes", "Brooks", "Stone", "Grey", "Khan", "Petrov", "Moss", "Hill"]
+
+
+def make_document(mentions: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(mentions):
+        parts.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 80))))
+        r = rng.random()
+        if r < 0.5:
+            parts.append(f"{rng.choice(FIRST)} {rng.choice(LAST)}")
+        elif r < 0.8:
+            parts.append(f"{rng.randint(100, 999)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}")
+        else:
+            parts.append(f"ACC-{rng.randint(10000, 99999)}")
+        if rng.random() < 0.02:
+            parts.append(rng.choice(["transfer", "money", "$", "reported", "threatening", "text message"]))
+    return " ".join(parts)
+
+
+def legacy_reason_relationships(entities: list, text: str) -> list:
+    """The pre-index implementation: every pair, two first-mention lookups and a context slice."""
+    relationships = []
+    text_lower = text.lower()
+    for i, e1 in enumerate(entities):
+        for j, e2 in enumerate(entities):
+            if i >= j:
+                continue
+            if e1["label"] in text and e2["label"] in text:
+                p1 = e1["offsets"][0][0]
+                p2 = e2["offsets"][0][0]
+                start, end = min(p1, p2), max(p1, p2)
+                ctx = text_lower[max(0, start - 100): min(len(text), end + 100)]
+                if "transfer" in ctx or "money" in ctx or "$" in ctx:
+                    rel = ("Financial Transfer detected between entities", 90.0, 85.0)
+                elif "reported" in ctx or "threatening" in ctx or "text message" in ctx:
+                    rel = ("Suspicious communication pattern", 95.0, 90.0)
+                elif abs(p1 - p2) < 500:
+                    rel = ("Entity Co-occurrence (High Proximity)", 60.0, 65.0)
+                elif "altercation" in text_lower or "incident" in text_lower:
+                    rel = ("Co-occurrence in Incident Narrative", 75.0, 70.0)
+                else:
+                    continue
+                relationships.append({
+                    "source_label": e1["label"],
+                    "target_label": e2["label"],
+                    "basis": rel[0],
+                    "strength_score": rel[1],
+                    "confidence_score": rel[2],
+                })
+    return relationships
+
+
+def run(counts: list[int]) -> None:
+    scanner = default_scanner()
+    reasoner = RelationshipReasoner()
+    print(f"{'mentions':>9} {'entities':>9} {'moved':>6} {'links':>7} {'legacy_s':>10} {'indexed_s':>10} {'speedup':>9}")
+    for count in counts:
+        text = make_document(count)
+        entities = scanner.scan(text)
+        moved = sum(text.find(e["label"]) != e["offsets"][0][0] for e in entities)
+
+        t0 = time.perf_counter()
+        expected = legacy_reason_relationships(entities, text)
+        legacy = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        got = reasoner.reason(entities, text)
+        indexed = time.perf_counter() - t0
+
+        assert got == expected, "RelationshipReasoner output differs from legacy loop"
+        print(f"{count:>9} {len(entities):>9} {moved:>6} {len(got):>7} {legacy:>10.3f} {indexed:>10.4f} {legacy / max(indexed, 1e-9):>8.0f}x")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or [100, 250, 500])
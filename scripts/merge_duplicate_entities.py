@@ -0,0 +1,33 @@
+"""Merge duplicate phone, email and IP entities.
+
+Gives every entity written before entity resolution its resolution key and
+folds duplicates into the first entity holding the key, re-pointing their
+relationships, evidence and case/file links. Safe to re-run.
+Usage: python scripts/merge_duplicate_entities.py [--batch-size N]
+"""
+import argparse
+import os
+import sys
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.config import ENTITY_MERGE_BATCH
+from app.db.session import SessionLocal
+from app.services.entity_resolution import merge_duplicate_entities
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=ENTITY_MERGE_BATCH)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(merge_duplicate_entities(db, args.batch_size))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Train the entity anomaly model used by discovery to score entity risk.
+
+Runs discovery (without anomaly scoring) over every completed ingested file,
+or over the files given on the command line, and fits an IsolationForest on
+the resulting entity feature vectors.
+Usage: python scripts/train_anomaly_model.py [file ...] [--out PATH] [--n-jobs N]
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.ai.agent import ForensicAgent
+from app.ai.training import train_anomaly_model
+from app.core.config import ANOMALY_MODEL_PATH
+from app.features.entity_features import entity_feature_frame
+from app.services.agent_service import agent_service
+
+
+def ingested_files():
+    from app.db.models import IngestFile
+    from app.db.session import SessionLocal
+    from app.services import ingest_service
+
+    db = SessionLocal()
+    try:
+        files = db.query(IngestFile).filter(IngestFile.status == "completed").all()
+        return [(ingest_service.spool_path(f.sha256_hash), f.filename, f.sha256_hash) for f in files]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--out", default=ANOMALY_MODEL_PATH)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    # Features must come from the pattern risk, not a previous model's scores.
+    agent_service.agent = ForensicAgent(anomaly_model_path=None)
+    sources = [(p, os.path.basename(p), None) for p in args.files] or ingested_files()
+
+    frames = []
+    for path, filename, file_hash in sources:
+        if not os.path.exists(path):
+            print(f"Skipping {filename}: {path} not found")
+            continue
+        findings = agent_service.analyze_file(path, filename, file_hash)
+        if findings["entities"]:
+            frames.append(entity_feature_frame(findings["entities"], findings["relationships"], findings["chars"]))
+    if not frames:
+        sys.exit("No entities found to train on")
+
+    result = train_anomaly_model(pd.concat(frames, ignore_index=True), args.out, n_jobs=args.n_jobs)
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
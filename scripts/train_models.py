@@ -1,19 +1,79 @@
-"""Example training script.
-Replace the toy dataset with your labelled relationship dataset.
+"""Train the link-strength model from CDR link history.
+
+Builds the link-feature matrix from the per-file link cache (aggregating any
+CDR not cached yet chunk by chunk) and labels a pair positive when a
+relationship links its two parties. Uses the ingested CDR files unless CDR
+paths are given; the labels come from the relationships table unless a CSV
+of known pairs (columns a_party, b_party) is given.
+Usage: python scripts/train_models.py [cdr ...] [--labels CSV] [--out PATH] [--n-jobs N] [--warm]
 """
+import argparse
 import os
+import sys
+
 import pandas as pd
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
 from app.ai.training import train_link_strength
+from app.core.config import LINK_MODEL_PATH
+from app.features.link_features import LinkFeatureStore
+from app.ingest.parsers import CDR_SUFFIXES
+from app.ingest.pdf_text import file_sha256
+
+
+def ingested_cdrs():
+    from app.db.models import IngestFile
+    from app.db.session import SessionLocal
+    from app.services import ingest_service
+
+    db = SessionLocal()
+    try:
+        files = db.query(IngestFile).filter(IngestFile.status == "completed").all()
+        return [(f.sha256_hash, str(ingest_service.spool_path(f.sha256_hash)))
+                for f in files if f.filename.lower().endswith(CDR_SUFFIXES)]
+    finally:
+        db.close()
+
+
+def relationship_pairs():
+    from app.db.session import SessionLocal
+    from app.repositories import relationship_repository
+
+    db = SessionLocal()
+    try:
+        return relationship_repository.get_relationship_label_pairs(db)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cdrs", nargs="*")
+    parser.add_argument("--labels")
+    parser.add_argument("--out", default=LINK_MODEL_PATH)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--warm", action="store_true",
+                        help="continue the previous model's boosters (refits if the data drifted or the iteration cap is hit)")
+    args = parser.parse_args()
+
+    files = [(file_sha256(p), p) for p in args.cdrs] or ingested_cdrs()
+    if not files:
+        sys.exit("No CDR files to train on")
+    dataset = LinkFeatureStore().dataset(files)
+
+    if args.labels:
+        known = pd.read_csv(args.labels, dtype=str)
+        pairs = list(zip(known["a_party"], known["b_party"]))
+    else:
+        pairs = relationship_pairs()
+    y = dataset.pair_labels(pairs)
+    print(f"{len(y)} pairs from {len(files)} files, {int(y.sum())} positive")
 
-os.makedirs("artifacts", exist_ok=True)
+    result = train_link_strength(dataset.X, y, args.out, n_jobs=args.n_jobs, warm_start=args.warm)
+    print(result)
 
-# Toy example data (replace!)
-X = pd.DataFrame({
-    "calls_count": [1, 5, 20, 2, 40, 3],
-    "unique_days": [1, 2, 10, 1, 15, 1],
-    "co_location_hits": [0, 1, 8, 0, 12, 0],
-})
-y = pd.Series([0, 0, 1, 0, 1, 0])
 
-result = train_link_strength(X, y, "artifacts/link_strength_model.joblib")
-print(result)
+if __name__ == "__main__":
+    main()
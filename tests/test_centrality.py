@@ -0,0 +1,44 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from app.features import centrality
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache(monkeypatch):
+    monkeypatch.setattr(centrality, "_memory_cache", type(centrality._memory_cache)())
+
+
+def test_exact_when_every_pivot_fits():
+    g = nx.karate_club_graph()
+    result = centrality.betweenness(g, epsilon=0.0, time_budget=60.0, workers=1, cache_dir=None)
+    assert result.exact and result.pivots == g.number_of_nodes()
+    expected = nx.betweenness_centrality(g)
+    got = result.as_dict()
+    assert all(got[node] == pytest.approx(value) for node, value in expected.items())
+
+
+def test_pivots_are_shuffled_when_all_are_planned(monkeypatch):
+    seen = []
+
+    def accumulate(indptr, indices, sources, deadline):
+        seen.append(np.asarray(sources))
+        return np.zeros(len(indptr) - 1), 1
+
+    monkeypatch.setattr(centrality, "_accumulate", accumulate)
+    g = nx.path_graph(200)
+    centrality.betweenness(g, epsilon=0.0, workers=1, cache_dir=None)
+    assert sorted(seen[0].tolist()) == list(range(200))
+    assert seen[0].tolist() != list(range(200))
+
+
+def test_truncated_run_is_not_cached(tmp_path):
+    g = nx.path_graph(300)
+    first = centrality.betweenness(g, epsilon=0.0, time_budget=0.0, workers=1, cache_dir=tmp_path)
+    assert not first.exact and first.pivots < g.number_of_nodes()
+    assert not centrality._memory_cache and not list(tmp_path.iterdir())
+
+    full = centrality.betweenness(g, epsilon=0.0, time_budget=60.0, workers=1, cache_dir=tmp_path)
+    assert full.exact
+    assert centrality.betweenness(g, epsilon=0.0, time_budget=0.0, workers=1, cache_dir=tmp_path) is full
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from app.ai.drift import DriftMonitor, DriftReference, DriftRegistry, reference_path
+
+
+def _frame(rows: int = 200) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"a": rng.normal(size=rows), "b": rng.uniform(size=rows)})
+
+
+def test_observe_counts_scored_rows(tmp_path):
+    model_path = str(tmp_path / "model.joblib")
+    DriftReference.from_frame(_frame()).save(reference_path(model_path))
+    registry = DriftRegistry()
+
+    registry.observe(model_path, _frame(50))
+
+    assert registry.report([model_path])[model_path]["rows"] == 50
+
+
+def test_observe_never_raises_into_scoring(tmp_path, monkeypatch):
+    model_path = str(tmp_path / "model.joblib")
+    DriftReference.from_frame(_frame()).save(reference_path(model_path))
+    registry = DriftRegistry()
+
+    def unwritable(self, X):
+        raise PermissionError(self.state_path)
+    monkeypatch.setattr(DriftMonitor, "update", unwritable)
+    registry.observe(model_path, _frame(50))
+
+    # A corrupt reference fails while loading the monitor
+    broken = str(tmp_path / "broken.joblib")
+    with open(reference_path(broken), "wb") as fh:
+        fh.write(b"not an npz")
+    registry.observe(broken, _frame(50))
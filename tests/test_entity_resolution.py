@@ -0,0 +1,76 @@
+from sqlalchemy import select
+
+from app.db import models
+from app.repositories import entity_repository
+from app.services import entity_resolution
+from app.services.agent_service import agent_service
+
+
+def _case(db) -> models.Case:
+    case = models.Case(title="case")
+    db.add(case)
+    db.commit()
+    return case
+
+
+def _findings(*entities) -> dict:
+    return {
+        "entities": [
+            {"type": kind, "label": label, "pattern": pattern, "risk_score": risk, "confidence_score": confidence}
+            for kind, label, pattern, risk, confidence in entities
+        ],
+        "relationships": [],
+        "insights": [],
+    }
+
+
+def _scores(entity: models.Entity) -> tuple[float, float]:
+    return float(entity.risk_score), float(entity.confidence_score)
+
+
+def test_phone_keys_need_a_configured_country_code():
+    assert entity_resolution.normalize_phone("(212) 555-0100", country_code="1") == "+12125550100"
+    assert entity_resolution.normalize_phone("+44 20 7946 0958", country_code="") == "+442079460958"
+    assert entity_resolution.normalize_phone("0044 20 7946 0958", country_code="") == "+442079460958"
+    assert entity_resolution.normalize_phone("(212) 555-0100", country_code="") is None
+
+
+def test_discovery_reuses_keyed_entities_with_the_highest_scores(db):
+    case = _case(db)
+    agent_service.persist_files_batched(db, case.case_id, [
+        (None, _findings(("phone", "+1 212 555 0100", "phone", 20.0, 0.5),
+                         ("person", "Ann@Example.com", "email", 40.0, 0.9))),
+    ])
+    agent_service.persist_files_batched(db, case.case_id, [
+        (None, _findings(("phone", "+1-212-555-0100", "phone", 70.0, 0.4),
+                         ("phone", "+12125550100", "phone", 10.0, 0.8))),
+        (None, _findings(("person", "ann@example.com", "email", 30.0, 0.6))),
+    ])
+
+    entities = {row.resolution_key: row for row in db.scalars(select(models.Entity))}
+    assert set(entities) == {"phone:+12125550100", "email:ann@example.com"}
+    phone = entities["phone:+12125550100"]
+    assert _scores(phone) == (70.0, 0.8)
+    email = entities["email:ann@example.com"]
+    assert _scores(email) == (40.0, 0.9)
+    assert len(entity_repository.get_linked_entity_ids(db, case.case_id, list(e.entity_id for e in entities.values()))) == 2
+
+
+def test_new_keyed_entity_takes_the_highest_scores_of_the_batch(db):
+    case = _case(db)
+    agent_service.persist_files_batched(db, case.case_id, [
+        (None, _findings(("ip", "10.0.0.1", "ip", 15.0, 0.9))),
+        (None, _findings(("ip", "010.000.000.001", "ip", 55.0, 0.3))),
+    ])
+
+    ip = db.scalars(select(models.Entity)).one()
+    assert ip.resolution_key == "ip:10.0.0.1" and _scores(ip) == (55.0, 0.9)
+
+
+def test_get_or_create_raises_an_existing_entity(db):
+    first = entity_repository.get_or_create_entity(db, "phone", "+12125550100", 10.0, 0.9, "phone:+12125550100")
+    again = entity_repository.get_or_create_entity(db, "phone", "212-555-0100", 60.0, 0.2, "phone:+12125550100")
+
+    db.refresh(first)
+    assert again.entity_id == first.entity_id
+    assert _scores(first) == (60.0, 0.9)
@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.db import models
+from app.repositories import entity_repository
+from app.services import entity_search
+
+
+@pytest.fixture
+def index(monkeypatch):
+    """A fresh n-gram index that re-reads new entities on every search."""
+    fresh = entity_search.EntityNgramIndex(refresh_seconds=0)
+    monkeypatch.setattr(entity_search, "entity_ngram_index", fresh)
+    return fresh
+
+
+def _entities(db, *labels, entity_type: str = "person") -> list:
+    rows = [models.Entity(entity_type=entity_type, label=label) for label in labels]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def _labels(hits) -> list:
+    return [entity.label for entity, _ in hits]
+
+
+def test_contains_matches_inside_words_without_fuzzy(db, index):
+    _entities(db, "John Smith", "Johnny Cash", "Mary Jones")
+
+    assert _labels(entity_search.search_entities(db, "ohn", fuzzy=False)) == ["John Smith", "Johnny Cash"]
+    assert _labels(entity_search.search_entities(db, "mit", fuzzy=False)) == ["John Smith"]
+    # Shorter than a trigram: prefix only, as on PostgreSQL
+    assert _labels(entity_search.search_entities(db, "jo", fuzzy=False)) == ["John Smith", "Johnny Cash"]
+    assert entity_search.search_entities(db, "oh", fuzzy=False) == []
+
+
+def test_ranks_exact_then_prefix_then_similarity(db, index):
+    _entities(db, "Acme Holdings", "Acme", "Big Acme Corp")
+
+    hits = entity_search.search_entities(db, "ACME")
+
+    assert _labels(hits) == ["Acme", "Acme Holdings", "Big Acme Corp"]
+    assert [score for _, score in hits] == [4.0, 2.0, 1.0]
+
+
+def test_fuzzy_matches_a_partly_typed_word(db, index):
+    _entities(db, "Jonathan Smithers", "Joan Smyth")
+
+    assert _labels(entity_search.search_entities(db, "smith")) == ["Jonathan Smithers"]
+
+
+def test_filters_and_picks_up_new_entities(db, index):
+    person, = _entities(db, "Ann Lee")
+    _entities(db, "Ann Arbor", entity_type="location")
+    case = models.Case(title="case")
+    db.add(case)
+    db.commit()
+    db.add(models.CaseEntity(case_id=case.case_id, entity_id=person.entity_id))
+    db.commit()
+
+    assert _labels(entity_search.search_entities(db, "ann", entity_type="location")) == ["Ann Arbor"]
+    assert _labels(entity_search.search_entities(db, "ann", case_id=case.case_id)) == ["Ann Lee"]
+    _entities(db, "Annette")
+    assert "Annette" in _labels(entity_search.search_entities(db, "ann"))
+
+
+def test_postgres_containment_candidates_are_ordered_before_the_cut():
+    statements = []
+
+    class Recorder:
+        def execute(self, stmt):
+            statements.append(stmt)
+            return self
+
+        def all(self):
+            return []
+
+    entity_repository.search_entities(Recorder(), "ohn", fuzzy=False, candidates=10)
+
+    sql = str(statements[-1].compile(dialect=postgresql.dialect()))
+    inside = sql[sql.index("LIKE '%%' ||"):]
+    assert inside.index("ORDER BY word_similarity") < inside.index("LIMIT")
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from app.ai.explain import ExplanationCache, explain_batch
+from app.ai.relations import COMMUNICATION_RULE, FINANCIAL_RULE, NARRATIVE_RULE, PROXIMITY_RULE
+from app.services import export_service
+from app.services.export_service import RELATIONSHIP_EXPLAIN_WEIGHTS, relationship_feature_frame
+
+
+def _relationships(n: int) -> list:
+    """Relationships with integer-valued scores, the rows the old additive row hash collided on."""
+    rng = np.random.default_rng(7)
+    bases = [rule.basis for rule in (FINANCIAL_RULE, COMMUNICATION_RULE, NARRATIVE_RULE, PROXIMITY_RULE)]
+    start = datetime(2024, 1, 1)
+    return [
+        SimpleNamespace(
+            strength_score=int(rng.integers(0, 101)),
+            confidence_score=int(rng.integers(0, 101)),
+            basis=bases[int(rng.integers(0, len(bases)))],
+            first_seen=start,
+            last_seen=start + timedelta(days=int(rng.integers(0, 60))),
+        )
+        for _ in range(n)
+    ]
+
+
+def test_repeated_export_matches_uncached(monkeypatch):
+    monkeypatch.setattr(export_service, "explanation_cache", ExplanationCache())
+    rels = _relationships(5000)
+    expected = explain_batch(relationship_feature_frame(rels), RELATIONSHIP_EXPLAIN_WEIGHTS, 3)
+
+    first = export_service.explain_relationships(rels)
+    again = export_service.explain_relationships(rels)
+
+    for got in (first, again):
+        np.testing.assert_array_equal(got.indices, expected.indices)
+        np.testing.assert_array_equal(got.contributions, expected.contributions)
+
+
+def test_batch_matches_simple_explainer_with_dict_weights():
+    from app.ai.explain import simple_contribution_explain
+
+    rng = np.random.default_rng(3)
+    # Ties everywhere, weight order unlike column order, a column with no weight and a weight with no column
+    X = pd.DataFrame(rng.integers(-2, 3, size=(500, 4)).astype(float), columns=["a", "b", "c", "unweighted"])
+    weights = {"c": 1.0, "missing": 2.0, "a": 1.0, "b": -1.0}
+    got = explain_batch(X, weights, 3).to_dicts()
+    cached = ExplanationCache().explain(X, weights, "test", 3).to_dicts()
+    for i in range(len(X)):
+        expected = simple_contribution_explain(X.iloc[i], weights)["top_contributors"][:3]
+        assert got[i]["top_contributors"] == expected
+        assert cached[i]["top_contributors"] == expected
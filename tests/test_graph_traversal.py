@@ -0,0 +1,49 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import graph_traversal
+from app.services.graph_store import CaseGraphSnapshot
+
+
+def _snapshot(links: list) -> tuple[CaseGraphSnapshot, dict]:
+    names = sorted({name for a, b, _ in links for name in (a, b)})
+    ids = {name: uuid.uuid4() for name in names}
+    snap = CaseGraphSnapshot(uuid.uuid4())
+    start = datetime(2024, 1, 1)
+    edges = [
+        (uuid.uuid4(), ids[a], ids[b], "call", strength, start + timedelta(seconds=k))
+        for k, (a, b, strength) in enumerate(links)
+    ]
+    snap.apply(1, [(ids[name], name, "phone", 1) for name in names], edges)
+    return snap, ids
+
+
+# s-a-b-c-v is the strongest route to v but already uses four links; s-v-t fits within four
+LONG_CHEAP = [("s", "a", 100), ("a", "b", 100), ("b", "c", 100), ("c", "v", 100), ("s", "v", 90), ("v", "t", 100)]
+
+
+def _path(snap, ids, weighted: bool, max_hops: int) -> dict:
+    return graph_traversal.shortest_path(snap, ids["s"], ids["t"], weighted, max_hops, 100, 60.0)
+
+
+def test_weighted_path_fits_hop_limit_behind_cheaper_long_route():
+    snap, ids = _snapshot(LONG_CHEAP)
+    result = _path(snap, ids, True, 4)
+    assert result["found"] and result["complete"]
+    assert [node["label"] for node in result["nodes"]] == ["s", "v", "t"]
+    assert result["strength"] == pytest.approx(90.0)
+
+
+def test_weighted_path_prefers_strongest_route_within_limit():
+    snap, ids = _snapshot(LONG_CHEAP)
+    result = _path(snap, ids, True, 5)
+    assert [node["label"] for node in result["nodes"]] == ["s", "a", "b", "c", "v", "t"]
+    assert result["strength"] == pytest.approx(100.0)
+
+
+def test_weighted_and_unweighted_agree_on_reachability():
+    snap, ids = _snapshot(LONG_CHEAP)
+    for max_hops in range(1, 6):
+        assert _path(snap, ids, True, max_hops)["found"] == _path(snap, ids, False, max_hops)["found"]
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db import models
+from app.services import ingest_service
+
+
+def _case(db) -> models.Case:
+    case = models.Case(title="case")
+    db.add(case)
+    db.commit()
+    return case
+
+
+def _job(db, case, status: str, **fields) -> models.IngestJob:
+    job = models.IngestJob(case_id=case.case_id, source_type="upload", status=status, **fields)
+    db.add(job)
+    db.commit()
+    return job
+
+
+def test_dead_upload_fails_links_to_its_files(db):
+    case = _case(db)
+    upload = _job(db, case, "pending", created_at=datetime.utcnow() - timedelta(days=1))
+    in_flight = models.IngestFile(job_id=upload.job_id, filename="a.csv", file_type="csv", sha256_hash="a" * 64)
+    db.add(in_flight)
+    db.commit()
+
+    # Another upload of the same content links the file while it is still queued
+    other = _job(db, _case(db), "pending")
+    summary = ingest_service.link_known_file(db, other, in_flight)
+    assert summary["link_status"] == "pending"
+    ingest_service.enqueue_job(db, other.job_id)
+    db.refresh(other)
+    assert other.status == "running" and other.lease_token is None
+
+    assert ingest_service.expire_pending_jobs(db, timeout_seconds=3600) == 1
+
+    db.refresh(other)
+    assert db.get(models.IngestJobFile, (other.job_id, in_flight.file_id)).status == "failed"
+    assert other.status == "failed"
+    assert db.get(models.IngestFile, in_flight.file_id).status == "failed"
+
+
+def test_stale_lease_is_reclaimed_and_fences_the_old_holder(db):
+    case = _case(db)
+    job = _job(db, case, "queued")
+    claimed = ingest_service.claim_next_job(db)
+    assert claimed.job_id == job.job_id
+    old_token = claimed.lease_token
+    assert ingest_service.claim_next_job(db) is None
+
+    assert ingest_service.renew_lease(db, job.job_id, old_token)
+    ingest_service.hold_lease(db, job.job_id, old_token)
+    db.rollback()
+
+    job.heartbeat_at = datetime.utcnow() - timedelta(hours=2)
+    db.commit()
+    again = ingest_service.claim_next_job(db, lease_seconds=3600)
+    assert again.job_id == job.job_id and again.lease_token != old_token
+
+    assert not ingest_service.renew_lease(db, job.job_id, old_token)
+    with pytest.raises(ingest_service.LeaseLost):
+        ingest_service.hold_lease(db, job.job_id, old_token)
+
+
+def test_running_job_without_heartbeat_is_reclaimed(db):
+    # Started by a worker from before leases: no token, no heartbeat
+    job = _job(db, _case(db), "running", started_at=datetime.utcnow())
+    claimed = ingest_service.claim_next_job(db)
+    assert claimed.job_id == job.job_id and claimed.lease_token is not None
+
+
+def test_job_waiting_on_links_is_not_claimed(db):
+    case = _case(db)
+    upload = _job(db, case, "pending")
+    in_flight = models.IngestFile(job_id=upload.job_id, filename="a.csv", file_type="csv", sha256_hash="b" * 64)
+    db.add(in_flight)
+    db.commit()
+    other = _job(db, case, "pending")
+    ingest_service.link_known_file(db, other, in_flight)
+    ingest_service.enqueue_job(db, other.job_id)
+
+    assert ingest_service.claim_next_job(db) is None
@@ -0,0 +1,56 @@
+import random
+
+from app.ai.agent import ForensicAgent
+from app.ai.relations import KeywordStream, RelationshipReasoner
+from app.core.config import INSIGHT_EVIDENCE_LIMIT
+
+
+def _document(rng: random.Random, blocks: int) -> str:
+    """Keyword-dense filler ("$", "transfer", "positive") with a few entities and a narrative-free body."""
+    filler = ["paid $40 by transfer.", "test positive again.", "money moved.", "nothing here.", "reported late."]
+    parts = []
+    for _ in range(blocks):
+        parts.append(rng.choice(filler))
+        if rng.random() < 0.02:
+            parts.append(f"call 555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}")
+    return " ".join(parts)
+
+
+def _chunks(text: str, rng: random.Random) -> list:
+    out, i = [], 0
+    while i < len(text):
+        n = rng.randint(1, 4000)
+        out.append(text[i:i + n])
+        i += n
+    return out
+
+
+def test_stream_matches_one_shot_analysis(capsys):
+    rng = random.Random(5)
+    agent = ForensicAgent(anomaly_model_path=None)
+    for blocks in (0, 50, 3000):
+        text = _document(rng, blocks)
+        expected = agent.analyze_document(text)
+        streamed = agent.analyze_document_stream(_chunks(text, rng), overlap=128)
+        assert streamed.pop("chars") == len(text)
+        assert streamed == expected
+
+
+def test_stream_keeps_bounded_offsets():
+    rng = random.Random(9)
+    text = _document(rng, 20000).lower()
+    reasoner = RelationshipReasoner()
+    scan = ForensicAgent(anomaly_model_path=None).scanner.stream(128)
+    stream = KeywordStream(positional=reasoner.positional_keywords(), limited=("positive", "$"))
+    for chunk in _chunks(text, rng):
+        scan.feed(chunk)
+        stream.feed(chunk)
+        stream.prune(scan.first_mentions, scan.scanned, reasoner.context)
+    stream.close()
+
+    assert stream.counts["$"] == text.count("$") > 1000
+    assert stream.counts["positive"] == text.count("positive")
+    assert stream.first["positive"] == [i for i in range(len(text)) if text.startswith("positive", i)][:INSIGHT_EVIDENCE_LIMIT]
+    # Kept: one occurrence per entity context window, plus the tail not yet decided
+    assert len(stream.positions["$"]) <= len(scan.first_mentions) + 4000
+    assert len(stream.positions["$"]) < stream.counts["$"] / 10
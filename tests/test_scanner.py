@@ -0,0 +1,40 @@
+import re
+
+from app.ai import scanner
+from app.ai.scanner import default_scanner
+
+TEXT = (
+    "On 12/03/2024 John Carter called 555-123-4567 from 10.0.0.1 and emailed maria.lopez@example.com "
+    "about ACC-48213. Maria Lopez replied from 192.168.1.20; John Carter transferred $500 on 13/03/2024."
+)
+
+
+def _per_rule(patterns, text: str) -> list:
+    """What one `re.finditer` per rule finds, as (pattern, label, start)."""
+    return sorted((p.name, m.group(0), m.start()) for p in patterns for m in re.finditer(p.regex, text))
+
+
+def _found(entities) -> list:
+    return sorted((e["pattern"], e["label"], start) for e in entities for start, _ in e["offsets"])
+
+
+def test_shared_pass_finds_what_separate_passes_find():
+    entities = default_scanner().scan(TEXT)
+
+    assert scanner._first_char_class(r"\b\d{3}-\d{4}") == r"[\d]"
+    assert _found(entities) == _per_rule(default_scanner().patterns, TEXT)
+
+
+def test_falls_back_to_separate_passes_without_the_private_parser(monkeypatch):
+    expected = default_scanner().scan(TEXT)
+
+    monkeypatch.setattr(scanner, "sre_parse", None)
+    assert default_scanner().scan(TEXT) == expected
+
+    class Changed:
+        @staticmethod
+        def parse(regex, flags=0):
+            return [("not-an-opcode", None)]
+    monkeypatch.setattr(scanner, "sre_parse", Changed)
+    assert scanner._first_char_class(r"\d+") is None
+    assert default_scanner().scan(TEXT) == expected
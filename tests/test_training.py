@@ -0,0 +1,58 @@
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.ai import training
+from app.ai.training import _row_keys, train_link_strength
+
+
+def _dataset(rows: int, seed: int) -> tuple[pd.DataFrame, pd.Series]:
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, 4)), columns=["a", "b", "c", "d"])
+    y = pd.Series((X["a"] + 0.5 * X["b"] + rng.normal(scale=0.5, size=rows) > 0).astype(int))
+    return X, y
+
+
+def _keys(X: pd.DataFrame, y: pd.Series) -> np.ndarray:
+    return _row_keys(X.to_numpy(dtype=np.float32), y.to_numpy(dtype=np.int8))
+
+
+def test_warm_start_calibrates_only_on_rows_the_boosters_never_saw(tmp_path, monkeypatch):
+    out = str(tmp_path / "link.joblib")
+    X_old, y_old = _dataset(600, seed=1)
+    train_link_strength(X_old, y_old, out, n_jobs=1, extra_iter=10)
+    seen = joblib.load(out).seen
+
+    calibrated = []
+    fit_fold = training._fit_fold
+    def recording(X, y, train, calib, *args):
+        calibrated.append(calib)
+        return fit_fold(X, y, train, calib, *args)
+    monkeypatch.setattr(training, "_fit_fold", recording)
+
+    X_new, y_new = _dataset(600, seed=2)
+    X = pd.concat([X_old, X_new], ignore_index=True).sample(frac=1, random_state=1)
+    y = pd.concat([y_old, y_new], ignore_index=True).loc[X.index]
+    result = train_link_strength(X, y, out, n_jobs=1, warm_start=True, extra_iter=10)
+
+    assert result["warm_start"]
+    keys = _keys(X, y)
+    for fold_seen, calib in zip(seen, calibrated):
+        assert len(calib) and not np.isin(keys[calib], fold_seen).any()
+    # The new artifact remembers the old rows too, for the next warm start
+    assert all(np.isin(old, new).all() for old, new in zip(seen, joblib.load(out).seen))
+
+
+def test_warm_start_refits_when_no_unseen_rows_remain(tmp_path):
+    out = str(tmp_path / "link.joblib")
+    X, y = _dataset(600, seed=1)
+    train_link_strength(X, y, out, n_jobs=1, extra_iter=10)
+    # Only rows the previous boosters trained on: nothing left to test on honestly
+    fitted = np.isin(_keys(X, y), np.concatenate(joblib.load(out).seen))
+    result = train_link_strength(X[fitted], y[fitted], out, n_jobs=1, warm_start=True, extra_iter=10)
+
+    assert not result["warm_start"]
+    with open(tmp_path / "link.manifest.json") as fh:
+        assert json.load(fh)["versions"][-1]["refit_reason"] == "too few rows the previous model never saw"
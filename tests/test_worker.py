@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+
+from app.ingest import worker
+from app.services import ingest_service
+
+
+class _Session:
+    def __init__(self):
+        self.rolled_back = threading.Event()
+
+    def rollback(self):
+        self.rolled_back.set()
+
+    def close(self):
+        pass
+
+
+def test_keep_lease_releases_row_lock_before_joining_renewal(monkeypatch):
+    db = _Session()
+    renewing = threading.Event()
+    saw_rollback = []
+
+    def renew_lease(session, job_id, lease_token):
+        # Stands in for an UPDATE blocked on the job row lock the caller's transaction holds
+        renewing.set()
+        saw_rollback.append(db.rolled_back.wait(timeout=5))
+        return True
+
+    monkeypatch.setattr(ingest_service, "renew_lease", renew_lease)
+    monkeypatch.setattr(worker, "SessionLocal", _Session)
+    with pytest.raises(RuntimeError):
+        with worker.keep_lease(db, "job", "token", every=0.001):
+            assert renewing.wait(timeout=5)
+            raise RuntimeError("write failed")
+    assert saw_rollback == [True]